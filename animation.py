@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Idle-aware animation
+Drives the download button glow from a precomputed color table and stops
+the timer completely while the window is minimized, unfocused, busy or
+when reduced motion is on.
+Part of the Flare ecosystem.
+"""
+
+import math
+from typing import Callable, List, Optional, Tuple
+
+
+def glow_palette(rgb: Tuple[int, int, int], step: float = 0.05,
+                 low: float = 0.84, high: float = 1.0) -> List[str]:
+    """
+    One full sine period of `rgb` scaled between `low` and `high`
+    brightness, as hex colors. Consecutive duplicates are kept so the
+    timing of the pulse is unchanged; callers skip repeated colors.
+    """
+    frames = max(1, round(2 * math.pi / step))
+    mid, amp = (high + low) / 2, (high - low) / 2
+    palette = []
+    for i in range(frames):
+        brightness = mid + amp * math.sin(i * step)
+        r, g, b = (min(255, int(c * brightness)) for c in rgb)
+        palette.append(f"#{r:02x}{g:02x}{b:02x}")
+    return palette
+
+
+class GlowAnimation:
+    """
+    Cycles `apply(color)` through `palette` every `interval_ms` on a Tk root.
+
+    The animation runs only while no pause reason is set. Reasons are plain
+    strings ("iconified", "unfocused", "busy", "reduced_motion", ...); when
+    the first one is added the pending timer is cancelled and `rest_color`
+    is applied, so a paused animation costs nothing.
+    """
+
+    def __init__(self, root, apply: Callable[[str], None], palette: List[str],
+                 interval_ms: int = 80, rest_color: Optional[str] = None):
+        self.root = root
+        self.apply = apply
+        self.palette = palette
+        self.interval_ms = interval_ms
+        self.rest_color = rest_color
+
+        self._frame = 0
+        self._last_color = None
+        self._after_id = None
+        self._reasons = set()
+
+    @property
+    def running(self) -> bool:
+        return self._after_id is not None
+
+    def start(self):
+        """Begin animating (if not paused) and follow window visibility/focus."""
+        self.root.bind("<Map>", self._on_map_change, add="+")
+        self.root.bind("<Unmap>", self._on_map_change, add="+")
+        self.root.bind("<FocusIn>", self._on_focus_change, add="+")
+        self.root.bind("<FocusOut>", self._on_focus_change, add="+")
+        self._schedule()
+
+    def pause(self, reason: str):
+        self._reasons.add(reason)
+        self._cancel()
+
+    def resume(self, reason: str):
+        self._reasons.discard(reason)
+        self._schedule()
+
+    def set_paused(self, reason: str, paused: bool):
+        if paused:
+            self.pause(reason)
+        else:
+            self.resume(reason)
+
+    def stop(self):
+        self.pause("stopped")
+
+    def _cancel(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+            if self.rest_color:
+                self._apply(self.rest_color)
+
+    def _schedule(self):
+        if self._after_id is None and not self._reasons:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def _apply(self, color: str):
+        if color != self._last_color:
+            self._last_color = color
+            try:
+                self.apply(color)
+            except Exception:
+                pass
+
+    def _tick(self):
+        self._after_id = None
+        if self._reasons:
+            return
+        self._frame = (self._frame + 1) % len(self.palette)
+        self._apply(self.palette[self._frame])
+        self._schedule()
+
+    # ── Window state ────────────────────────────────────────────────────
+
+    def _on_map_change(self, event):
+        # Child widgets also generate Map/Unmap through the root's bindtags
+        if event.widget is not self.root:
+            return
+        try:
+            iconified = self.root.state() in ("iconic", "withdrawn")
+        except Exception:
+            return
+        self.set_paused("iconified", iconified)
+
+    def _on_focus_change(self, event):
+        # Focus moving between our own widgets fires FocusOut then FocusIn;
+        # wait until Tk settles before deciding whether the app lost focus
+        self.root.after_idle(self._check_focus)
+
+    def _check_focus(self):
+        try:
+            focused = self.root.focus_get() is not None
+        except Exception:
+            # focus_get() raises for some native dialogs - those are ours
+            focused = True
+        self.set_paused("unfocused", not focused)
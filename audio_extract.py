@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Audio extraction
+Codec-aware audio mode:
+
+  - the format selector prefers a stream that already has the target
+    codec (AAC for M4A, Opus for OPUS, ...), so most downloads need no
+    conversion at all;
+  - a download already in the target codec and container is left alone
+    without running ffprobe on it;
+  - when conversion (or a container change) is needed, the stream is
+    piped from the server straight into FFmpeg, which writes the final
+    file - the source is never stored and read back.
+
+Used by ydl_session.FlareYoutubeDL in audio mode.
+Part of the Flare ecosystem.
+"""
+
+import os
+import time
+import shutil
+import subprocess
+import threading
+from typing import Optional
+
+from download_queue import load_yt_dlp
+
+# Target format: (codec, extension, ffmpeg encoder, ffmpeg muxer)
+TARGETS = {
+    'mp3': ('mp3', 'mp3', 'libmp3lame', 'mp3'),
+    'm4a': ('aac', 'm4a', 'aac', 'ipod'),
+    'opus': ('opus', 'opus', 'libopus', 'opus'),
+    'flac': ('flac', 'flac', 'flac', 'flac'),
+    'wav': ('pcm', 'wav', 'pcm_s16le', 'wav'),
+}
+
+
+def audio_format_selector(fmt: str) -> str:
+    """yt-dlp format selector preferring audio that needs no transcoding to `fmt`."""
+    codec = TARGETS.get(fmt, (None,))[0]
+    if codec == 'aac':
+        return 'bestaudio[acodec^=mp4a]/bestaudio[ext=m4a]/bestaudio/best'
+    if codec in ('mp3', 'opus', 'flac'):
+        return f'bestaudio[acodec={codec}]/bestaudio/best'
+    return 'bestaudio/best'
+
+
+def source_codec(info: dict) -> Optional[str]:
+    """Audio codec family of a format ("aac", "opus", ...), None if unknown."""
+    acodec = (info.get('acodec') or '').lower()
+    if not acodec or acodec == 'none':
+        return None
+    if acodec.startswith('mp4a') or acodec == 'aac':
+        return 'aac'
+    if acodec.startswith('pcm'):
+        return 'pcm'
+    return acodec.split('.')[0]
+
+
+def can_stream(info: dict) -> bool:
+    """True for a single plain http(s) stream FFmpeg can read directly."""
+    if info.get('requested_formats') or info.get('is_live') or info.get('request_data'):
+        return False
+    if info.get('section_start') or info.get('section_end') or info.get('impersonate'):
+        return False
+    return load_yt_dlp().utils.determine_protocol(info) in ('http', 'https')
+
+
+def already_in_target(info: dict, fmt: str) -> bool:
+    """True if the downloaded file already is a `fmt` file (same codec and extension)."""
+    target = TARGETS.get(fmt)
+    return bool(target) and source_codec(info) == target[0] and info.get('ext') == target[1]
+
+
+_classes = None
+_class_lock = threading.Lock()
+
+
+def audio_classes():
+    """
+    (FlareExtractAudioPP, StreamingAudioFD), built on first use:
+    a drop-in FFmpegExtractAudioPP that skips files already in the target
+    format or converted while streaming, and the downloader that pipes a
+    progressive stream into FFmpeg.
+    """
+    global _classes
+    with _class_lock:
+        if _classes is None:
+            _classes = _build_classes()
+        return _classes
+
+
+def _build_classes():
+    load_yt_dlp()
+    from yt_dlp.downloader.http import HttpFD
+    from yt_dlp.postprocessor.ffmpeg import FFmpegExtractAudioPP
+    from yt_dlp.utils import replace_extension
+
+    class FlareExtractAudioPP(FFmpegExtractAudioPP):
+        """`fmt` is the target format name (mp3, m4a, ...)."""
+
+        def __init__(self, downloader=None, preferredcodec=None, preferredquality=None,
+                     nopostoverwrites=False):
+            super().__init__(downloader, preferredcodec, preferredquality, nopostoverwrites)
+            self.fmt = preferredcodec
+            # Source path -> converted file, filled in by FlareYoutubeDL.dl()
+            self.streamed = {}
+
+        @classmethod
+        def pp_key(cls):
+            # Same name as yt-dlp's, so its log prefix and postprocessor_args apply
+            return 'ExtractAudio'
+
+        def stream_args(self, info: dict):
+            """FFmpeg output arguments to convert `info`'s stream, or None if not possible."""
+            target = TARGETS.get(self.fmt)
+            codec = source_codec(info)
+            if not target or codec is None or already_in_target(info, self.fmt):
+                return None
+            _, _, encoder, muxer = target
+            if codec == target[0]:
+                return ['-vn', '-acodec', 'copy', '-f', muxer]
+            return ['-vn', '-acodec', encoder, *self._quality_args(encoder), '-f', muxer]
+
+        def run(self, information):
+            path = information['filepath']
+            streamed = self.streamed.pop(path, None)
+            if streamed:
+                information['filepath'] = streamed
+                information['ext'] = os.path.splitext(streamed)[1][1:]
+                return [], information
+            if already_in_target(information, self.fmt):
+                self.to_screen(f'Not converting audio {path}; file is already in target format {self.fmt}')
+                return [], information
+            return super().run(information)
+
+    class StreamingAudioFD(HttpFD):
+        """
+        Runs FFmpeg on the stream URL and writes the converted file next to
+        `filename` (with the target extension). Falls back to a plain
+        download if FFmpeg cannot be started or fails.
+        """
+
+        def __init__(self, ydl, params, pp: FlareExtractAudioPP):
+            super().__init__(ydl, params)
+            self.pp = pp
+            self.output = None
+
+        def real_download(self, filename, info_dict):
+            args = self.pp.stream_args(info_dict)
+            output = replace_extension(filename, TARGETS[self.pp.fmt][1], info_dict.get('ext'))
+            ffmpeg = self.pp.executable
+            if not args or output == filename or not ffmpeg or not shutil.which(ffmpeg):
+                return super().real_download(filename, info_dict)
+
+            url = info_dict['url']
+            headers = dict(info_dict.get('http_headers') or {})
+            cookie = self.ydl.cookiejar.get_cookie_header(url)
+            if cookie:
+                headers['Cookie'] = cookie
+            tmpfilename = output + '.part'
+            cmd = [ffmpeg, '-y', '-nostdin', '-hide_banner', '-loglevel', 'error',
+                   '-progress', 'pipe:1', '-nostats']
+            if headers:
+                cmd += ['-headers', ''.join(f'{key}: {value}\r\n' for key, value in headers.items())]
+            cmd += ['-i', url, *args, tmpfilename]
+
+            self.report_destination(output)
+            total = info_dict.get('filesize') or info_dict.get('filesize_approx')
+            duration = info_dict.get('duration')
+            start = time.time()
+            try:
+                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                        stdin=subprocess.DEVNULL)
+            except OSError as e:
+                self.report_warning(f'Could not start FFmpeg ({e}), downloading first')
+                return super().real_download(filename, info_dict)
+
+            # FFmpeg reports how far it got in the source's timeline; with a
+            # known size and duration that gives the bytes received,
+            # otherwise the bytes written so far are shown
+            if not duration:
+                total = None
+            stderr = []
+            reader = threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True)
+            reader.start()
+            position = written = 0
+            try:
+                for line in proc.stdout:
+                    key, _, value = line.decode('ascii', 'replace').strip().partition('=')
+                    if key == 'out_time_us' and value.isdigit():
+                        position = int(value) / 1e6
+                    elif key == 'total_size' and value.isdigit():
+                        written = int(value)
+                    if key != 'progress':
+                        continue
+                    done = int(total * min(1.0, position / duration)) if total else written
+                    now = time.time()
+                    self._hook_progress({
+                        'status': 'downloading',
+                        'downloaded_bytes': done,
+                        'total_bytes': total,
+                        'tmpfilename': tmpfilename,
+                        'filename': output,
+                        'eta': self.calc_eta(start, now, total, done),
+                        'speed': self.calc_speed(start, now, done),
+                        'elapsed': now - start,
+                        'ctx_id': info_dict.get('ctx_id'),
+                    }, info_dict)
+                proc.wait()
+            except BaseException:
+                proc.kill()
+                proc.wait()
+                self.try_remove(tmpfilename)
+                raise
+            reader.join()
+
+            if proc.returncode != 0:
+                error = b''.join(stderr).decode('utf-8', 'replace').strip().splitlines()
+                self.report_warning(
+                    f'Streaming conversion failed ({error[-1] if error else proc.returncode}), downloading first')
+                self.try_remove(tmpfilename)
+                return super().real_download(filename, info_dict)
+
+            self.try_rename(tmpfilename, output)
+            size = os.path.getsize(output)
+            self._hook_progress({
+                'status': 'finished',
+                'downloaded_bytes': size,
+                'total_bytes': size,
+                'filename': output,
+                'elapsed': time.time() - start,
+                'ctx_id': info_dict.get('ctx_id'),
+            }, info_dict)
+            self.output = output
+            return True
+
+    return FlareExtractAudioPP, StreamingAudioFD
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Bandwidth limits
+Token buckets shared by all running downloads: one for the aggregate
+limit and one per job. Limits can follow a time-of-day schedule (e.g.
+2 MB/s during office hours) and can be changed while downloads run;
+waiting downloads pick up the new rate within a fraction of a second.
+
+Downloads call throttle() after each block they receive, which sleeps
+until the buckets allow the bytes through.
+Part of the Flare ecosystem.
+"""
+
+import re
+import time
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+# Longest single sleep, so limit changes and cancellation are noticed quickly
+MAX_WAIT = 0.25
+# How much a bucket may hold, in seconds of its rate (allows short bursts)
+BURST_SECONDS = 0.5
+# yt-dlp reads into fixed blocks of this size while limits apply
+BLOCK_SIZE = 64 * 1024
+
+RATE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?(?:/s)?\s*$', re.IGNORECASE)
+RULE_PATTERN = re.compile(
+    r'^\s*(?:(?P<days>[a-z,-]+)\s+)?(?P<start>\d{1,2}:\d{2})\s*-\s*(?P<end>\d{1,2}:\d{2})\s+(?P<rate>\S+)\s*$',
+    re.IGNORECASE,
+)
+DAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+UNLIMITED = ('', 'none', 'off', 'unlimited', '0')
+
+
+def parse_rate(text) -> Optional[float]:
+    """
+    Bytes per second from "500K", "2M", "1.5MB/s" or a number of bytes.
+    None (unlimited) for "", "0", "off", "unlimited" or None.
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text) if text > 0 else None
+    if text.strip().lower() in UNLIMITED:
+        return None
+    match = RATE_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Invalid rate: {text!r} (use e.g. 500K, 2M)")
+    value = float(match.group(1)) * 1024 ** ' kmg'.index(match.group(2).lower() or ' ')
+    return value if value > 0 else None
+
+
+def format_rate(rate: Optional[float]) -> str:
+    if not rate:
+        return "Unlimited"
+    for unit in ('B', 'KB', 'MB'):
+        if rate < 1024:
+            return f"{rate:g} {unit}/s"
+        rate /= 1024
+    return f"{rate:g} GB/s"
+
+
+def _parse_days(text: Optional[str]) -> List[int]:
+    if not text:
+        return list(range(7))
+    days = set()
+    for part in text.lower().split(','):
+        first, _, last = part.partition('-')
+        try:
+            start = DAY_NAMES.index(first[:3])
+            end = DAY_NAMES.index(last[:3]) if last else start
+        except ValueError:
+            raise ValueError(f"Invalid days: {text!r} (use e.g. mon-fri or sat,sun)")
+        day = start
+        while True:
+            days.add(day)
+            if day == end:
+                break
+            day = (day + 1) % 7
+    return sorted(days)
+
+
+def _minutes(hhmm: str, end: bool = False) -> int:
+    """Minutes after midnight; "24:00" is only valid as the `end` of a window."""
+    hours, minutes = (int(x) for x in hhmm.split(':'))
+    if hours > 24 or minutes > 59 or (hours == 24 and (minutes or not end)):
+        raise ValueError(f"Invalid time: {hhmm!r}")
+    return hours * 60 + minutes
+
+
+class ScheduleRule:
+    """Aggregate limit for a daily time window, e.g. "mon-fri 09:00-18:00 2M"."""
+
+    def __init__(self, start: str, end: str, rate: Optional[float], days: Optional[str] = None):
+        self.start = _minutes(start)
+        self.end = _minutes(end, end=True)
+        self.rate = rate
+        self.days = _parse_days(days)
+        self.text = f"{days + ' ' if days else ''}{start}-{end} {format_rate(rate)}"
+
+    @classmethod
+    def parse(cls, text: str) -> 'ScheduleRule':
+        match = RULE_PATTERN.match(text)
+        if not match:
+            raise ValueError(f"Invalid schedule rule: {text!r} (use e.g. 'mon-fri 09:00-18:00 2M')")
+        return cls(match.group('start'), match.group('end'),
+                   parse_rate(match.group('rate')), match.group('days'))
+
+    def active(self, now: datetime) -> bool:
+        minute = now.hour * 60 + now.minute
+        if self.start <= self.end:
+            return now.weekday() in self.days and self.start <= minute < self.end
+        # Window crosses midnight: the part after midnight belongs to the previous day
+        if minute >= self.start:
+            return now.weekday() in self.days
+        return minute < self.end and (now.weekday() - 1) % 7 in self.days
+
+    def __repr__(self):
+        return f"ScheduleRule({self.text!r})"
+
+
+class TokenBucket:
+    """
+    Token bucket whose rate can change at any time. A None rate means
+    unlimited. Consumers may overdraw; they then wait until the debt is
+    paid back, so large blocks are limited as accurately as small ones.
+    """
+
+    def __init__(self, rate: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._tokens = 0.0
+        self._updated = clock()
+
+    @property
+    def rate(self) -> Optional[float]:
+        return self._rate
+
+    def _refill(self, now: float):
+        if self._rate:
+            burst = self._rate * BURST_SECONDS
+            self._tokens = min(burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def set_rate(self, rate: Optional[float]):
+        with self._lock:
+            self._refill(self._clock())
+            if not rate:
+                self._tokens = 0.0
+            self._rate = rate
+
+    def take(self, amount: int):
+        """Withdraw `amount` tokens, possibly going into debt."""
+        with self._lock:
+            self._refill(self._clock())
+            if self._rate:
+                self._tokens -= amount
+
+    def wait_time(self) -> float:
+        """Seconds until the bucket is out of debt at the current rate."""
+        with self._lock:
+            self._refill(self._clock())
+            if not self._rate or self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
+
+
+class BandwidthManager:
+    """
+    Aggregate and per-job download limits, shared by all workers.
+
+    `limit` caps all downloads together and `per_job` each download;
+    while a schedule rule is active its rate replaces `limit`. All three
+    can be changed at any time.
+    """
+
+    def __init__(self, limit: Optional[float] = None, per_job: Optional[float] = None,
+                 schedule: Iterable[ScheduleRule] = (),
+                 now: Callable[[], datetime] = datetime.now):
+        self._now = now
+        self._lock = threading.Lock()
+        self._limit = limit
+        self._per_job = per_job
+        self._schedule: List[ScheduleRule] = list(schedule)
+        self._aggregate = TokenBucket()
+        self._jobs: Dict[Hashable, TokenBucket] = {}
+        self._checked = 0.0
+        self._update_aggregate()
+
+    # ── Configuration ───────────────────────────────────────────────────
+
+    @property
+    def limit(self) -> Optional[float]:
+        return self._limit
+
+    @property
+    def per_job(self) -> Optional[float]:
+        return self._per_job
+
+    @property
+    def schedule(self) -> List[ScheduleRule]:
+        return list(self._schedule)
+
+    def set_limit(self, rate: Optional[float]):
+        with self._lock:
+            self._limit = rate
+        self._update_aggregate()
+
+    def set_per_job(self, rate: Optional[float]):
+        with self._lock:
+            self._per_job = rate
+            buckets = list(self._jobs.values())
+        for bucket in buckets:
+            bucket.set_rate(rate)
+
+    def set_schedule(self, rules: Iterable[ScheduleRule]):
+        with self._lock:
+            self._schedule = list(rules)
+        self._update_aggregate()
+
+    def active_rule(self) -> Optional[ScheduleRule]:
+        now = self._now()
+        with self._lock:
+            return next((rule for rule in self._schedule if rule.active(now)), None)
+
+    def effective_limit(self) -> Optional[float]:
+        """The aggregate limit in force right now."""
+        rule = self.active_rule()
+        return rule.rate if rule is not None else self._limit
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._limit or self._per_job or self._schedule)
+
+    def _update_aggregate(self):
+        self._checked = time.monotonic()
+        rate = self.effective_limit()
+        if rate != self._aggregate.rate:
+            self._aggregate.set_rate(rate)
+
+    # ── Download side ───────────────────────────────────────────────────
+
+    def throttle(self, key: Hashable, nbytes: int,
+                 cancelled: Optional[Callable[[], bool]] = None):
+        """
+        Account for `nbytes` received by job `key`, sleeping as long as the
+        per-job and aggregate limits require. Returns early if `cancelled()`
+        becomes true.
+        """
+        if nbytes <= 0:
+            return
+        # Schedule windows are minutes long; checking a few times a second is plenty
+        if time.monotonic() - self._checked > 1.0:
+            self._update_aggregate()
+
+        with self._lock:
+            bucket = self._jobs.get(key)
+            if bucket is None:
+                bucket = self._jobs[key] = TokenBucket(self._per_job)
+
+        for current in (bucket, self._aggregate):
+            current.take(nbytes)
+            while True:
+                wait = current.wait_time()
+                if wait <= 0 or (cancelled is not None and cancelled()):
+                    break
+                time.sleep(min(wait, MAX_WAIT))
+
+    def release(self, key: Hashable):
+        """Forget a finished job's bucket."""
+        with self._lock:
+            self._jobs.pop(key, None)
+
+    def describe(self) -> str:
+        """Short summary for status text, e.g. "2 MB/s (mon-fri 09:00-18:00)"."""
+        rule = self.active_rule()
+        parts = [format_rate(rule.rate if rule else self._limit)]
+        if rule is not None:
+            parts.append(f"(schedule {rule.text})")
+        if self._per_job:
+            parts.append(f"· {format_rate(self._per_job)} per download")
+        return " ".join(parts)
+
+
+def parse_schedule(rules: Iterable[str]) -> List[ScheduleRule]:
+    return [ScheduleRule.parse(rule) for rule in rules if rule and rule.strip()]
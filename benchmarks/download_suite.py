@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Download benchmark suite
+Serves synthetic media from a local HTTP server and downloads it through
+DownloadQueue - the same option building and yt-dlp session as the
+app - one case per fresh interpreter:
+
+  progressive      plain file, full speed
+  throttled        plain file, limited per connection (native and segmented engine)
+  dash             DASH manifest with N fragments
+  hls              HLS playlist with N fragments
+  flaky            plain file that answers 503 + Retry-After first and
+                   then drops every response part-way
+
+Every download is checked byte-for-byte. Per case it reports wall time,
+throughput, time to first byte, CPU time (including FFmpeg), peak RSS
+and, where Tk can open a window, how late a 10 ms Tk timer fired while
+progress was pumped the way the GUI does.
+
+Usage:
+    python benchmarks/download_suite.py                          # all cases, 16 MB
+    python benchmarks/download_suite.py --size 64 --rate 4096 --fragments 40
+    python benchmarks/download_suite.py --cases dash,hls --json downloads.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from version import __version__
+
+RANGE_HEADER = re.compile(r"bytes=(\d+)-(\d*)$")
+CHUNK = 64 * 1024
+SEED = 20240601
+# Seconds of media per DASH/HLS fragment (only used in the manifests)
+FRAGMENT_SECONDS = 2
+TK_TICK_MS = 10
+
+CASES = ("progressive", "throttled", "throttled-segmented", "dash", "hls", "flaky")
+
+
+# ── Media server ────────────────────────────────────────────────────────
+
+def make_payload(size: int) -> bytes:
+    """Same bytes for the same size on every run and machine."""
+    return random.Random(SEED).getrandbits(size * 8).to_bytes(size, "little")
+
+
+def split_fragments(payload: bytes, count: int):
+    """(init segment, fragments) covering `payload` exactly."""
+    init_size = min(1024, len(payload) // (count + 1))
+    body = payload[init_size:]
+    step = -(-len(body) // count)
+    return payload[:init_size], [body[i:i + step] for i in range(0, len(body), step)]
+
+
+def dash_manifest(fragments: int) -> str:
+    duration = fragments * FRAGMENT_SECONDS
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" minBufferTime="PT2S"
+     mediaPresentationDuration="PT{duration}S" profiles="urn:mpeg:dash:profile:isoff-live:2011">
+  <Period>
+    <AdaptationSet mimeType="video/mp4" segmentAlignment="true">
+      <Representation id="av" bandwidth="4000000" width="1280" height="720" codecs="avc1.4d401f,mp4a.40.2">
+        <SegmentTemplate timescale="1" duration="{FRAGMENT_SECONDS}" startNumber="1"
+                         initialization="init.mp4" media="seg-$Number$.m4s"/>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>
+"""
+
+
+def hls_playlist(fragments: int) -> str:
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{FRAGMENT_SECONDS}",
+             "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:VOD", '#EXT-X-MAP:URI="init.mp4"']
+    for i in range(fragments):
+        lines += [f"#EXTINF:{FRAGMENT_SECONDS:.1f},", f"seg-{i}.ts"]
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    """
+    /p/clip.mp4   full speed           /dash/clip.mpd, init.mp4, seg-N.m4s
+    /t/clip.mp4   throttled            /hls/clip.m3u8, init.mp4, seg-N.ts
+    /f/clip.mp4   flaky
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        path = self.path.split("?")[0]
+        with server.lock:
+            server.requests += 1
+
+        if path in ("/p/clip.mp4", "/t/clip.mp4"):
+            self._send_ranged(server.payload, "video/mp4", server.rate if path[1] == "t" else 0)
+        elif path == "/f/clip.mp4":
+            with server.lock:
+                server.flaky_hits += 1
+                first = server.flaky_hits == 1
+            if first:
+                self._send_bytes(b"", "text/plain", status=503, headers={"Retry-After": "1"})
+            else:
+                self._send_ranged(server.payload, "video/mp4", 0, cut=max(CHUNK, len(server.payload) // 3))
+        elif path == "/dash/clip.mpd":
+            self._send_bytes(server.dash.encode(), "application/dash+xml")
+        elif path in ("/dash/init.mp4", "/hls/init.mp4"):
+            self._send_bytes(server.init, "video/mp4")
+        elif path == "/hls/clip.m3u8":
+            self._send_bytes(server.hls.encode(), "application/vnd.apple.mpegurl")
+        else:
+            match = re.match(r"/(dash/seg-(\d+)\.m4s|hls/seg-(\d+)\.ts)$", path)
+            index = None
+            if match:
+                index = int(match.group(2)) - 1 if match.group(2) else int(match.group(3))
+            if index is None or not 0 <= index < len(server.fragments):
+                self._send_bytes(b"not found", "text/plain", status=404)
+                return
+            self._send_bytes(server.fragments[index], "video/mp4")
+
+    def _send_bytes(self, body: bytes, content_type: str, status: int = 200, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_ranged(self, data: bytes, content_type: str, rate: int, cut: int = 0):
+        """Single byte ranges; `rate` bytes/s per connection; drop the connection after `cut` bytes."""
+        start, end, status = 0, len(data) - 1, 200
+        match = RANGE_HEADER.match(self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(int(match.group(2)), end)
+            if start > end:
+                self._send_bytes(b"", content_type, status=416, headers={"Content-Range": f"bytes */{len(data)}"})
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.end_headers()
+
+        sent = 0
+        sent_at = time.monotonic()
+        for offset in range(start, end + 1, CHUNK):
+            block = data[offset:min(offset + CHUNK, end + 1)]
+            try:
+                self.wfile.write(block)
+            except OSError:
+                return
+            sent += len(block)
+            if cut and sent >= cut and offset + len(block) <= end:
+                self.close_connection = True
+                return
+            if rate:
+                sent_at += len(block) / rate
+                delay = sent_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+
+def start_server(payload: bytes, rate: int, fragments: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MediaHandler)
+    server.daemon_threads = True
+    server.payload = payload
+    server.rate = rate
+    server.init, server.fragments = split_fragments(payload, fragments)
+    server.dash = dash_manifest(len(server.fragments))
+    server.hls = hls_playlist(len(server.fragments))
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.flaky_hits = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def case_url(base: str, case: str) -> str:
+    return {
+        "progressive": f"{base}/p/clip.mp4",
+        "throttled": f"{base}/t/clip.mp4",
+        "throttled-segmented": f"{base}/t/clip.mp4",
+        "dash": f"{base}/dash/clip.mpd",
+        "hls": f"{base}/hls/clip.m3u8",
+        "flaky": f"{base}/f/clip.mp4",
+    }[case]
+
+
+# ── Client side (runs in a fresh interpreter per case) ─────────────────
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, None where it cannot be read."""
+    try:
+        import resource
+    except ImportError:
+        return _peak_rss_windows()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _peak_rss_windows():
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(Counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return round(counters.PeakWorkingSetSize / (1024 * 1024), 1)
+    except (AttributeError, OSError):
+        return None
+
+
+def cpu_seconds() -> float:
+    """CPU time of this process and its finished children (FFmpeg)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def wait_with_tk(queue, aggregator, use_tk: bool):
+    """
+    Wait for the queue; with Tk, run a hidden window whose 10 ms timer
+    records how late it fires while job updates are drained at the GUI's
+    rate. Returns the lateness samples in ms, or None without Tk.
+    """
+    if use_tk:
+        try:
+            import tkinter
+            root = tkinter.Tk()
+        except Exception:
+            root = None
+    else:
+        root = None
+    if root is None:
+        queue.wait()
+        return None
+
+    from progress import PROGRESS_HZ
+
+    root.withdraw()
+    label = tkinter.Label(root)
+    lateness = []
+    state = {"due": time.perf_counter() + TK_TICK_MS / 1000}
+
+    def tick():
+        now = time.perf_counter()
+        lateness.append(max(0.0, (now - state["due"]) * 1000))
+        state["due"] = now + TK_TICK_MS / 1000
+        if queue.is_busy():
+            root.after(TK_TICK_MS, tick)
+        else:
+            root.quit()
+
+    def pump():
+        for job in aggregator.drain().values():
+            label.configure(text=f"{job.progress:.0f}% {job.speed}")
+        root.after(int(1000 / PROGRESS_HZ), pump)
+
+    root.after(TK_TICK_MS, tick)
+    root.after(int(1000 / PROGRESS_HZ), pump)
+    root.mainloop()
+    root.destroy()
+    return lateness
+
+
+def run_case(case: str, url: str, size: int, expected: str, connections: int, use_tk: bool) -> dict:
+    """Download one case through DownloadQueue and measure it (in this process)."""
+    from download_queue import DownloadQueue, load_yt_dlp
+    from progress import ProgressAggregator
+    from retry_policy import RetryPolicy
+
+    # Import yt-dlp first so its import time stays out of the measurement
+    import_started = time.perf_counter()
+    load_yt_dlp()
+    import_seconds = time.perf_counter() - import_started
+
+    aggregator = ProgressAggregator()
+    engine = "segmented" if case.endswith("segmented") else "native"
+    cpu_before = cpu_seconds()
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as directory:
+        queue = DownloadQueue(
+            max_workers=1, engine=engine, connections=connections,
+            on_update=lambda job: aggregator.push(job.id, job),
+            # Short pauses keep the flaky case quick
+            retry_policy=RetryPolicy(base=0.2, cap=2),
+        )
+        job = queue.submit(url, directory, "mp4", "Best", False)
+        lateness = wait_with_tk(queue, aggregator, use_tk)
+        queue.shutdown()
+        seconds = time.perf_counter() - started
+        cpu = cpu_seconds() - cpu_before
+        # The bytes are what is checked: with FFmpeg installed yt-dlp runs
+        # its DASH/HLS fixups on the result, which reject the synthetic
+        # media and leave the downloaded file in place
+        verified = bool(job.filepath and os.path.exists(job.filepath)
+                        and sha256_file(job.filepath) == expected)
+
+    phases = job.metrics.durations()
+    result = {
+        "case": case,
+        "engine": engine,
+        "state": job.state,
+        "error": job.error,
+        "verified": verified,
+        "import_s": round(import_seconds, 3),
+        "seconds": round(seconds, 3),
+        "mb_per_s": round(size / 1048576 / seconds, 2),
+        "first_byte_s": phases["first_byte"],
+        "extract_s": phases["extract"],
+        "retries": job.metrics.retries,
+        "cpu_s": round(cpu, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "tk_late_ms": None,
+    }
+    if lateness:
+        ordered = sorted(lateness)
+        result["tk_late_ms"] = {
+            "p50": round(statistics.median(ordered), 2),
+            "p95": round(ordered[int(len(ordered) * 0.95) - 1 if len(ordered) > 1 else 0], 2),
+            "max": round(ordered[-1], 2),
+            "samples": len(ordered),
+        }
+    return result
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ── Driver ──────────────────────────────────────────────────────────────
+
+def run(cases, size_mb: int, rate_kb: int, fragments: int, connections: int, use_tk: bool) -> dict:
+    size = size_mb * 1024 * 1024
+    payload = make_payload(size)
+    expected = hashlib.sha256(payload).hexdigest()
+    server = start_server(payload, rate_kb * 1024, fragments)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results = []
+    try:
+        for case in cases:
+            with server.lock:
+                server.flaky_hits = 0
+            cmd = [sys.executable, os.path.abspath(__file__), "--run-case", case,
+                   "--url", case_url(base, case), "--bytes", str(size), "--expect", expected,
+                   "--connections", str(connections)]
+            if not use_tk:
+                cmd.append("--no-tk")
+            proc = subprocess.run(cmd, capture_output=True, text=True, cwd=PROJECT_DIR)
+            lines = proc.stdout.strip().splitlines()
+            try:
+                results.append(json.loads(lines[-1]))
+            except (IndexError, ValueError):
+                results.append({"case": case, "verified": False, "state": "crashed",
+                                "error": (proc.stderr.strip().splitlines() or ["no output"])[-1][:200]})
+    finally:
+        server.shutdown()
+
+    return {
+        "benchmark": "download_suite",
+        "app_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "size_mb": size_mb,
+        "rate_kb_per_connection": rate_kb,
+        "fragments": fragments,
+        "connections": connections,
+        "server_requests": server.requests,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download path benchmark against a local media server")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"comma-separated, from: {', '.join(CASES)}")
+    parser.add_argument("--size", type=int, default=16, help="media size in MB")
+    parser.add_argument("--rate", type=int, default=4096, help="per-connection limit of the throttled cases in KB/s")
+    parser.add_argument("--fragments", type=int, default=20, help="DASH/HLS fragment count")
+    parser.add_argument("--connections", type=int, default=4, help="connections of the segmented engine")
+    parser.add_argument("--no-tk", action="store_true", help="skip the Tk event-loop measurement")
+    parser.add_argument("--json", metavar="FILE", help="also write results as JSON")
+    # Internal: run one case in this interpreter and print its result
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--bytes", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--expect", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        result = run_case(args.run_case, args.url, args.bytes, args.expect, args.connections, not args.no_tk)
+        print(json.dumps(result))
+        return 0
+
+    cases = [case.strip() for case in args.cases.split(",") if case.strip()]
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    report = run(cases, max(1, args.size), max(1, args.rate), max(1, args.fragments),
+                 max(1, args.connections), not args.no_tk)
+
+    print("=" * 78)
+    print(f"{report['size_mb']} MB, throttled at {report['rate_kb_per_connection']} KB/s per connection, "
+          f"{report['fragments']} fragments  (v{report['app_version']}, Python {report['python']})")
+    print("=" * 78)
+    print(f"{'seconds':>8} {'MB/s':>7} {'TTFB s':>7} {'CPU s':>6} {'RSS MB':>7} {'Tk p95':>7} {'ok':>3}  case")
+    for row in report["results"]:
+        ok = "yes" if row.get("verified") else "NO"
+        tk = row.get("tk_late_ms") or {}
+
+        def cell(value, width):
+            return f"{'-' if value is None else value:>{width}}"
+
+        print(f"{cell(row.get('seconds'), 8)} {cell(row.get('mb_per_s'), 7)} {cell(row.get('first_byte_s'), 7)} "
+              f"{cell(row.get('cpu_s'), 6)} {cell(row.get('peak_rss_mb'), 7)} {cell(tk.get('p95'), 7)} "
+              f"{ok:>3}  {row['case']}")
+        if row.get("error"):
+            stage = "post-processing: " if row.get("verified") else ""
+            print(f"{'':>50}{stage}{row['error']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved: {args.json}")
+
+    return 0 if all(row.get("verified") for row in report["results"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
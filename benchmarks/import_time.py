@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Cold start benchmark
+Measures how long `import youtube_downloader` takes using `python -X importtime`
+and reports the slowest modules.
+
+Usage:
+    python benchmarks/import_time.py                # print a report
+    python benchmarks/import_time.py --runs 5       # median of 5 cold imports
+    python benchmarks/import_time.py --json out.json
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import platform
+import subprocess
+import statistics
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+try:
+    from version import __version__
+except ImportError:
+    __version__ = "unknown"
+
+# "import time:  self [us] | cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Modules that must stay off the start-up path
+LAZY_MODULES = ["yt_dlp"]
+
+
+def measure_once(module: str) -> dict:
+    """Import `module` in a fresh interpreter and parse -X importtime output."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules[name] = {"self_us": int(self_us), "cumulative_us": int(cumulative_us)}
+        if name == module:
+            total_us = int(cumulative_us)
+
+    return {"total_us": total_us, "modules": modules}
+
+
+def run(module: str, runs: int, top: int) -> dict:
+    samples = [measure_once(module) for _ in range(runs)]
+    totals = [s["total_us"] for s in samples]
+    median = statistics.median(totals)
+    # Report per-module numbers from the run closest to the median
+    representative = min(samples, key=lambda s: abs(s["total_us"] - median))
+
+    slowest = sorted(
+        representative["modules"].items(),
+        key=lambda item: item[1]["self_us"],
+        reverse=True,
+    )[:top]
+
+    return {
+        "benchmark": "import_time",
+        "module": module,
+        "app_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "runs": runs,
+        "total_ms": {
+            "median": round(median / 1000, 1),
+            "min": round(min(totals) / 1000, 1),
+            "max": round(max(totals) / 1000, 1),
+        },
+        "eager_heavy_modules": [m for m in LAZY_MODULES if m in representative["modules"]],
+        "slowest_self_ms": [
+            {"module": name, "self_ms": round(t["self_us"] / 1000, 2),
+             "cumulative_ms": round(t["cumulative_us"] / 1000, 2)}
+            for name, t in slowest
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Flare Download cold import time")
+    parser.add_argument("--module", default="youtube_downloader")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", metavar="FILE", help="also write results as JSON")
+    args = parser.parse_args()
+
+    report = run(args.module, max(1, args.runs), args.top)
+
+    print("=" * 60)
+    print(f"Cold import: {args.module}  (v{report['app_version']}, Python {report['python']})")
+    print("=" * 60)
+    t = report["total_ms"]
+    print(f"Median: {t['median']} ms   min: {t['min']} ms   max: {t['max']} ms   ({report['runs']} runs)")
+    if report["eager_heavy_modules"]:
+        print(f"WARNING: imported eagerly: {', '.join(report['eager_heavy_modules'])}")
+    print()
+    print(f"{'self ms':>9}  {'cum ms':>9}  module")
+    for row in report["slowest_self_ms"]:
+        print(f"{row['self_ms']:>9}  {row['cumulative_ms']:>9}  {row['module']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved: {args.json}")
+
+    # Non-zero exit lets CI flag a heavy module sneaking back onto the start-up path
+    return 1 if report["eager_heavy_modules"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
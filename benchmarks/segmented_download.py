@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Segmented download benchmark
+Serves a generated file from a local HTTP server that supports byte
+ranges and throttles every connection, then downloads it over one
+connection and with the segmented engine, checking that the result is
+byte-identical.
+
+Usage:
+    python benchmarks/segmented_download.py                    # 16 MB at 2 MB/s per connection
+    python benchmarks/segmented_download.py --size 64 --rate 4096 --connections 8
+    python benchmarks/segmented_download.py --ytdlp            # also run both engines through yt-dlp
+    python benchmarks/segmented_download.py --json out.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import platform
+import tempfile
+import threading
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from version import __version__
+from segmented import DEFAULT_CONNECTIONS, SegmentedDownloader
+
+RANGE_HEADER = re.compile(r"bytes=(\d+)-(\d*)$")
+CHUNK = 64 * 1024
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """GET with single byte ranges, throttled to `server.rate` bytes/s per connection"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        data = self.server.payload
+        start, end = 0, len(data) - 1
+        status = 200
+
+        match = RANGE_HEADER.match(self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(int(match.group(2)), end)
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.end_headers()
+
+        sent_at = time.monotonic()
+        for offset in range(start, end + 1, CHUNK):
+            block = data[offset:min(offset + CHUNK, end + 1)]
+            try:
+                self.wfile.write(block)
+            except OSError:
+                return
+            if self.server.rate:
+                sent_at += len(block) / self.server.rate
+                delay = sent_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+
+def start_server(payload: bytes, rate: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    server.daemon_threads = True
+    server.payload = payload
+    server.rate = rate
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def single_connection(url: str, directory: str) -> str:
+    path = os.path.join(directory, "clip.mp4")
+    with urllib.request.urlopen(url) as resp, open(path, "wb") as f:
+        for block in iter(lambda: resp.read(CHUNK), b""):
+            f.write(block)
+    return path
+
+
+def segmented(url: str, directory: str, connections: int) -> str:
+    path = os.path.join(directory, "clip.mp4")
+    SegmentedDownloader(url, path, connections=connections).download()
+    return path
+
+
+def through_ytdlp(url: str, directory: str, engine: str, connections: int) -> str:
+    from download_queue import DownloadQueue, JobState
+
+    queue = DownloadQueue(max_workers=1, engine=engine, connections=connections)
+    job = queue.submit(url, directory, "mp4", "Best", False)
+    queue.wait()
+    queue.shutdown()
+    if job.state != JobState.DONE:
+        raise RuntimeError(f"{engine} download failed: {job.error}")
+    return os.path.join(directory, "clip.mp4")
+
+
+def run(size_mb: int, rate_kb: int, connections: int, ytdlp: bool) -> dict:
+    payload = os.urandom(size_mb * 1024 * 1024)
+    expected = hashlib.sha256(payload).hexdigest()
+    server = start_server(payload, rate_kb * 1024)
+    url = f"http://127.0.0.1:{server.server_address[1]}/clip.mp4"
+
+    cases = [
+        ("single connection", lambda d: single_connection(url, d)),
+        (f"segmented x{connections}", lambda d: segmented(url, d, connections)),
+    ]
+    if ytdlp:
+        cases += [
+            ("yt-dlp native", lambda d: through_ytdlp(url, d, "native", connections)),
+            (f"yt-dlp segmented x{connections}", lambda d: through_ytdlp(url, d, "segmented", connections)),
+        ]
+
+    results = []
+    try:
+        for name, download in cases:
+            with tempfile.TemporaryDirectory() as directory:
+                started = time.perf_counter()
+                path = download(directory)
+                seconds = time.perf_counter() - started
+                results.append({
+                    "case": name,
+                    "seconds": round(seconds, 2),
+                    "mb_per_s": round(size_mb / seconds, 2),
+                    "verified": sha256_file(path) == expected,
+                })
+    finally:
+        server.shutdown()
+
+    return {
+        "benchmark": "segmented_download",
+        "app_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "size_mb": size_mb,
+        "rate_kb_per_connection": rate_kb,
+        "connections": connections,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-connection and segmented downloads")
+    parser.add_argument("--size", type=int, default=16, help="file size in MB")
+    parser.add_argument("--rate", type=int, default=2048, help="per-connection limit in KB/s (0 = none)")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS)
+    parser.add_argument("--ytdlp", action="store_true", help="also download through yt-dlp with both engines")
+    parser.add_argument("--json", metavar="FILE", help="also write results as JSON")
+    args = parser.parse_args()
+
+    report = run(max(1, args.size), max(0, args.rate), max(1, args.connections), args.ytdlp)
+
+    print("=" * 60)
+    print(f"{report['size_mb']} MB, {report['rate_kb_per_connection']} KB/s per connection  "
+          f"(v{report['app_version']}, Python {report['python']})")
+    print("=" * 60)
+    print(f"{'seconds':>9}  {'MB/s':>7}  {'ok':>3}  case")
+    for row in report["results"]:
+        ok = "yes" if row["verified"] else "NO"
+        print(f"{row['seconds']:>9}  {row['mb_per_s']:>7}  {ok:>3}  {row['case']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved: {args.json}")
+
+    return 0 if all(row["verified"] for row in report["results"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
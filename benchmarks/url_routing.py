@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Flare Download - URL routing benchmark
+Checks the routing index (url_router) against yt-dlp's own way of picking
+an extractor - every extractor's suitable() in order - on the test links
+yt-dlp ships for its extractors, then times a batch file's worth of
+links through both.
+
+Usage:
+    python benchmarks/url_routing.py                 # all test links, 10,000-line batch
+    python benchmarks/url_routing.py --lines 50000 --scan 500
+    python benchmarks/url_routing.py --json url_routing.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+try:
+    from version import __version__
+except ImportError:
+    __version__ = "unknown"
+
+
+def full_scan(extractors, url: str):
+    """yt-dlp's choice: the first extractor (in order) whose suitable() says yes."""
+    for ie in extractors:
+        if ie.suitable(url):
+            return ie
+    return None
+
+
+def test_links(extractors) -> list:
+    """Test links of all extractors, in extractor order, without repeats."""
+    links = []
+    for ie in extractors:
+        for test in ie.get_testcases(include_onlymatching=True):
+            url = test.get('url')
+            if isinstance(url, str):
+                links.append(url)
+    return list(dict.fromkeys(links))
+
+
+def batch_file(links: list, lines: int, seed: int) -> list:
+    """A batch of `lines` links: mostly known sites, one in ten on made-up hosts."""
+    rng = random.Random(seed)
+    web = [url for url in links if url.startswith(('http://', 'https://'))]
+    batch = []
+    for i in range(lines):
+        if i % 10 == 9:
+            batch.append(f"https://media{rng.randrange(200)}.example.org/files/{i}.mp4")
+        else:
+            batch.append(rng.choice(web))
+    return batch
+
+
+def run(lines: int, scan: int, seed: int) -> dict:
+    started = time.perf_counter()
+    from download_queue import load_yt_dlp
+    load_yt_dlp()
+    imported = time.perf_counter()
+    import url_router
+    index = url_router.routing_index()
+    built = time.perf_counter()
+
+    extractors = index.extractors
+    links = test_links(extractors)
+    # First pass compiles every extractor's regex, as yt-dlp does lazily
+    mismatches = []
+    for url in links:
+        routed, expected = index.extractor_for(url), full_scan(extractors, url)
+        if routed is not expected:
+            mismatches.append({
+                'url': url,
+                'routed': routed.ie_key() if routed else None,
+                'yt_dlp': expected.ie_key() if expected else None,
+            })
+
+    batch = batch_file(links, lines, seed)
+    url_router.extractor_for_url.cache_clear()
+    t = time.perf_counter()
+    supported, unsupported = url_router.split_supported(batch)
+    routed_s = time.perf_counter() - t
+
+    sample = batch[:scan]
+    t = time.perf_counter()
+    for url in sample:
+        full_scan(extractors, url)
+    scan_per_url = (time.perf_counter() - t) / max(1, len(sample))
+
+    return {
+        'benchmark': 'url_routing',
+        'app_version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'extractors': len(extractors),
+        'any_host_extractors': len(index.any_host),
+        'host_keys': len(index.by_key),
+        'import_s': round(imported - started, 3),
+        'index_build_s': round(built - imported, 3),
+        'test_links': len(links),
+        'mismatches': mismatches,
+        'batch_lines': len(batch),
+        'batch_supported': len(supported),
+        'batch_unsupported': len(unsupported),
+        'routed_batch_s': round(routed_s, 3),
+        'routed_us_per_url': round(routed_s / max(1, len(batch)) * 1e6, 1),
+        'full_scan_us_per_url': round(scan_per_url * 1e6, 1),
+        'full_scan_batch_s_estimate': round(scan_per_url * len(batch), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time Flare Download's URL routing index")
+    parser.add_argument('--lines', type=int, default=10000, help='links in the timed batch')
+    parser.add_argument('--scan', type=int, default=1000,
+                        help='links of the batch also timed through a full extractor scan')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', metavar='FILE', help='also write results as JSON')
+    args = parser.parse_args()
+
+    try:
+        report = run(max(1, args.lines), max(1, args.scan), args.seed)
+    except ImportError:
+        print("yt-dlp not installed - run: pip install yt-dlp", file=sys.stderr)
+        return 2
+
+    print("=" * 60)
+    print(f"URL routing  (v{report['app_version']}, Python {report['python']})")
+    print("=" * 60)
+    print(f"Extractors: {report['extractors']}  ({report['any_host_extractors']} checked for every host, "
+          f"{report['host_keys']} host keys)")
+    print(f"yt-dlp import: {report['import_s']} s   index build: {report['index_build_s']} s")
+    print(f"Test links: {report['test_links']}   routed differently from yt-dlp: {len(report['mismatches'])}")
+    for mismatch in report['mismatches'][:20]:
+        print(f"  {mismatch['url']}: {mismatch['routed']} instead of {mismatch['yt_dlp']}")
+    print(f"Batch of {report['batch_lines']} links ({report['batch_unsupported']} unsupported): "
+          f"{report['routed_batch_s']} s routed ({report['routed_us_per_url']} us/link), "
+          f"~{report['full_scan_batch_s_estimate']} s by full scan ({report['full_scan_us_per_url']} us/link)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved: {args.json}")
+
+    return 1 if report['mismatches'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
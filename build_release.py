@@ -14,7 +14,7 @@ from pathlib import Path
 
 # Import version info
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from version import __version__, __app_name__
+from version import __version__, __app_name__, APP_MODULES
 
 
 class ReleaseBuilder:
@@ -30,6 +30,7 @@ class ReleaseBuilder:
             'youtube_downloader.py',
             'updater.py',
             'version.py',
+            *APP_MODULES,
             'requirements.txt',
             'README.md',
             'LICENSE',
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Clipboard watcher
+Opt-in: video links copied anywhere are queued without pasting. The
+clipboard is read on a background thread - through the Win32 API on
+Windows (only after its change counter moves), pbpaste on macOS and
+wl-paste/xclip/xsel on Linux - so the window never waits for it. Where
+none of these exist the GUI reads Tk's clipboard and feed()s the text
+in. Links seen recently are ignored, and only links a specific yt-dlp
+extractor accepts are passed on.
+Part of the Flare ecosystem.
+"""
+
+import os
+import re
+import sys
+import queue
+import shutil
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from url_router import is_supported_url
+
+# Seconds between clipboard checks
+POLL_INTERVAL = 1.0
+# Links remembered so copying one again does not queue it twice
+RECENT_URLS = 500
+
+URL_PATTERN = re.compile(r'https?://[^\s<>"\']+', re.IGNORECASE)
+# Punctuation that ends a sentence rather than the link
+TRAILING = '.,;:!?)]}\''
+
+_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+
+def extract_urls(text: str) -> List[str]:
+    """http(s) links in a piece of text, in order, without repeats."""
+    urls = (match.group(0).rstrip(TRAILING) for match in URL_PATTERN.finditer(text or ''))
+    return list(dict.fromkeys(url for url in urls if url))
+
+
+# ── System clipboard ────────────────────────────────────────────────────
+
+def _win32_sequence() -> Optional[int]:
+    try:
+        import ctypes
+        return ctypes.windll.user32.GetClipboardSequenceNumber()
+    except (AttributeError, OSError):
+        return None
+
+
+def _win32_read() -> Optional[str]:
+    import ctypes
+    from ctypes import wintypes
+
+    CF_UNICODETEXT = 13
+    user32, kernel32 = ctypes.windll.user32, ctypes.windll.kernel32
+    user32.GetClipboardData.restype = wintypes.HANDLE
+    kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
+    kernel32.GlobalLock.restype = ctypes.c_void_p
+    kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
+
+    # Another program may have it open for a moment
+    for _ in range(5):
+        if user32.OpenClipboard(None):
+            break
+        threading.Event().wait(0.02)
+    else:
+        return None
+    try:
+        handle = user32.GetClipboardData(CF_UNICODETEXT)
+        if not handle:
+            return None
+        pointer = kernel32.GlobalLock(handle)
+        if not pointer:
+            return None
+        try:
+            return ctypes.wstring_at(pointer)
+        finally:
+            kernel32.GlobalUnlock(handle)
+    finally:
+        user32.CloseClipboard()
+
+
+def _command() -> Optional[List[str]]:
+    """Program that prints the clipboard, None if there is none."""
+    if sys.platform == 'darwin':
+        return ['pbpaste']
+    if os.environ.get('WAYLAND_DISPLAY') and shutil.which('wl-paste'):
+        return ['wl-paste', '--no-newline']
+    if os.environ.get('DISPLAY'):
+        if shutil.which('xclip'):
+            return ['xclip', '-selection', 'clipboard', '-out']
+        if shutil.which('xsel'):
+            return ['xsel', '--clipboard', '--output']
+    return None
+
+
+def system_reader() -> Optional[Callable[[], Optional[str]]]:
+    """A function returning the clipboard text, safe off the Tk thread; None if unavailable."""
+    if sys.platform == 'win32':
+        return _win32_read if _win32_sequence() is not None else None
+    command = _command()
+    if command is None:
+        return None
+
+    def read() -> Optional[str]:
+        try:
+            result = subprocess.run(command, capture_output=True, timeout=2,
+                                    stdin=subprocess.DEVNULL, creationflags=_NO_WINDOW)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return result.stdout.decode('utf-8', 'replace') if result.returncode == 0 else None
+
+    return read
+
+
+# ── Watcher ─────────────────────────────────────────────────────────────
+
+class ClipboardWatcher:
+    """
+    Background thread that hands new, supported links to `on_urls(urls)`
+    (called on that thread). It polls `read` every `interval` seconds -
+    on Windows only when the clipboard changed - and takes text pushed
+    with feed(). Whatever is on the clipboard when it starts is ignored.
+    """
+
+    def __init__(self, on_urls: Callable[[List[str]], None],
+                 read: Optional[Callable[[], Optional[str]]] = None,
+                 interval: float = POLL_INTERVAL,
+                 is_supported: Callable[[str], bool] = is_supported_url,
+                 remember: int = RECENT_URLS):
+        self.on_urls = on_urls
+        self.read = read
+        self.interval = interval
+        self.is_supported = is_supported
+        self.remember = remember
+        self._fed: 'queue.Queue[str]' = queue.Queue()
+        self._recent: 'OrderedDict[str, None]' = OrderedDict()
+        self._recent_lock = threading.Lock()
+        self._last_text: Optional[str] = None
+        self._last_sequence: Optional[int] = None
+        self._primed = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        # Fed text is already only what changed after the feeder started
+        self._primed = self.read is None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="clipboard-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def feed(self, text: str):
+        """Clipboard text read elsewhere (e.g. by Tk on the UI thread)."""
+        self._fed.put(text)
+
+    def remember_urls(self, urls: List[str]):
+        """Mark links as seen, e.g. ones queued by hand."""
+        with self._recent_lock:
+            for url in urls:
+                self._recent[url] = None
+                self._recent.move_to_end(url)
+            while len(self._recent) > self.remember:
+                self._recent.popitem(last=False)
+
+    def _run(self, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                text = self._fed.get(timeout=self.interval)
+            except queue.Empty:
+                text = self._poll()
+            else:
+                if stop.is_set():
+                    self._fed.put(text)  # for the thread of the next start()
+            if stop.is_set():
+                return
+            if not self._primed:
+                self._primed = True
+                self._last_text = text
+                continue
+            if text is None or text == self._last_text:
+                continue
+            self._last_text = text
+            try:
+                self._handle(text)
+            except Exception:
+                pass  # a bad clipboard must not end the watcher
+
+    def _poll(self) -> Optional[str]:
+        if self.read is None:
+            return None
+        if self.read is _win32_read:
+            sequence = _win32_sequence()
+            if sequence == self._last_sequence:
+                return None
+            self._last_sequence = sequence
+        try:
+            return self.read()
+        except Exception:
+            return None
+
+    def _handle(self, text: str):
+        with self._recent_lock:
+            urls = [url for url in extract_urls(text) if url not in self._recent]
+        if not urls:
+            return
+        # Unsupported links are remembered too, so they are checked once
+        self.remember_urls(urls)
+        urls = [url for url in urls if self.is_supported(url)]
+        if urls:
+            self.on_urls(urls)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Cookie store
+Sign-in cookies for every job, loaded once from a cookies.txt file or a
+browser profile and kept in one in-memory jar that all downloads, probes
+and playlist listings share. Cookies the sites refresh along the way go
+back to the cookies.txt (written to a temporary file and swapped in);
+cookies read from a browser stay in memory, the browser keeps its own.
+After a sign-in failure the source is read again - at most once per
+RELOAD_INTERVAL for all jobs together - so a re-exported file or a fresh
+browser login is picked up without a restart.
+Part of the Flare ecosystem.
+"""
+
+import os
+import re
+import copy
+import time
+import threading
+from typing import Callable, FrozenSet, Optional, Tuple
+
+from download_queue import load_yt_dlp
+
+# Seconds between re-reads of the source after sign-in failures
+RELOAD_INTERVAL = 60.0
+
+BROWSER_SPEC = re.compile(r'''(?x)
+    (?P<name>[^+:]+)
+    (?:\s*\+\s*(?P<keyring>[^:]+))?
+    (?:\s*:\s*(?!:)(?P<profile>.+?))?
+    (?:\s*::\s*(?P<container>.+))?
+''')
+
+
+def parse_browser(spec: str) -> Tuple[str, Optional[str], Optional[str], Optional[str]]:
+    """
+    "firefox", "chrome:Profile 1", "chromium+gnomekeyring:Default" (yt-dlp's
+    BROWSER[+KEYRING][:PROFILE][::CONTAINER]) -> (browser, profile, keyring,
+    container). Raises ValueError for an unknown browser or keyring.
+    """
+    match = BROWSER_SPEC.fullmatch(spec.strip())
+    if match is None:
+        raise ValueError(f"Invalid browser for cookies: {spec!r}")
+    name, keyring, profile, container = match.group('name', 'keyring', 'profile', 'container')
+    name = name.strip().lower()
+    load_yt_dlp()
+    from yt_dlp.cookies import SUPPORTED_BROWSERS, SUPPORTED_KEYRINGS
+
+    if name not in SUPPORTED_BROWSERS:
+        raise ValueError(f"Unsupported browser for cookies: {name!r} "
+                         f"(choose from {', '.join(sorted(SUPPORTED_BROWSERS))})")
+    if keyring is not None:
+        keyring = keyring.strip().upper()
+        if keyring not in SUPPORTED_KEYRINGS:
+            raise ValueError(f"Unsupported keyring: {keyring!r} "
+                             f"(choose from {', '.join(sorted(SUPPORTED_KEYRINGS))})")
+    return name, profile, keyring, container
+
+
+def _fingerprint(jar) -> FrozenSet[tuple]:
+    return frozenset((c.domain, c.path, c.name, c.value, c.expires) for c in jar)
+
+
+class CookieStore:
+    """
+    One shared cookie jar from `cookie_file` or `browser` (both may be
+    given; the file then also receives refreshed cookies). Nothing is read
+    until the first jar()/attach(), which needs yt-dlp.
+    `log(message)` is told about loading, saving and failures.
+    """
+
+    def __init__(self, cookie_file: Optional[str] = None, browser: Optional[str] = None,
+                 log: Optional[Callable[[str], None]] = None,
+                 reload_interval: float = RELOAD_INTERVAL):
+        self.cookie_file = os.path.abspath(os.path.expanduser(cookie_file)) if cookie_file else None
+        self.browser = browser or None
+        self.log = log
+        self.reload_interval = reload_interval
+        # Bumped on every (re)load that changed the cookies
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._jar = None
+        self._saved: FrozenSet[tuple] = frozenset()
+        self._file_mtime: Optional[float] = None
+        self._loaded_at = 0.0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.cookie_file or self.browser)
+
+    def _log(self, message: str):
+        if self.log:
+            self.log(message)
+
+    # ── Loading ─────────────────────────────────────────────────────────
+
+    def jar(self):
+        """The shared jar (a yt-dlp YoutubeDLCookieJar), loaded on first use."""
+        with self._lock:
+            if self._jar is None:
+                from yt_dlp.cookies import YoutubeDLCookieJar
+
+                self._jar = YoutubeDLCookieJar(self.cookie_file)
+                self._load(initial=True)
+            return self._jar
+
+    def attach(self, ydl):
+        """Give a YoutubeDL instance the shared jar (before its first request)."""
+        if self.configured:
+            ydl.__dict__['cookiejar'] = self.jar()
+        return ydl
+
+    def _mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.cookie_file) if self.cookie_file else None
+        except OSError:
+            return None
+
+    def _load(self, initial: bool = False) -> bool:
+        """Read the source into the jar (lock held); True if a reload changed the cookies."""
+        load_yt_dlp()
+        from yt_dlp.cookies import load_cookies
+
+        self._loaded_at = time.monotonic()
+        try:
+            browser = parse_browser(self.browser) if self.browser else None
+            # yt-dlp does not create a missing file; it is written on save
+            cookie_file = self.cookie_file if self._mtime() is not None else None
+            fresh = load_cookies(cookie_file, browser, None)
+        except Exception as e:
+            cause = e.__context__ or e
+            self._log(f"Could not load cookies: {cause}")
+            return False
+
+        jar = self._jar
+        with jar._cookies_lock:
+            before = _fingerprint(jar)
+            jar.clear()
+            for cookie in fresh:
+                jar.set_cookie(cookie)
+            after = _fingerprint(jar)
+        self._file_mtime = self._mtime()
+        self._saved = after
+        source = " and ".join(filter(None, (self.browser, self.cookie_file and os.path.basename(self.cookie_file))))
+        self._log(f"Loaded {len(after)} cookies from {source}")
+        if initial or after == before:
+            return False
+        self.generation += 1
+        return True
+
+    def refresh(self, since: int) -> bool:
+        """
+        After a sign-in failure of a job that started at generation
+        `since`: True if the cookies are now different, either because
+        another job already reloaded them or because the source changed
+        (read again at most once per reload_interval).
+        """
+        if not self.configured:
+            return False
+        self.jar()
+        with self._lock:
+            if self.generation != since:
+                return True
+            if time.monotonic() - self._loaded_at < self.reload_interval:
+                return False
+            if not self.browser and self._mtime() == self._file_mtime:
+                return False  # the file has not been touched
+            return self._load()
+
+    # ── Saving ──────────────────────────────────────────────────────────
+
+    def save(self) -> bool:
+        """Write changed cookies back to the cookie file; True if written."""
+        with self._lock:
+            jar = self._jar
+            if jar is None or not self.cookie_file:
+                return False
+            with jar._cookies_lock:
+                current = _fingerprint(jar)
+                if current == self._saved:
+                    return False
+                # save() gives session cookies an expiry of 0, after which
+                # they would count as expired; copies take that instead
+                snapshot = type(jar)()
+                for cookie in jar:
+                    snapshot.set_cookie(copy.copy(cookie))
+            tmp = self.cookie_file + '.tmp'
+            try:
+                snapshot.save(tmp)
+                os.replace(tmp, self.cookie_file)
+            except OSError as e:
+                self._log(f"Could not save cookies: {e}")
+                return False
+            self._saved = current
+            self._file_mtime = self._mtime()
+            return True
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Download archive
+Remembers which videos were already downloaded so repeat batches skip
+them before any network request. The file uses yt-dlp's
+`--download-archive` format ("<extractor> <id>" per line), so archives
+can be shared with the yt-dlp command line.
+Part of the Flare ecosystem.
+"""
+
+import os
+import threading
+from functools import lru_cache
+from typing import Iterator, Optional
+
+from paths import get_data_path
+from download_queue import load_yt_dlp
+from url_router import extractor_for_url
+
+
+@lru_cache(maxsize=4096)
+def archive_id_for_url(url: str) -> Optional[str]:
+    """
+    "<extractor> <id>" for a URL, worked out from the URL alone (the same
+    check yt-dlp runs before extracting). None if no specific extractor
+    matches or the id is not part of the URL.
+    """
+    ie = extractor_for_url(url)
+    if ie is None:
+        return None
+    try:
+        temp_id = ie.get_temp_id(url)
+    except Exception:
+        temp_id = None
+    if temp_id is None:
+        return None
+    return load_yt_dlp().utils.make_archive_id(ie.ie_key(), temp_id)
+
+
+class DownloadArchive:
+    """
+    Set of archive ids loaded once into memory and appended to on disk.
+
+    Instances can be passed straight to yt-dlp as the `download_archive`
+    option: yt-dlp then checks membership with `in` and records new
+    downloads through add(), without re-reading the file per job.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_data_path("archive.txt")
+        self._lock = threading.Lock()
+        self._ids = set()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._ids = {line.strip() for line in f if line.strip()}
+        except OSError:
+            self._ids = set()
+
+    def __contains__(self, archive_id) -> bool:
+        with self._lock:
+            return archive_id in self._ids
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ids)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._ids))
+
+    def add(self, archive_id: str):
+        """Record a finished download (appends one line to the file)."""
+        archive_id = archive_id.strip()
+        if not archive_id:
+            return
+        with self._lock:
+            if archive_id in self._ids:
+                return
+            self._ids.add(archive_id)
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(archive_id + '\n')
+            except OSError:
+                pass
+
+    def has_url(self, url: str) -> bool:
+        """True if the URL's video is recorded - no network access."""
+        archive_id = archive_id_for_url(url)
+        return archive_id is not None and archive_id in self
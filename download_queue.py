@@ -0,0 +1,759 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Download Queue
+Runs yt-dlp jobs on a bounded pool of worker threads.
+Part of the Flare ecosystem.
+"""
+
+import os
+import re
+import threading
+import itertools
+import time
+import uuid
+from collections import deque
+from typing import Optional, Callable, Dict, List
+from urllib.parse import urlsplit
+
+from metrics import JobMetrics
+from retry_policy import HostUnavailable
+from ydl_options import build_ydl_opts
+
+
+DEFAULT_WORKERS = 3
+MAX_WORKERS = 8
+# Merging/conversion runs on its own pool, one slot per CPU core
+DEFAULT_POSTPROCESS_WORKERS = os.cpu_count() or 2
+# Parallel downloads per site unless configured otherwise (see site_of)
+DEFAULT_SITE_LIMITS = {"youtube.com": 2}
+SITE_ALIASES = {"youtu.be": "youtube.com", "youtube-nocookie.com": "youtube.com"}
+
+SIGN_IN_ERROR = "Video requires sign-in (age-restricted)"
+# Shown instead when no cookies are set up
+SIGN_IN_HINT = "Video requires sign-in - set up cookies (see README)"
+
+# yt-dlp and its extractor registry dominate start-up time, so they are
+# imported on first use (or warmed in the background by preload_yt_dlp)
+_yt_dlp = None
+_yt_dlp_lock = threading.Lock()
+_preload_thread = None
+
+
+def load_yt_dlp():
+    """Import yt-dlp and its extractor list once; safe from any thread."""
+    global _yt_dlp
+    if _yt_dlp is None:
+        with _yt_dlp_lock:
+            if _yt_dlp is None:
+                import yt_dlp
+                from yt_dlp.extractor import gen_extractor_classes
+                gen_extractor_classes()
+                _yt_dlp = yt_dlp
+    return _yt_dlp
+
+
+def preload_yt_dlp():
+    """Warm the yt-dlp import and URL routing index on a background thread (idempotent)."""
+    global _preload_thread
+    if _yt_dlp is not None or _preload_thread is not None:
+        return
+
+    def _load():
+        try:
+            load_yt_dlp()
+        except ImportError:
+            return
+        # Links are checked against it as soon as they are pasted
+        from url_router import routing_index
+        routing_index()
+
+    _preload_thread = threading.Thread(target=_load, daemon=True)
+    _preload_thread.start()
+
+
+class JobState:
+    """Lifecycle states of a download job"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    # Downloaded; waiting for a post-processing slot
+    DOWNLOADED = "downloaded"
+    PROCESSING = "processing"
+    DONE = "done"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    FINISHED = (DONE, SKIPPED, FAILED, CANCELLED)
+
+
+class DownloadJob:
+    """A single URL to download, with its options and live state"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, url: str, output_dir: str, fmt: str = "mp4",
+                 quality: str = "Best", is_audio: bool = False,
+                 on_finish: Optional[Callable[['DownloadJob'], None]] = None,
+                 format_spec: Optional[str] = None, key: Optional[str] = None):
+        self.id = next(self._ids)
+        # Stable across restarts (see job_store.JobStore)
+        self.key = key or uuid.uuid4().hex[:12]
+        self.url = url
+        self.site = site_of(url)
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.quality = quality
+        self.is_audio = is_audio
+        self.on_finish = on_finish
+        # Exact yt-dlp format selector (e.g. from a probe); overrides quality
+        self.format_spec = format_spec
+        # Bytes received per partial file, for bandwidth accounting and resume
+        self.received: Dict[str, int] = {}
+
+        self.state = JobState.QUEUED
+        self.progress = 0.0
+        self.speed = ''
+        self.eta = ''
+        self.title = None
+        self.error = None
+        # Final file, once known
+        self.filepath: Optional[str] = None
+        self.metrics = JobMetrics()
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in JobState.FINISHED
+
+    def cancel(self):
+        """Request cancellation; the worker stops at the next progress tick."""
+        self._cancel.set()
+
+    def describe(self) -> str:
+        """Short one-line label for logs and status text"""
+        return self.title or self.url
+
+
+def site_of(url: str) -> str:
+    """
+    The site a URL belongs to, for per-site limits: "youtube.com" for
+    www.youtube.com, m.youtube.com and youtu.be alike.
+    """
+    try:
+        host = (urlsplit(url).hostname or '').lower()
+    except ValueError:
+        return ''
+    labels = host.split('.')
+    if not labels[-1].isalpha():
+        return host  # IP address
+    # Keep one more label for two-part suffixes such as co.uk or com.au
+    keep = 3 if len(labels) > 2 and len(labels[-2]) <= 3 and len(labels[-1]) == 2 else 2
+    site = '.'.join(labels[-keep:])
+    return SITE_ALIASES.get(site, site)
+
+
+def progress_percent(d: dict) -> float:
+    """Percentage complete from a yt-dlp progress dict"""
+    if d.get('total_bytes'):
+        return (d.get('downloaded_bytes', 0) / d['total_bytes']) * 100
+    if d.get('total_bytes_estimate'):
+        return (d.get('downloaded_bytes', 0) / d['total_bytes_estimate']) * 100
+    if '_percent_str' in d:
+        try:
+            return float(d['_percent_str'].replace('%', '').strip())
+        except ValueError:
+            return 0
+    return 0
+
+
+def needs_sign_in(error_msg: str) -> bool:
+    """True for errors that cookies of a signed-in account may fix"""
+    # Whole word only: "webpage" is in many unrelated errors
+    return "Sign in" in error_msg or bool(re.search(r'\bage\b', error_msg.lower()))
+
+
+def friendly_error(error_msg: str) -> str:
+    """Turn a yt-dlp error into a short message for the user"""
+    if "HTTP Error 429" in error_msg or "Too Many Requests" in error_msg:
+        return "Rate limited by the site - try again later"
+    if "is not responding (paused" in error_msg:
+        return "Site keeps failing - paused, try again later"
+    if "Video unavailable" in error_msg:
+        return "Video unavailable or private"
+    if needs_sign_in(error_msg):
+        return SIGN_IN_ERROR
+    if "HTTP Error 403" in error_msg:
+        return "Access forbidden - try a different video"
+    if "HTTP Error 404" in error_msg:
+        return "Video not found"
+    if "ffmpeg" in error_msg.lower() or "ffprobe" in error_msg.lower():
+        return "FFmpeg needed for this format - try MP4 video or M4A audio"
+    if "Unsupported URL" in error_msg:
+        return "Unsupported URL - check the link"
+    if "No video formats" in error_msg:
+        return "No downloadable formats found"
+    # Truncate long error messages
+    return error_msg.split('\n')[0][:80]
+
+
+class DownloadQueue:
+    """
+    FIFO job queue drained by at most `max_workers` parallel downloads.
+
+    `on_update(job)` is called from worker threads whenever a job changes
+    state or reports progress; GUI callers must marshal it onto their own
+    event loop.
+
+    With an `archive` (see download_archive.DownloadArchive), URLs already
+    recorded are skipped before any network request and new downloads are
+    recorded by yt-dlp. With an `info_cache` (see info_cache.InfoCache),
+    a URL extracted recently (e.g. by a preview) is not extracted again.
+
+    `engine` is "native" (yt-dlp's downloaders) or "segmented" (progressive
+    files over `connections` parallel range requests, see segmented.py).
+    With a `bandwidth` manager (see bandwidth.BandwidthManager), every
+    received block is throttled against its aggregate and per-job limits.
+    With a `store` (see job_store.JobStore), unfinished jobs are saved as
+    they progress; jobs interrupted by shutdown() stay saved and restore()
+    queues them again, continuing from their partial files. With a
+    `retry_policy` (see retry_policy.RetryPolicy), retries back off per
+    host and hosts that keep failing are paused for every job.
+
+    `site_limits` caps parallel downloads per site (e.g. {"youtube.com": 2});
+    queued jobs for a site at its cap wait while later jobs for other
+    sites start. Finished jobs leave their cookies and open connections
+    in a session pool for the next job with the same network options.
+
+    Merging and conversion run on a separate pool of `postprocess_workers`
+    threads: a finished download frees its slot right away (state
+    DOWNLOADED) and is post-processed (PROCESSING) alongside the next
+    downloads.
+
+    Video is merged/remuxed into the chosen container by stream copy
+    whenever the codecs allow it (format_plan); re-encodes that cannot be
+    avoided use the x264 `encode_preset`. FFmpeg is looked up once, in
+    `ffmpeg_location` (a directory or the executable) and then next to the
+    app, on PATH and in the usual install directories.
+
+    Every job carries timings and counters (job.metrics); finished jobs
+    are handed to `metrics` (a metrics.MetricsRecorder) if given.
+
+    With `cookies` (a cookie_store.CookieStore), every job signs in with
+    the same in-memory cookie jar, refreshed cookies are saved as jobs
+    finish, and a job that fails for want of sign-in is run once more if
+    the cookies have changed since it started.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS,
+                 on_update: Optional[Callable[[DownloadJob], None]] = None,
+                 log: Optional[Callable[[str], None]] = None,
+                 archive=None, info_cache=None,
+                 engine: str = "native", connections: Optional[int] = None,
+                 bandwidth=None, store=None, retry_policy=None,
+                 site_limits: Optional[Dict[str, int]] = None,
+                 postprocess_workers: int = DEFAULT_POSTPROCESS_WORKERS,
+                 encode_preset: Optional[str] = None,
+                 ffmpeg_location: Optional[str] = None,
+                 metrics=None, cookies=None):
+        self.max_workers = max(1, min(max_workers, MAX_WORKERS))
+        self.on_update = on_update
+        self.log = log
+        self.archive = archive
+        self.info_cache = info_cache
+        self.engine = engine
+        self.connections = connections
+        self.bandwidth = bandwidth
+        self.store = store
+        self.retry_policy = retry_policy
+        self.site_limits = dict(DEFAULT_SITE_LIMITS if site_limits is None else site_limits)
+        self.postprocess_workers = max(1, postprocess_workers)
+        self.encode_preset = encode_preset
+        self.ffmpeg_location = ffmpeg_location or None
+        self._ffmpeg_noted = False
+        self.metrics = metrics
+        self.cookies = cookies
+
+        from ydl_session import SessionPool
+        self.sessions = SessionPool(max_idle=MAX_WORKERS)
+
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._running: Dict[int, DownloadJob] = {}
+        # Downloaded jobs waiting for / in post-processing
+        self._pp_pending = deque()
+        self._processing: Dict[int, DownloadJob] = {}
+        self._jobs: Dict[int, DownloadJob] = {}
+        self._idle = threading.Event()
+        self._idle.set()
+        self._closed = False
+
+    def _log(self, message: str):
+        if self.log:
+            self.log(message)
+
+    def _notify(self, job: DownloadJob):
+        if self.store is not None and not job.finished:
+            self.store.update(job)
+        if self.on_update:
+            try:
+                self.on_update(job)
+            except Exception:
+                pass
+
+    # ── Public API ──────────────────────────────────────────────────────
+
+    def submit(self, url: str, output_dir: str, fmt: str = "mp4",
+               quality: str = "Best", is_audio: bool = False,
+               on_finish: Optional[Callable[[DownloadJob], None]] = None,
+               format_spec: Optional[str] = None) -> DownloadJob:
+        """
+        Queue a URL for download and return its job.
+        `on_finish(job)` runs on the worker thread once the job has ended.
+        """
+        return self._enqueue(DownloadJob(url, output_dir, fmt, quality, is_audio, on_finish, format_spec))
+
+    def restore(self) -> List[DownloadJob]:
+        """Queue the jobs an earlier run left unfinished (needs a store)."""
+        if self.store is None:
+            return []
+        jobs = []
+        for record in self.store.pending():
+            job = DownloadJob(
+                record['url'], record.get('output_dir') or '.', record.get('fmt') or 'mp4',
+                record.get('quality') or 'Best', bool(record.get('is_audio')),
+                format_spec=record.get('format_spec'), key=record['key'],
+            )
+            job.title = record.get('title')
+            job.received = dict(record.get('parts') or {})
+            jobs.append(self._enqueue(job))
+        return jobs
+
+    def _enqueue(self, job: DownloadJob) -> DownloadJob:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Download queue is shut down")
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._idle.clear()
+        self._notify(job)
+        self._dispatch()
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued or running job. Returns False if unknown/finished."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.cancel()
+            queued = job in self._pending
+            if queued:
+                self._pending.remove(job)
+                job.state = JobState.CANCELLED
+        if queued:
+            self._notify(job)
+            self._job_ended(job)
+            self._check_idle()
+        return True
+
+    def cancel_all(self):
+        """Cancel every queued and running job."""
+        with self._lock:
+            ids = [job_id for job_id, job in self._jobs.items() if not job.finished]
+        for job_id in ids:
+            self.cancel(job_id)
+
+    def set_max_workers(self, count: int):
+        """Resize the pool; running jobs are never interrupted."""
+        with self._lock:
+            self.max_workers = max(1, min(count, MAX_WORKERS))
+        self._dispatch()
+
+    def set_site_limits(self, limits: Dict[str, int]):
+        """Replace the per-site caps; jobs already running are not affected."""
+        with self._lock:
+            self.site_limits = dict(limits)
+        self._dispatch()
+
+    def jobs(self) -> List[DownloadJob]:
+        """All jobs submitted so far, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def get(self, job_id: int) -> Optional[DownloadJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_count(self) -> int:
+        with self._lock:
+            return len(self._running)
+
+    def processing_count(self) -> int:
+        """Jobs downloaded and waiting for or in post-processing."""
+        with self._lock:
+            return len(self._processing)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def is_busy(self) -> bool:
+        return not self._idle.is_set()
+
+    def clear_finished(self):
+        """Forget finished jobs so long sessions don't accumulate state."""
+        with self._lock:
+            self._jobs = {job_id: job for job_id, job in self._jobs.items() if not job.finished}
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the queue is drained. Returns False on timeout."""
+        return self._idle.wait(timeout)
+
+    def shutdown(self, cancel: bool = True):
+        """
+        Stop accepting jobs, optionally cancelling outstanding ones. With a
+        store, cancelled jobs stay saved for restore() on the next start.
+        """
+        with self._lock:
+            self._closed = True
+        if cancel:
+            self.cancel_all()
+        if self.store is not None:
+            self.store.flush()
+        self.sessions.close()
+
+    # ── Workers ─────────────────────────────────────────────────────────
+
+    def _next_job(self) -> Optional[DownloadJob]:
+        """Take the oldest queued job whose site is under its cap (lock held)."""
+        running: Dict[str, int] = {}
+        for job in self._running.values():
+            running[job.site] = running.get(job.site, 0) + 1
+        for job in self._pending:
+            limit = self.site_limits.get(job.site)
+            if not limit or running.get(job.site, 0) < limit:
+                self._pending.remove(job)
+                return job
+        return None
+
+    def _dispatch(self):
+        """Start queued jobs while there are free worker slots."""
+        to_start = []
+        with self._lock:
+            while self._pending and len(self._running) < self.max_workers:
+                job = self._next_job()
+                if job is None:
+                    break
+                job.state = JobState.RUNNING
+                self._running[job.id] = job
+                to_start.append(job)
+
+        for job in to_start:
+            self._notify(job)
+            threading.Thread(target=self._worker, args=(job,), daemon=True).start()
+
+    def _worker(self, job: DownloadJob):
+        postprocess = None
+        job.metrics.start()
+        cookies = self.cookies
+        generation = cookies.generation if cookies is not None else 0
+        try:
+            postprocess = self._run(job)
+            if job.error == SIGN_IN_ERROR and not job.cancelled:
+                if cookies is not None and cookies.refresh(generation):
+                    self._log("Sign-in required - trying again with the reloaded cookies")
+                    job.error = None
+                    job.state = JobState.RUNNING
+                    postprocess = self._run(job)
+                if job.error == SIGN_IN_ERROR and (cookies is None or not cookies.configured):
+                    job.error = SIGN_IN_HINT
+        except Exception as e:
+            # Setup before yt-dlp starts (archive, FFmpeg, options, session)
+            # must still leave the job in a final state
+            postprocess = None
+            if job.cancelled:
+                job.state = JobState.CANCELLED
+            else:
+                job.error = friendly_error(str(e))
+                job.state = JobState.FAILED
+        finally:
+            job.metrics.download_done()
+            with self._lock:
+                self._running.pop(job.id, None)
+                if postprocess is not None:
+                    self._processing[job.id] = job
+                    self._pp_pending.append((job, postprocess))
+            if self.bandwidth is not None:
+                self.bandwidth.release(job.id)
+            if postprocess is None:
+                self._finish(job)
+            else:
+                self._notify(job)
+                self._dispatch_postprocess()
+            self._dispatch()
+            self._check_idle()
+
+    def _finish(self, job: DownloadJob):
+        job.metrics.end(job.filepath)
+        if self.cookies is not None:
+            self.cookies.save()
+        if self.metrics is not None:
+            self.metrics.record(job)
+        if job.on_finish:
+            try:
+                job.on_finish(job)
+            except Exception:
+                pass
+        self._notify(job)
+        self._job_ended(job)
+
+    def _dispatch_postprocess(self):
+        """Start queued post-processing while there are free slots."""
+        to_start = []
+        with self._lock:
+            busy = len(self._processing) - len(self._pp_pending)
+            while self._pp_pending and busy < self.postprocess_workers:
+                to_start.append(self._pp_pending.popleft())
+                busy += 1
+        for job, postprocess in to_start:
+            threading.Thread(target=self._postprocess_worker, args=(job, postprocess), daemon=True).start()
+
+    def _postprocess_worker(self, job: DownloadJob, postprocess: Callable[[], None]):
+        try:
+            if job.cancelled:
+                job.state = JobState.CANCELLED
+            else:
+                job.state = JobState.PROCESSING
+                self._notify(job)
+                job.metrics.postprocess_start()
+                job.filepath = postprocess() or job.filepath
+                job.metrics.postprocess_done()
+                job.state = JobState.DONE
+                self._log(f"Downloaded: {job.title}")
+        except Exception as e:
+            job.error = friendly_error(str(e))
+            job.state = JobState.FAILED
+        finally:
+            with self._lock:
+                self._processing.pop(job.id, None)
+            self._finish(job)
+            self._dispatch_postprocess()
+            self._check_idle()
+
+    def _job_ended(self, job: DownloadJob):
+        """Drop a finished job from the store, unless shutdown interrupted it."""
+        if self.store is None:
+            return
+        if job.state == JobState.CANCELLED and self._closed:
+            self.store.update(job, force=True)
+        else:
+            self.store.remove(job)
+
+    def _check_idle(self):
+        with self._lock:
+            if not self._pending and not self._running and not self._processing:
+                self._idle.set()
+
+    def _progress_hook(self, job: DownloadJob, d: dict):
+        """yt-dlp progress callback for one job."""
+        if job.cancelled:
+            raise load_yt_dlp().utils.DownloadCancelled("Cancelled by user")
+
+        job.metrics.progress(d)
+        if d['status'] == 'downloading':
+            self._record_received(job, d)
+            job.progress = progress_percent(d)
+            job.speed = d.get('_speed_str', '')
+            job.eta = d.get('_eta_str', '')
+            self._notify(job)
+        elif d['status'] == 'finished':
+            # Sent per file (video, then audio); the job stays RUNNING until
+            # yt-dlp returns, and _postprocess_worker marks it PROCESSING
+            filename = d.get('filename')
+            self._log(f"File downloaded: {os.path.basename(filename)}" if filename else "File downloaded")
+
+    def _record_received(self, job: DownloadJob, d: dict):
+        """
+        Note how far the current file got and charge the bytes received
+        since the last call to the bandwidth limits.
+        """
+        key = d.get('tmpfilename') or d.get('filename')
+        received = d.get('downloaded_bytes') or 0
+        with self._lock:
+            previous = job.received.get(key)
+            job.received[key] = received
+        # The first report may include a resumed .part file; do not charge it
+        if self.bandwidth is None or previous is None:
+            return
+        self.bandwidth.throttle(job.id, received - previous, cancelled=lambda: job.cancelled)
+        if job.cancelled:
+            raise load_yt_dlp().utils.DownloadCancelled("Cancelled by user")
+
+    def _extract_and_download(self, ydl, job: DownloadJob) -> Optional[dict]:
+        """Download `job`, reusing cached extractor output when it is still fresh."""
+        from info_cache import extract_raw_info
+
+        yt_dlp = load_yt_dlp()
+        cache = self.info_cache
+        try:
+            raw, from_cache = extract_raw_info(ydl, job.url, cache, for_download=True)
+        finally:
+            job.metrics.extract_done()
+        if raw is None:
+            return None
+
+        if from_cache:
+            self._log("Using cached video info")
+            try:
+                return ydl.process_ie_result(raw, download=True)
+            except yt_dlp.utils.DownloadError:
+                if job.cancelled:
+                    raise
+                # Most likely the signed stream URLs were revoked early
+                self._log("Cached info is stale, extracting again...")
+                cache.invalidate(job.url)
+                raw, _ = extract_raw_info(ydl, job.url, cache, for_download=True)
+                job.metrics.extract_done()
+                if raw is None:
+                    return None
+
+        return ydl.process_ie_result(raw, download=True)
+
+    def _add_format_plan(self, ydl, job: DownloadJob, ffmpeg):
+        from format_plan import DEFAULT_PRESET, VideoPlan, format_plan_pp_class
+
+        def on_plan(plan):
+            if plan.action == VideoPlan.KEEP:
+                self._log(f"Note: {plan.describe()}")
+            elif plan.reencode:
+                self._log(f"Re-encoding needed: {plan.describe()} - this can take a while")
+            else:
+                self._log(f"Format: {plan.describe()}")
+
+        pp = format_plan_pp_class()(ydl, job.fmt, self.encode_preset or DEFAULT_PRESET,
+                                    on_plan=on_plan, ffmpeg=ffmpeg)
+        ydl.add_post_processor(pp, when='video')
+
+    def _timing_hook(self) -> Callable[[dict], None]:
+        """Post-processor hook logging how long merging/remuxing/re-encoding took."""
+        names = {'Merger': "Merge", 'VideoRemuxer': "Remux", 'VideoConvertor': "Re-encode"}
+        started = {}
+
+        def hook(d):
+            name = names.get(d.get('postprocessor'))
+            if name is None:
+                return
+            if d.get('status') == 'started':
+                started[name] = time.monotonic()
+            elif d.get('status') == 'finished' and name in started:
+                self._log(f"{name} took {time.monotonic() - started.pop(name):.1f}s")
+
+        return hook
+
+    def _run(self, job: DownloadJob) -> Optional[Callable[[], None]]:
+        """Download `job`; returns its post-processing step if that still has to run."""
+        yt_dlp = load_yt_dlp()
+
+        archive = self.archive
+        if archive is not None and archive.has_url(job.url):
+            job.progress = 100.0
+            job.state = JobState.SKIPPED
+            self._log(f"Already downloaded, skipping: {job.url[:70]}")
+            return
+
+        self._log(f"Starting download: {job.url[:70]}...")
+
+        from ffmpeg_locator import resolve_ffmpeg
+        ffmpeg = resolve_ffmpeg(self.ffmpeg_location)
+        if not self._ffmpeg_noted:
+            self._ffmpeg_noted = True
+            if ffmpeg is None:
+                self._log("Note: FFmpeg not found, some formats may not work")
+            else:
+                self._log(f"Using FFmpeg {ffmpeg.version} ({ffmpeg.location})")
+
+        from ydl_session import flare_youtube_dl
+
+        concurrent_fragments = None
+        if self.engine == "segmented":
+            from segmented import DEFAULT_CONNECTIONS
+            concurrent_fragments = self.connections or DEFAULT_CONNECTIONS
+
+        ydl_opts = build_ydl_opts(
+            job.output_dir, job.fmt, job.quality, job.is_audio,
+            ffmpeg_location=ffmpeg.location if ffmpeg else None,
+            progress_hooks=[lambda d: self._progress_hook(job, d)],
+            download_archive=archive,
+            format_spec=job.format_spec,
+            concurrent_fragments=concurrent_fragments,
+            has_ffmpeg=ffmpeg is not None,
+        )
+        if self.bandwidth is not None and self.bandwidth.enabled:
+            from bandwidth import BLOCK_SIZE
+            # Small fixed blocks keep throttling smooth
+            ydl_opts['buffersize'] = BLOCK_SIZE
+            ydl_opts['noresizebuffer'] = True
+        stats_key = None
+        if self.retry_policy is not None:
+            from retry_policy import stats_key_for_url
+            stats_key = stats_key_for_url(job.url)
+            self.retry_policy.apply(ydl_opts, stats_key, on_retry=job.metrics.retry)
+        job.metrics.extractor = stats_key
+
+        if not job.is_audio:
+            ydl_opts['postprocessor_hooks'] = [self._timing_hook()]
+
+        session = self.sessions.acquire(ydl_opts)
+        try:
+            with flare_youtube_dl()(ydl_opts, retry_policy=self.retry_policy,
+                                    segmented=self.engine == "segmented",
+                                    stats_key=stats_key or 'generic',
+                                    cancelled=lambda: job.cancelled,
+                                    session=session,
+                                    # Streamed conversion cannot be throttled
+                                    stream_audio=not (self.bandwidth and self.bandwidth.enabled),
+                                    defer_postprocessing=True,
+                                    on_retry=job.metrics.retry,
+                                    cookies=self.cookies) as ydl:
+                if not job.is_audio:
+                    self._add_format_plan(ydl, job, ffmpeg)
+                info = self._extract_and_download(ydl, job)
+            if info:
+                job.title = info.get('title', 'Unknown')
+                job.metrics.extractor = info.get('extractor') or job.metrics.extractor
+                downloads = info.get('requested_downloads') or [info]
+                job.filepath = downloads[-1].get('filepath')
+                job.progress = 100.0
+                if ydl.deferred:
+                    job.state = JobState.DOWNLOADED
+                    return ydl.run_deferred
+                job.state = JobState.DONE
+                self._log(f"Downloaded: {job.title}")
+            else:
+                job.error = "Could not extract video info"
+                job.state = JobState.FAILED
+        except yt_dlp.utils.DownloadCancelled:
+            job.state = JobState.CANCELLED
+            self._log("Download cancelled")
+        except yt_dlp.utils.DownloadError as e:
+            if job.cancelled:
+                job.state = JobState.CANCELLED
+            else:
+                job.error = friendly_error(str(e))
+                job.state = JobState.FAILED
+        except HostUnavailable as e:
+            job.error = friendly_error(str(e))
+            job.state = JobState.FAILED
+            self._log(str(e))
+        except Exception as e:
+            error_str = str(e)
+            if "ffmpeg" in error_str.lower():
+                error_str = "FFmpeg required - try MP4 or M4A format"
+            job.error = error_str[:80]
+            job.state = JobState.FAILED
+        finally:
+            self.sessions.release(session)
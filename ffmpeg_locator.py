@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Flare Download - FFmpeg locator
+Finds FFmpeg once per run - a configured location first, then next to
+the app (bundled builds), then PATH and the usual install directories -
+and remembers its version and which encoders and muxers the build has,
+so the format planner only plans conversions FFmpeg can actually run.
+Part of the Flare ecosystem.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import threading
+from typing import Dict, FrozenSet, Iterator, List, Optional
+
+from paths import get_app_dir
+
+EXE_SUFFIX = '.exe' if os.name == 'nt' else ''
+
+# Searched after the app directory and PATH (PATH is often minimal for
+# apps started from a desktop shortcut)
+COMMON_DIRS = (
+    '/usr/bin', '/usr/local/bin', '/opt/homebrew/bin', '/snap/bin',
+    os.path.expanduser('~/.local/bin'),
+    r'C:\ffmpeg\bin',
+)
+
+# Keeps Windows from flashing a console window for every query
+_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+
+class FFmpegInfo:
+    """A found FFmpeg; version, encoders and muxers are read on first use and kept"""
+
+    def __init__(self, ffmpeg: str, ffprobe: Optional[str] = None):
+        self.ffmpeg = ffmpeg
+        self.ffprobe = ffprobe
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._lists: Dict[str, FrozenSet[str]] = {}
+
+    @property
+    def location(self) -> str:
+        """Value for yt-dlp's `ffmpeg_location` (it finds ffprobe next to it)."""
+        return self.ffmpeg
+
+    @property
+    def version(self) -> str:
+        with self._lock:
+            if self._version is None:
+                match = re.search(r'version\s+(\S+)', self._query('-version'))
+                self._version = match.group(1) if match else 'unknown'
+            return self._version
+
+    @property
+    def encoders(self) -> FrozenSet[str]:
+        return self._list('-encoders')
+
+    @property
+    def muxers(self) -> FrozenSet[str]:
+        return self._list('-muxers')
+
+    # Both answer True when FFmpeg could not list them; better to try
+    # than to rule out everything
+
+    def has_encoder(self, name: str) -> bool:
+        return not self.encoders or name in self.encoders
+
+    def has_muxer(self, name: str) -> bool:
+        return not self.muxers or name in self.muxers
+
+    def _list(self, flag: str) -> FrozenSet[str]:
+        with self._lock:
+            if flag not in self._lists:
+                self._lists[flag] = parse_list(self._query(flag))
+            return self._lists[flag]
+
+    def _query(self, flag: str) -> str:
+        try:
+            result = subprocess.run(
+                [self.ffmpeg, '-hide_banner', flag], capture_output=True, timeout=15,
+                stdin=subprocess.DEVNULL, creationflags=_NO_WINDOW)
+        except (OSError, subprocess.SubprocessError):
+            return ''
+        return result.stdout.decode('utf-8', 'replace')
+
+    def __repr__(self):
+        return f'FFmpegInfo({self.ffmpeg!r})'
+
+
+def parse_list(output: str) -> FrozenSet[str]:
+    """Names from `ffmpeg -encoders` / `-muxers` output (the table after the '--' line)."""
+    names = set()
+    in_table = False
+    for line in output.splitlines():
+        stripped = line.strip()
+        if not in_table:
+            in_table = stripped.startswith('--')
+            continue
+        parts = stripped.split()
+        if len(parts) >= 2:
+            names.update(parts[1].split(','))
+    return frozenset(names)
+
+
+def _in_dir(directory: str) -> List[str]:
+    name = 'ffmpeg' + EXE_SUFFIX
+    return [os.path.join(directory, name), os.path.join(directory, 'bin', name)]
+
+
+def candidates(configured: Optional[str] = None) -> Iterator[str]:
+    """Possible FFmpeg executables, most preferred first."""
+    if configured:
+        configured = os.path.expanduser(configured)
+        if os.path.isdir(configured):
+            yield from _in_dir(configured)
+        else:
+            yield configured
+    app_dir = get_app_dir()
+    yield from _in_dir(app_dir)
+    yield from _in_dir(os.path.join(app_dir, 'ffmpeg'))
+    found = shutil.which('ffmpeg')
+    if found:
+        yield found
+    for directory in COMMON_DIRS:
+        yield os.path.join(directory, 'ffmpeg' + EXE_SUFFIX)
+
+
+def _find_ffprobe(ffmpeg: str) -> Optional[str]:
+    directory, name = os.path.split(ffmpeg)
+    beside = os.path.join(directory, name.replace('ffmpeg', 'ffprobe'))
+    if beside != ffmpeg and os.path.isfile(beside):
+        return beside
+    return shutil.which('ffprobe')
+
+
+def _search(configured: Optional[str]) -> Optional[str]:
+    for path in candidates(configured):
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return os.path.abspath(path)
+    return None
+
+
+_found: Dict[Optional[str], Optional[str]] = {}
+# One FFmpegInfo per executable, however it was found
+_infos: Dict[str, FFmpegInfo] = {}
+_lock = threading.Lock()
+
+
+def resolve_ffmpeg(configured: Optional[str] = None) -> Optional[FFmpegInfo]:
+    """
+    The FFmpeg to use, None if there is none. Searched once per
+    `configured` location (a directory or the executable itself).
+    """
+    key = configured or None
+    with _lock:
+        if key not in _found:
+            _found[key] = _search(key)
+        path = _found[key]
+        if path is None:
+            return None
+        if path not in _infos:
+            _infos[path] = FFmpegInfo(path, _find_ffprobe(path))
+        return _infos[path]
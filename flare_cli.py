@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Headless batch mode
+Downloads URLs from a file or stdin without loading Tk.
+Progress is streamed to stdout as JSON lines.
+Part of the Flare ecosystem.
+
+Usage:
+    python youtube_downloader.py --batch urls.txt
+    cat urls.txt | python youtube_downloader.py --batch -
+    python youtube_downloader.py --batch urls.txt --check
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from typing import Optional, List, Iterable
+
+from paths import get_default_download_dir
+from bandwidth import parse_rate
+from format_plan import DEFAULT_PRESET, ENCODE_PRESETS
+from ydl_options import AUDIO_FORMATS, VIDEO_FORMATS, load_profiles
+
+
+def wants_cli(argv: List[str]) -> bool:
+    """True if the command line asks for headless mode."""
+    return any(arg == '--batch' or arg.startswith('--batch=') for arg in argv)
+
+
+def read_urls(lines: Iterable[str]) -> List[str]:
+    """URLs from a batch file: one or more per line, '#' starts a comment."""
+    urls = []
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if line:
+            urls.extend(line.split())
+    return urls
+
+
+def check_urls(urls: List[str], reporter: 'JsonLinesReporter') -> int:
+    """--check: one 'check' event per URL, then a summary; 1 if any URL is unknown."""
+    from url_router import extractor_name, routing_index
+
+    started = time.perf_counter()
+    routing_index()
+    indexed = time.perf_counter()
+    unknown = 0
+    for url in urls:
+        name = extractor_name(url)
+        unknown += name is None
+        reporter.emit('check', url=url, extractor=name)
+    reporter.emit('checked', total=len(urls), supported=len(urls) - unknown, unsupported=unknown,
+                  index_seconds=round(indexed - started, 3),
+                  check_seconds=round(time.perf_counter() - indexed, 3))
+    return 1 if unknown else 0
+
+
+class JsonLinesReporter:
+    """Writes one JSON object per event to a stream, safe across threads"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        record = {'event': event, 'time': round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+    def job(self, job):
+        self.emit(
+            'job',
+            id=job.id,
+            url=job.url,
+            state=job.state,
+            progress=round(job.progress, 1),
+            speed=job.speed,
+            eta=job.eta,
+            title=job.title,
+            error=job.error,
+        )
+
+    def log(self, message: str):
+        self.emit('log', message=message)
+
+
+def parse_site_limit(text: str):
+    """("youtube.com", 2) from "youtube.com=2"; 0 lifts the cap."""
+    site, _, count = text.partition('=')
+    if not site.strip() or not count.strip().isdigit():
+        raise argparse.ArgumentTypeError(f"expected SITE=N, got {text!r}")
+    return site.strip().lower(), int(count)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='youtube_downloader.py',
+        description='Flare Download headless batch mode',
+    )
+    parser.add_argument('--batch', metavar='FILE', required=True,
+                        help="file with one URL per line, or '-' for stdin")
+    parser.add_argument('-o', '--output', default=None,
+                        help='output directory (default: ~/Downloads)')
+    parser.add_argument('-f', '--format', dest='fmt', default=None,
+                        help='container/codec, e.g. mp4, mkv, mp3, m4a')
+    parser.add_argument('-q', '--quality', default=None,
+                        help='Best, 1080p, 720p... for video; Best, 320k, 192k... for audio')
+    parser.add_argument('--audio', action='store_true',
+                        help='extract audio instead of video')
+    parser.add_argument('-p', '--profile', default=None,
+                        help='named choice of format and quality: archive-max, mobile-720p, podcast-mp3 '
+                             'or one from the "profiles" setting; -f/-q override it')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='parallel downloads')
+    parser.add_argument('--playlist', action='store_true',
+                        help='expand playlist/channel URLs into their entries')
+    parser.add_argument('--no-resume', action='store_true',
+                        help='with --playlist, re-download entries finished in earlier runs')
+    parser.add_argument('--archive', metavar='FILE', default=None,
+                        help='download archive (yt-dlp --download-archive format); '
+                             'default: archive.txt in the data folder')
+    parser.add_argument('--no-archive', action='store_true',
+                        help='do not skip or record already downloaded videos')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='always extract video info fresh')
+    parser.add_argument('--engine', choices=['native', 'segmented'], default='native',
+                        help='segmented: fetch progressive files over several connections')
+    parser.add_argument('--connections', type=int, default=None,
+                        help='connections per file (segmented) or parallel DASH/HLS fragments')
+    parser.add_argument('--limit-rate', type=parse_rate, default=None, metavar='RATE',
+                        help='cap for all downloads together, e.g. 500K or 2M')
+    parser.add_argument('--job-rate', type=parse_rate, default=None, metavar='RATE',
+                        help='cap for each download')
+    parser.add_argument('--schedule', action='append', default=[], metavar='RULE',
+                        help="time-of-day cap replacing --limit-rate, e.g. 'mon-fri 09:00-18:00 1M' (repeatable)")
+    parser.add_argument('--site-limit', action='append', default=[], type=parse_site_limit,
+                        metavar='SITE=N', help='parallel downloads per site, e.g. youtube.com=2; 0 = no cap '
+                                               '(repeatable, default youtube.com=2)')
+    parser.add_argument('--encode-preset', choices=ENCODE_PRESETS, default=DEFAULT_PRESET,
+                        help='x264 speed preset when a video has to be re-encoded for its container')
+    parser.add_argument('--ffmpeg-location', metavar='PATH', default=None,
+                        help='FFmpeg directory or executable (default: next to the app, then PATH)')
+    parser.add_argument('--metrics', metavar='FILE', default=None,
+                        help='per-job metrics as JSON lines (default: metrics.jsonl in the data folder)')
+    parser.add_argument('--no-metrics', action='store_true',
+                        help='do not record per-job metrics')
+    parser.add_argument('--metrics-port', type=int, default=0, metavar='PORT',
+                        help='serve metrics as Prometheus text on 127.0.0.1:PORT/metrics')
+    parser.add_argument('--cookies', metavar='FILE', default=None,
+                        help='cookies.txt (Netscape format) to sign in with; refreshed cookies are saved back')
+    parser.add_argument('--cookies-from-browser', metavar='BROWSER', default=None,
+                        help='sign in with the cookies of a browser profile, e.g. firefox or chrome:"Profile 1"')
+    parser.add_argument('--check', action='store_true',
+                        help='only report which extractor takes each URL, without downloading; '
+                             'exit status 1 if any URL is not recognised')
+    parser.add_argument('--progress-hz', type=float, default=4,
+                        help='max progress lines per second per job (0 = unlimited)')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    from download_queue import DownloadQueue, JobState, DEFAULT_SITE_LIMITS, DEFAULT_WORKERS, load_yt_dlp
+    from progress import RateLimitedCallback
+    from log_buffer import setup_logging
+    from download_archive import DownloadArchive
+    from info_cache import InfoCache
+    from bandwidth import BandwidthManager, parse_schedule
+    from retry_policy import RetryPolicy
+    from metrics import MetricsRecorder
+    from cookie_store import CookieStore, parse_browser
+    from playlist import PlaylistProgress, looks_like_playlist, extract_playlist, submit_playlist
+    from url_router import split_supported
+
+    try:
+        load_yt_dlp()
+    except ImportError:
+        print("yt-dlp not installed - run: pip install yt-dlp", file=sys.stderr)
+        return 1
+
+    is_audio, fmt, quality = args.audio, args.fmt, args.quality
+    if args.profile:
+        from settings import Settings
+        try:
+            profiles = load_profiles(Settings().get("profiles") or [])
+        except ValueError as e:
+            print(f"Invalid profile in settings: {e}", file=sys.stderr)
+            return 2
+        profile = profiles.get(args.profile)
+        if profile is None:
+            print(f"Unknown profile '{args.profile}' - choose from: {', '.join(profiles)}", file=sys.stderr)
+            return 2
+        if args.audio and not profile.is_audio:
+            print(f"--audio does not go with the video profile '{profile.name}'", file=sys.stderr)
+            return 2
+        is_audio = profile.is_audio
+        fmt = fmt or profile.fmt
+        quality = quality or profile.quality
+    fmt = fmt or ('mp3' if is_audio else 'mp4')
+    quality = quality or 'Best'
+    valid_formats = AUDIO_FORMATS if is_audio else VIDEO_FORMATS
+    if fmt not in valid_formats:
+        print(f"Unsupported format '{fmt}' - choose from: {', '.join(valid_formats)}", file=sys.stderr)
+        return 2
+
+    if args.batch == '-':
+        urls = read_urls(sys.stdin)
+    else:
+        try:
+            with open(args.batch, 'r', encoding='utf-8') as f:
+                urls = read_urls(f)
+        except OSError as e:
+            print(f"Could not read {args.batch}: {e}", file=sys.stderr)
+            return 2
+
+    if args.check:
+        return check_urls(urls, JsonLinesReporter())
+
+    try:
+        schedule = parse_schedule(args.schedule)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    bandwidth = None
+    if args.limit_rate or args.job_rate or schedule:
+        bandwidth = BandwidthManager(limit=args.limit_rate, per_job=args.job_rate, schedule=schedule)
+
+    retry_policy = RetryPolicy()
+
+    if args.cookies_from_browser:
+        try:
+            parse_browser(args.cookies_from_browser)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+
+    output_dir = args.output or get_default_download_dir()
+    os.makedirs(output_dir, exist_ok=True)
+
+    reporter = JsonLinesReporter()
+    logger = setup_logging()
+
+    def log(message: str):
+        logger.info(message)
+        reporter.log(message)
+
+    # Progress lines are capped per job; state changes are always written
+    on_update = RateLimitedCallback(
+        reporter.job,
+        max_hz=args.progress_hz,
+        key=lambda job: job.id,
+        urgent=lambda job: job.state,
+    )
+    metrics = None
+    if not args.no_metrics:
+        # Each record is also written to stdout as a 'metrics' event
+        metrics = MetricsRecorder(args.metrics, on_record=lambda record: reporter.emit('metrics', **record))
+        if args.metrics_port:
+            try:
+                port = metrics.serve(args.metrics_port)
+            except OSError as e:
+                print(f"Could not serve metrics on port {args.metrics_port}: {e}", file=sys.stderr)
+                return 2
+            log(f"Metrics at http://127.0.0.1:{port}/metrics")
+
+    cookies = None
+    if args.cookies or args.cookies_from_browser:
+        # One jar for all jobs; saved back to --cookies as sites refresh it
+        cookies = CookieStore(args.cookies, args.cookies_from_browser, log=log)
+
+    queue = DownloadQueue(
+        max_workers=args.workers or DEFAULT_WORKERS,
+        on_update=on_update,
+        log=log,
+        archive=None if args.no_archive else DownloadArchive(args.archive),
+        info_cache=None if args.no_cache else InfoCache(),
+        engine=args.engine,
+        connections=args.connections,
+        bandwidth=bandwidth,
+        retry_policy=retry_policy,
+        site_limits={**DEFAULT_SITE_LIMITS, **dict(args.site_limit)},
+        encode_preset=args.encode_preset,
+        ffmpeg_location=args.ffmpeg_location,
+        metrics=metrics,
+        cookies=cookies,
+    )
+
+    reporter.emit('start', total=len(urls), output_dir=output_dir, workers=queue.max_workers)
+    # Known before any request; the generic extractor still gets a try
+    _, unknown = split_supported(urls)
+    for url in unknown:
+        reporter.emit('unrecognised', url=url)
+    if unknown:
+        log(f"{len(unknown)} URL(s) match no site extractor - trying them as direct media links")
+    jobs = []
+    for url in urls:
+        if args.playlist and looks_like_playlist(url):
+            try:
+                playlist = extract_playlist(url, log=log, cookies=cookies,
+                                            retry_policy=retry_policy, sessions=queue.sessions)
+            except Exception as e:
+                reporter.emit('playlist_error', url=url, error=str(e).split('\n')[0][:200])
+                continue
+            if playlist is not None:
+                progress = PlaylistProgress(playlist)
+                if args.no_resume:
+                    progress.reset()
+                entries = progress.pending()
+                reporter.emit('playlist', url=url, title=playlist.title,
+                              entries=len(playlist.entries), pending=len(entries))
+                jobs.extend(submit_playlist(queue, playlist, entries, output_dir,
+                                            fmt, quality, is_audio, progress))
+                continue
+        jobs.append(queue.submit(url, output_dir, fmt, quality, is_audio))
+
+    try:
+        # Wake up periodically so Ctrl+C is handled promptly
+        while not queue.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        queue.shutdown()
+        queue.wait(10)
+
+    counts = {state: 0 for state in JobState.FINISHED}
+    for job in jobs:
+        counts[job.state] = counts.get(job.state, 0) + 1
+    reporter.emit('summary', retries=retry_policy.stats(), **counts)
+    if metrics is not None:
+        metrics.close()
+
+    return 0 if counts[JobState.DONE] + counts[JobState.SKIPPED] == len(jobs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Format planner
+Works out whether a video can reach the chosen container (MP4, MOV,
+AVI, ...) by stream copy, which takes seconds, or needs a re-encode,
+which can take longer than the download:
+
+  - the format selector prefers streams whose codecs the container can
+    hold as they are;
+  - before each download the selected streams are checked again: files
+    are then merged or remuxed with stream copy, and only streams the
+    container cannot hold are re-encoded (video with a speed preset),
+    with a clear note in the log;
+  - conversions the installed FFmpeg cannot do (no suitable encoder or
+    muxer, see ffmpeg_locator) are not attempted; the file is kept as it
+    is, or merged into MKV;
+  - for probed URLs, plan_probed() tells up front which case applies.
+Part of the Flare ecosystem.
+"""
+
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from download_queue import load_yt_dlp
+
+# x264/x265 speed presets; they trade file size for encoding time and
+# behave the same on every machine
+ENCODE_PRESETS = ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium', 'slow')
+DEFAULT_PRESET = 'veryfast'
+
+# Codec family -> prefixes of the codec strings sites report
+CODEC_PREFIXES: Dict[str, Tuple[str, ...]] = {
+    'h264': ('avc1', 'avc3', 'h264'),
+    'h265': ('hev1', 'hvc1', 'h265', 'hevc'),
+    'av1': ('av01', 'av1'),
+    'vp9': ('vp09', 'vp9'),
+    'vp8': ('vp8',),
+    'mpeg4': ('mp4v', 'mpeg4'),
+    'aac': ('mp4a', 'aac'),
+    'mp3': ('mp3',),
+    'opus': ('opus',),
+    'vorbis': ('vorbis',),
+    'ac3': ('ac-3', 'ac3'),
+    'flac': ('flac',),
+    'pcm': ('pcm',),
+}
+
+# Container -> (video families, audio families) it holds without re-encoding.
+# None means anything goes.
+CONTAINERS: Dict[str, Tuple[Optional[frozenset], Optional[frozenset]]] = {
+    'mp4': (frozenset({'h264', 'h265', 'av1'}), frozenset({'aac', 'mp3'})),
+    'mov': (frozenset({'h264', 'h265', 'mpeg4'}), frozenset({'aac', 'mp3', 'pcm'})),
+    'avi': (frozenset({'h264', 'mpeg4'}), frozenset({'mp3', 'aac', 'ac3', 'pcm'})),
+    'webm': (frozenset({'vp8', 'vp9', 'av1'}), frozenset({'opus', 'vorbis'})),
+    'mkv': (None, None),
+}
+
+# Containers FFmpeg re-encodes to with x264, which takes the preset
+PRESET_CONTAINERS = ('mp4', 'mov', 'mkv')
+
+# Container -> FFmpeg muxer
+MUXERS = {'mp4': 'mp4', 'mov': 'mov', 'avi': 'avi', 'webm': 'webm', 'mkv': 'matroska'}
+
+# Container -> (video encoders, audio encoders) a re-encode can use; one of
+# each is needed. yt-dlp asks for libxvid by name for AVI, the rest are
+# FFmpeg's defaults for the container and the ones it falls back to.
+REENCODERS: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    'mp4': (('libx264', 'mpeg4'), ('aac',)),
+    'mov': (('libx264', 'mpeg4'), ('aac',)),
+    'avi': (('libxvid',), ('libmp3lame', 'ac3')),
+    'webm': (('libvpx-vp9', 'libvpx'), ('libopus', 'libvorbis')),
+}
+
+
+def codec_family(codec: Optional[str]) -> Optional[str]:
+    """'avc1.64001F' -> 'h264'; None for no stream ('none') or an unknown codec."""
+    if not codec or codec == 'none':
+        return None
+    codec = codec.lower()
+    for family, prefixes in CODEC_PREFIXES.items():
+        if codec.startswith(prefixes):
+            return family
+    return None
+
+
+def fits(container: str, vcodec: Optional[str], acodec: Optional[str]) -> bool:
+    """True if the container can hold these streams as they are (absent streams always fit)."""
+    video_ok, audio_ok = CONTAINERS.get(container, (None, None))
+    for codec, allowed in ((vcodec, video_ok), (acodec, audio_ok)):
+        if allowed is None or not codec or codec == 'none':
+            continue
+        if codec_family(codec) not in allowed:
+            return False
+    return True
+
+
+def _codec_filter(field: str, families: Optional[Iterable[str]]) -> str:
+    if families is None:
+        return ''
+    prefixes = sorted(p for family in families for p in CODEC_PREFIXES[family])
+    return f"[{field}~='^({'|'.join(re.escape(p) for p in prefixes)})']"
+
+
+def video_selector(container: str, quality: str = "Best", merge: bool = True) -> str:
+    """
+    yt-dlp format selector preferring streams `container` holds without
+    re-encoding. Without `merge` (no FFmpeg) only single files are chosen.
+    """
+    height = '' if quality == "Best" else f"[height<={quality.rstrip('p')}]"
+    video_ok, audio_ok = CONTAINERS.get(container, (None, None))
+    vfilter = _codec_filter('vcodec', video_ok)
+    afilter = _codec_filter('acodec', audio_ok)
+    choices = [
+        f"bestvideo{vfilter}{height}+bestaudio{afilter}",
+        f"best{vfilter}{afilter}{height}",
+        f"bestvideo{height}+bestaudio",
+        f"best{height}",
+        "best",
+    ]
+    if not merge:
+        choices = [choice for choice in choices if '+' not in choice]
+    # Drop repeats (e.g. MKV, where every choice is unfiltered)
+    return '/'.join(dict.fromkeys(choices))
+
+
+class VideoPlan:
+    """How the selected streams get into the target container"""
+
+    COPY = 'copy'          # already there, or merged/remuxed by stream copy
+    REENCODE = 'reencode'  # at least one stream has to be converted
+    KEEP = 'keep'          # FFmpeg cannot get there; `ext` is kept instead
+
+    def __init__(self, container: str, action: str, vcodec: Optional[str] = None,
+                 acodec: Optional[str] = None, reason: Optional[str] = None,
+                 ext: Optional[str] = None):
+        self.container = container
+        self.action = action
+        self.vcodec = vcodec
+        self.acodec = acodec
+        self.reason = reason
+        self.ext = ext
+
+    @property
+    def reencode(self) -> bool:
+        return self.action == self.REENCODE
+
+    def describe(self) -> str:
+        codecs = ' + '.join(c for c in (codec_family(self.vcodec) or self.vcodec,
+                                        codec_family(self.acodec) or self.acodec)
+                            if c and c != 'none')
+        target = self.container.upper()
+        if self.action == self.KEEP:
+            kept = self.ext.upper() if self.ext else "the downloaded streams as they are"
+            return f"{target} not possible ({self.reason}), keeping {kept}"
+        if self.reencode:
+            return f"{target} needs a re-encode ({codecs or 'unknown codecs'} do not fit {target})"
+        return f"{target} by stream copy ({codecs or 'codecs unknown'})"
+
+
+def plan_selected(info: dict, container: str) -> VideoPlan:
+    """Plan for the streams yt-dlp selected (`info` after format selection)."""
+    formats = info.get('requested_formats') or [info]
+    vcodec = next((f.get('vcodec') for f in formats if f.get('vcodec') not in (None, 'none')), None)
+    acodec = next((f.get('acodec') for f in formats if f.get('acodec') not in (None, 'none')), None)
+    action = VideoPlan.COPY if fits(container, vcodec, acodec) else VideoPlan.REENCODE
+    return VideoPlan(container, action, vcodec, acodec)
+
+
+def plan_probed(formats: List, container: str, quality: str = "Best") -> Optional[VideoPlan]:
+    """
+    Plan for probed streams (format_probe.FormatOption): stream copy if the
+    best fitting video (within `quality`) has fitting audio to go with it.
+    """
+    limit = None if quality == "Best" else int(quality.rstrip('p'))
+    videos = [f for f in formats if f.has_video and (limit is None or not f.height or f.height <= limit)]
+    if not videos:
+        return None
+    audios = [f for f in formats if f.has_audio and not f.has_video]
+    for video in videos:
+        if not fits(container, video.vcodec, None):
+            continue
+        if video.has_audio and fits(container, None, video.acodec):
+            return VideoPlan(container, VideoPlan.COPY, video.vcodec, video.acodec)
+        audio = next((a for a in audios if fits(container, None, a.acodec)), None)
+        if audio is not None:
+            return VideoPlan(container, VideoPlan.COPY, video.vcodec, audio.acodec)
+    best = videos[0]
+    acodec = best.acodec if best.has_audio else (audios[0].acodec if audios else None)
+    return VideoPlan(container, VideoPlan.REENCODE, best.vcodec, acodec)
+
+
+def missing_support(plan: VideoPlan, ffmpeg) -> Optional[str]:
+    """Why `ffmpeg` (an ffmpeg_locator.FFmpegInfo, or None) cannot carry out `plan`; None if it can."""
+    if ffmpeg is None:
+        return "FFmpeg not found"
+    if not ffmpeg.has_muxer(MUXERS.get(plan.container, plan.container)):
+        return f"this FFmpeg cannot write {plan.container.upper()}"
+    if plan.reencode:
+        video_encoders, audio_encoders = REENCODERS.get(plan.container, ((), ()))
+        for encoders, fitting in ((video_encoders, fits(plan.container, plan.vcodec, None)),
+                                  (audio_encoders, fits(plan.container, None, plan.acodec))):
+            if encoders and not fitting and not any(ffmpeg.has_encoder(e) for e in encoders):
+                return f"this FFmpeg has no {encoders[0]} encoder"
+    return None
+
+
+def reencode_args(plan: VideoPlan, preset: Optional[str] = DEFAULT_PRESET, ffmpeg=None) -> List[str]:
+    """FFmpeg output arguments for a re-encode: streams that fit are still copied."""
+    args = []
+    if fits(plan.container, plan.vcodec, None):
+        args += ['-c:v', 'copy']
+    elif preset and plan.container in PRESET_CONTAINERS and (ffmpeg is None or ffmpeg.has_encoder('libx264')):
+        args += ['-preset', preset]
+    if fits(plan.container, None, plan.acodec):
+        args += ['-c:a', 'copy']
+    return args
+
+
+_pp_class = None
+_class_lock = threading.Lock()
+
+
+def format_plan_pp_class():
+    """The FormatPlanPP class (built on first use, yt-dlp is imported lazily)."""
+    global _pp_class
+    with _class_lock:
+        if _pp_class is None:
+            _pp_class = _build_pp_class()
+        return _pp_class
+
+
+def _build_pp_class():
+    load_yt_dlp()
+    from yt_dlp.postprocessor.common import PostProcessor
+    from yt_dlp.postprocessor.ffmpeg import FFmpegVideoConvertorPP, FFmpegVideoRemuxerPP
+
+    class FormatPlanPP(PostProcessor):
+        """
+        Runs once the formats are selected, before the file name is set
+        (when='video'). Merges go straight into the target container when
+        the streams fit, otherwise into MKV followed by a re-encode; single
+        files are remuxed or re-encoded as needed, unless `ffmpeg` (an
+        ffmpeg_locator.FFmpegInfo, looked up if not given) cannot do it.
+        `on_plan(plan)` is told what was decided.
+        """
+
+        def __init__(self, downloader, container: str, preset: Optional[str] = DEFAULT_PRESET,
+                     on_plan: Optional[Callable[[VideoPlan], None]] = None, ffmpeg=None):
+            from ffmpeg_locator import resolve_ffmpeg
+
+            super().__init__(downloader)
+            self.container = container
+            self.preset = preset
+            self.on_plan = on_plan
+            self.ffmpeg = ffmpeg or resolve_ffmpeg()
+            self._follow_up = None
+
+        def run(self, info):
+            if info.get('vcodec') == 'none' and not info.get('requested_formats'):
+                return [], info  # audio only, nothing to plan
+            plan = plan_selected(info, self.container)
+            merge = bool(info.get('requested_formats'))
+            reason = None
+            if merge or info.get('ext') != self.container:
+                reason = missing_support(plan, self.ffmpeg)
+            else:
+                # Already a file of the container; it is kept as it is
+                plan = VideoPlan(self.container, VideoPlan.COPY, plan.vcodec, plan.acodec)
+            follow_up = None
+            if reason is not None:
+                # Without FFmpeg yt-dlp leaves the parts unmerged; with it,
+                # MKV holds any streams
+                ext = 'mkv' if merge and self.ffmpeg is not None else None
+                if ext:
+                    info['ext'] = ext
+                plan = VideoPlan(self.container, VideoPlan.KEEP, plan.vcodec, plan.acodec,
+                                 reason, ext or (None if merge else info.get('ext')))
+            elif merge:
+                info['ext'] = self.container if not plan.reencode else 'mkv'
+                if plan.reencode and self.container != 'mkv':
+                    follow_up = FFmpegVideoConvertorPP(self._downloader, self.container)
+            elif info.get('ext') != self.container:
+                pp_class = FFmpegVideoConvertorPP if plan.reencode else FFmpegVideoRemuxerPP
+                follow_up = pp_class(self._downloader, self.container)
+
+            pps = self._downloader._pps['post_process']
+            if self._follow_up in pps:
+                pps.remove(self._follow_up)  # left from the previous video of a playlist
+            self._follow_up = follow_up
+            if follow_up is not None:
+                if plan.reencode:
+                    self._downloader.params.setdefault('postprocessor_args', {})[
+                        'videoconvertor+ffmpeg_o'] = reencode_args(plan, self.preset, self.ffmpeg)
+                # Per-download post-processors (the merge) run before this list
+                pps.insert(0, follow_up)
+            self.write_debug(f'Plan: {plan.describe()}')
+            if self.on_plan is not None:
+                self.on_plan(plan)
+            return [], info
+
+    return FormatPlanPP
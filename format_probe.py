@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Format probe
+Extracts a URL once without downloading and lists its real streams
+(resolution, codecs, bitrate, size) so an exact stream can be picked.
+The extraction goes through the info cache, so the download that follows
+does not extract again.
+Part of the Flare ecosystem.
+"""
+
+import re
+from typing import List, Optional
+
+from info_cache import InfoCache, extract_raw_info
+from ydl_options import base_opts
+
+# A single http(s) URL, worth probing while the user is still deciding
+PROBE_URL_PATTERN = re.compile(r'^https?://\S+$', re.IGNORECASE)
+
+
+def _short_codec(codec: Optional[str]) -> str:
+    if not codec or codec == 'none':
+        return ''
+    return codec.split('.')[0]
+
+
+def format_size(num_bytes: Optional[float]) -> str:
+    if not num_bytes:
+        return ''
+    for unit in ('B', 'KB', 'MB'):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+
+class FormatOption:
+    """One stream offered by the site"""
+
+    def __init__(self, fmt: dict, duration: Optional[float] = None):
+        self.format_id = str(fmt.get('format_id'))
+        self.ext = fmt.get('ext') or ''
+        self.width = fmt.get('width')
+        self.height = fmt.get('height')
+        self.fps = fmt.get('fps')
+        self.vcodec = fmt.get('vcodec')
+        self.acodec = fmt.get('acodec')
+        self.tbr = fmt.get('tbr') or ((fmt.get('vbr') or 0) + (fmt.get('abr') or 0)) or None
+        self.abr = fmt.get('abr')
+        self.protocol = fmt.get('protocol') or ''
+        self.note = fmt.get('format_note') or ''
+
+        size = fmt.get('filesize') or fmt.get('filesize_approx')
+        if not size and self.tbr and duration:
+            size = self.tbr * 1000 / 8 * duration
+        self.filesize = size
+
+    @property
+    def has_video(self) -> bool:
+        if self.vcodec is None:
+            return bool(self.height)
+        return self.vcodec != 'none'
+
+    @property
+    def has_audio(self) -> bool:
+        return bool(self.acodec) and self.acodec != 'none'
+
+    @property
+    def kind(self) -> str:
+        if self.has_video and self.has_audio:
+            return 'video+audio'
+        if self.has_video:
+            return 'video only'
+        if self.has_audio:
+            return 'audio only'
+        return 'unknown'
+
+    @property
+    def resolution(self) -> str:
+        if self.has_video and self.height:
+            fps = f"{self.fps:.0f}" if self.fps and self.fps > 30 else ''
+            return f"{self.height}p{fps}"
+        if self.kind == 'audio only':
+            return 'audio'
+        return self.note
+
+    def label(self) -> str:
+        codecs = '/'.join(c for c in (_short_codec(self.vcodec), _short_codec(self.acodec)) if c)
+        bitrate = f"{self.tbr / 1000:.1f} Mbps" if self.tbr and self.tbr >= 1000 else (
+            f"{self.tbr:.0f} kbps" if self.tbr else '')
+        size = format_size(self.filesize)
+        size = f"~{size}" if size else ''
+        parts = [self.resolution, self.ext, codecs, bitrate, size, self.kind]
+        return "  ".join(p for p in parts if p) + f"  [{self.format_id}]"
+
+    def format_spec(self, is_audio: bool) -> str:
+        """yt-dlp format selector that downloads exactly this stream (plus audio if needed)."""
+        if self.has_video and not self.has_audio and not is_audio:
+            # Pair with the best audio in a container that merges without re-encoding
+            if self.ext == 'mp4':
+                return f"{self.format_id}+bestaudio[ext=m4a]/{self.format_id}+bestaudio"
+            if self.ext == 'webm':
+                return f"{self.format_id}+bestaudio[ext=webm]/{self.format_id}+bestaudio"
+            return f"{self.format_id}+bestaudio"
+        return self.format_id
+
+
+class ProbeResult:
+    """What a URL offers, from a single extraction"""
+
+    def __init__(self, url: str, info: dict, from_cache: bool):
+        self.url = url
+        self.info = info
+        self.from_cache = from_cache
+        self.title = info.get('title') or url
+        self.duration = info.get('duration')
+        self.extractor = info.get('extractor_key') or info.get('extractor') or ''
+
+        formats = [FormatOption(f, self.duration) for f in info.get('formats') or []
+                   if f.get('format_id') and not self._is_storyboard(f)]
+        self.formats = sort_formats(formats)
+
+    @staticmethod
+    def _is_storyboard(fmt: dict) -> bool:
+        return fmt.get('vcodec') == 'none' and fmt.get('acodec') == 'none' or fmt.get('ext') == 'mhtml'
+
+    def for_mode(self, is_audio: bool) -> List[FormatOption]:
+        """Streams worth offering for the current Video/Audio mode."""
+        if is_audio:
+            return [f for f in self.formats if f.has_audio or f.kind == 'unknown']
+        return [f for f in self.formats if f.has_video or f.kind == 'unknown']
+
+    def find(self, format_id: str) -> Optional[FormatOption]:
+        for fmt in self.formats:
+            if fmt.format_id == format_id:
+                return fmt
+        return None
+
+
+def sort_formats(formats: List[FormatOption]) -> List[FormatOption]:
+    """Best first: video by height/fps/bitrate, then audio by bitrate."""
+    def key(f: FormatOption):
+        return (
+            f.has_video,
+            f.height or 0,
+            f.fps or 0,
+            f.has_audio,
+            f.tbr or f.abr or 0,
+        )
+    return sorted(formats, key=key, reverse=True)
+
+
+def probe(url: str, cache: Optional[InfoCache] = None, cookies=None,
+          retry_policy=None, sessions=None) -> Optional[ProbeResult]:
+    """
+    Extract `url` without downloading. Returns None for playlists and
+    other results that are not a single video. `cookies` is a
+    cookie_store.CookieStore to sign in with; pass the queue's
+    `retry_policy` and `sessions` so the probe is paced and connected
+    like its downloads.
+    """
+    from ydl_session import extracting_ydl
+
+    with extracting_ydl(base_opts(), url, retry_policy, sessions, cookies) as ydl:
+        info, from_cache = extract_raw_info(ydl, url, cache)
+    if not info or info.get('_type', 'video') != 'video':
+        return None
+    return ProbeResult(url, info, from_cache)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Video info cache
+Caches yt-dlp's raw extractor result (the webpage, player and manifest
+work) on disk so a preview, format listing and the download itself
+extract a URL only once.
+
+Two lifetimes apply:
+  - metadata (title, format list) is reused for `ttl` seconds;
+  - for downloading, an entry is only reused while its signed stream
+    URLs are still valid (from `expire=` style parameters, or
+    `stream_ttl` when the site does not say).
+
+The cache is capped at `max_bytes`; least recently used entries are
+evicted first.
+Part of the Flare ecosystem.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from paths import get_data_dir
+from download_archive import archive_id_for_url
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_STREAM_TTL = 30 * 60
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Stop reusing stream URLs this long before the site says they expire
+STREAM_MARGIN = 10 * 60
+
+# Query parameters that never change what a URL points to
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|si|feature|fbclid|gclid|igshid|ref|ref_src|pp)$')
+
+# Signed-URL expiry as used by YouTube (expire=), CloudFront (Expires=), Akamai (exp=)
+EXPIRY_PATTERN = re.compile(r'[?&/](?:expire|expires|exp)[=/](\d{10})\b', re.IGNORECASE)
+
+
+def normalize_url(url: str) -> str:
+    """Lower-case scheme/host, drop the fragment and tracking parameters."""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not TRACKING_PARAMS.match(k)]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path,
+                       urlencode(query), ''))
+
+
+def cache_key(url: str) -> str:
+    """Extractor + video id when it can be read from the URL, else the normalized URL"""
+    return archive_id_for_url(url) or normalize_url(url)
+
+
+def stream_expiry(info: dict, default_ttl: float = DEFAULT_STREAM_TTL) -> float:
+    """Earliest expiry timestamp among the stream URLs in `info`."""
+    now = time.time()
+    expiries = []
+    formats = info.get('formats') or [info]
+    for fmt in formats:
+        for field in ('url', 'manifest_url', 'fragment_base_url'):
+            value = fmt.get(field)
+            if isinstance(value, str):
+                match = EXPIRY_PATTERN.search(value)
+                if match:
+                    expiries.append(int(match.group(1)))
+    return min(expiries) if expiries else now + default_ttl
+
+
+class InfoCache:
+    """On-disk cache of sanitized yt-dlp info dicts"""
+
+    def __init__(self, directory: Optional[str] = None, ttl: float = DEFAULT_TTL,
+                 stream_ttl: float = DEFAULT_STREAM_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory or os.path.join(get_data_dir(), "cache", "info")
+        self.ttl = ttl
+        self.stream_ttl = stream_ttl
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        # file name -> (size, last access); built on first use
+        self._index: Optional[Dict[str, Tuple[int, float]]] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json'
+        return os.path.join(self.directory, name)
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.json'):
+                        st = entry.stat()
+                        self._index[entry.name] = (st.st_size, st.st_atime)
+        except OSError:
+            pass
+
+    # ── Public API ──────────────────────────────────────────────────────
+
+    def get(self, url: str, for_download: bool = False) -> Optional[dict]:
+        """
+        Cached info for `url`, or None if missing or stale. With
+        `for_download`, entries whose stream URLs are about to expire are
+        treated as stale too.
+        """
+        path = self._path(cache_key(url))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        now = time.time()
+        stale = now - entry.get('fetched', 0) > self.ttl
+        if for_download and now > entry.get('streams_expire', 0) - STREAM_MARGIN:
+            stale = True
+        if stale:
+            self.misses += 1
+            return None
+
+        with self._lock:
+            self._load_index()
+            name = os.path.basename(path)
+            size = self._index.get(name, (0, 0))[0]
+            self._index[name] = (size, now)
+        try:
+            os.utime(path, (now, os.stat(path).st_mtime))
+        except OSError:
+            pass
+
+        self.hits += 1
+        return entry.get('info')
+
+    def put(self, url: str, info: dict):
+        """Store a sanitized (JSON-serializable) info dict for `url`."""
+        now = time.time()
+        entry = {
+            'key': cache_key(url),
+            'url': url,
+            'fetched': now,
+            'streams_expire': stream_expiry(info, self.stream_ttl),
+            'info': info,
+        }
+        try:
+            data = json.dumps(entry, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return
+
+        path = self._path(entry['key'])
+        with self._lock:
+            self._load_index()
+            try:
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError:
+                return
+            self._index[os.path.basename(path)] = (len(data.encode('utf-8')), now)
+            self._evict()
+
+    def invalidate(self, url: str):
+        path = self._path(cache_key(url))
+        with self._lock:
+            self._load_index()
+            self._index.pop(os.path.basename(path), None)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._load_index()
+            for name in list(self._index):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+            self._index.clear()
+
+    def size(self) -> int:
+        with self._lock:
+            self._load_index()
+            return sum(size for size, _ in self._index.values())
+
+    def _evict(self):
+        """Drop least recently used entries until under max_bytes (lock held)."""
+        total = sum(size for size, _ in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for name, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            del self._index[name]
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+def extract_raw_info(ydl, url: str, cache: Optional[InfoCache] = None,
+                     for_download: bool = False) -> Tuple[Optional[dict], bool]:
+    """
+    Raw extractor result for `url` (yt-dlp `process=False`), from `cache`
+    when possible. Returns (info, from_cache). The result is ready for
+    `ydl.process_ie_result(info, download=...)`.
+    """
+    if cache is not None:
+        info = cache.get(url, for_download=for_download)
+        if info is not None:
+            return info, True
+
+    info = ydl.extract_info(url, download=False, process=False)
+    if info is None:
+        return None, False
+
+    if info.get('_type', 'video') != 'video':
+        # Playlists and redirects are resolved again by process_ie_result
+        return info, False
+
+    # Process the same sanitized copy that is cached, so a cache hit
+    # behaves exactly like a fresh extraction
+    sanitized = ydl.sanitize_info(info, remove_private_keys=True)
+    if cache is not None:
+        cache.put(url, sanitized)
+    return sanitized, False
@@ -155,6 +155,8 @@ echo    Downloading update...
 powershell -Command "& {[Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12; (New-Object Net.WebClient).DownloadFile('%GITHUB_RAW%/youtube_downloader.py', '%INSTALL_DIR%\youtube_downloader.py')}" 2>nul
 powershell -Command "& {[Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12; (New-Object Net.WebClient).DownloadFile('%GITHUB_RAW%/version.py', '%INSTALL_DIR%\version.py')}" 2>nul
 powershell -Command "& {[Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12; (New-Object Net.WebClient).DownloadFile('%GITHUB_RAW%/updater.py', '%INSTALL_DIR%\updater.py')}" 2>nul
+call :read_modules
+for %%f in (%APP_MODULES%) do powershell -Command "& {[Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12; (New-Object Net.WebClient).DownloadFile('%GITHUB_RAW%/%%f', '%INSTALL_DIR%\%%f')}" 2>nul
 
 echo.
 echo    ======================================================
@@ -203,6 +205,8 @@ echo    Re-downloading application files...
 powershell -Command "& {[Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12; (New-Object Net.WebClient).DownloadFile('%GITHUB_RAW%/youtube_downloader.py', '%INSTALL_DIR%\youtube_downloader.py')}" 2>nul
 powershell -Command "& {[Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12; (New-Object Net.WebClient).DownloadFile('%GITHUB_RAW%/version.py', '%INSTALL_DIR%\version.py')}" 2>nul
 powershell -Command "& {[Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12; (New-Object Net.WebClient).DownloadFile('%GITHUB_RAW%/updater.py', '%INSTALL_DIR%\updater.py')}" 2>nul
+call :read_modules
+for %%f in (%APP_MODULES%) do powershell -Command "& {[Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12; (New-Object Net.WebClient).DownloadFile('%GITHUB_RAW%/%%f', '%INSTALL_DIR%\%%f')}" 2>nul
 
 :: Recreate shortcuts
 echo    Recreating shortcuts...
@@ -373,11 +377,22 @@ echo    Installing requests...
 echo    [OK] All components installed
 goto :eof
 
+:read_modules
+:: Support modules, as listed in the downloaded version.py (APP_MODULES)
+set "APP_MODULES="
+pushd "%INSTALL_DIR%"
+for /f "usebackq delims=" %%m in (`call "%INSTALL_DIR%\python\python.exe" -c "from version import APP_MODULES; print(' '.join(APP_MODULES))"`) do set "APP_MODULES=%%m"
+popd
+if not defined APP_MODULES echo    ERROR: Could not read the module list from version.py.
+goto :eof
+
 :download_app
 echo    Downloading Flare Download...
 powershell -Command "& {[Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12; (New-Object Net.WebClient).DownloadFile('%GITHUB_RAW%/youtube_downloader.py', '%INSTALL_DIR%\youtube_downloader.py')}" 2>nul
 powershell -Command "& {[Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12; (New-Object Net.WebClient).DownloadFile('%GITHUB_RAW%/version.py', '%INSTALL_DIR%\version.py')}" 2>nul
 powershell -Command "& {[Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12; (New-Object Net.WebClient).DownloadFile('%GITHUB_RAW%/updater.py', '%INSTALL_DIR%\updater.py')}" 2>nul
+call :read_modules
+for %%f in (%APP_MODULES%) do powershell -Command "& {[Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12; (New-Object Net.WebClient).DownloadFile('%GITHUB_RAW%/%%f', '%INSTALL_DIR%\%%f')}" 2>nul
 
 if not exist "%INSTALL_DIR%\youtube_downloader.py" (
     echo    ERROR: Download failed. Check internet connection.
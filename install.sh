@@ -57,6 +57,11 @@ check_command() {
     command -v "$1" &> /dev/null
 }
 
+# Support modules listed in the version.py found in directory $1
+app_modules() {
+    (cd "$1" && $PYTHON_CMD -c "from version import APP_MODULES; print(' '.join(APP_MODULES))")
+}
+
 print_step() {
     echo -e "${ORANGE}[$1/7]${NC} ${BOLD}$2${NC}"
 }
@@ -233,7 +238,11 @@ print_ok "Created: $INSTALL_DIR"
 if [ -f "$SCRIPT_DIR/youtube_downloader.py" ]; then
     cp "$SCRIPT_DIR/youtube_downloader.py" "$INSTALL_DIR/"
     cp "$SCRIPT_DIR/updater.py" "$INSTALL_DIR/" 2>/dev/null || true
-    cp "$SCRIPT_DIR/version.py" "$INSTALL_DIR/" 2>/dev/null || true
+    cp "$SCRIPT_DIR/version.py" "$INSTALL_DIR/" || exit 1
+    APP_MODULES="$(app_modules "$SCRIPT_DIR")" || exit 1
+    for module in $APP_MODULES; do
+        cp "$SCRIPT_DIR/$module" "$INSTALL_DIR/" || exit 1
+    done
     cp "$SCRIPT_DIR/requirements.txt" "$INSTALL_DIR/"
     cp "$SCRIPT_DIR/README.md" "$INSTALL_DIR/" 2>/dev/null || true
     print_ok "Application files copied"
@@ -244,12 +253,20 @@ else
     if check_command curl; then
         curl -sSL "$GITHUB_RAW/youtube_downloader.py" -o "$INSTALL_DIR/youtube_downloader.py" || exit 1
         curl -sSL "$GITHUB_RAW/updater.py" -o "$INSTALL_DIR/updater.py" 2>/dev/null || true
-        curl -sSL "$GITHUB_RAW/version.py" -o "$INSTALL_DIR/version.py" 2>/dev/null || true
+        curl -sSL "$GITHUB_RAW/version.py" -o "$INSTALL_DIR/version.py" || exit 1
+        APP_MODULES="$(app_modules "$INSTALL_DIR")" || exit 1
+        for module in $APP_MODULES; do
+            curl -sSL "$GITHUB_RAW/$module" -o "$INSTALL_DIR/$module" || exit 1
+        done
         curl -sSL "$GITHUB_RAW/requirements.txt" -o "$INSTALL_DIR/requirements.txt" || exit 1
     elif check_command wget; then
         wget -q "$GITHUB_RAW/youtube_downloader.py" -O "$INSTALL_DIR/youtube_downloader.py" || exit 1
         wget -q "$GITHUB_RAW/updater.py" -O "$INSTALL_DIR/updater.py" 2>/dev/null || true
-        wget -q "$GITHUB_RAW/version.py" -O "$INSTALL_DIR/version.py" 2>/dev/null || true
+        wget -q "$GITHUB_RAW/version.py" -O "$INSTALL_DIR/version.py" || exit 1
+        APP_MODULES="$(app_modules "$INSTALL_DIR")" || exit 1
+        for module in $APP_MODULES; do
+            wget -q "$GITHUB_RAW/$module" -O "$INSTALL_DIR/$module" || exit 1
+        done
         wget -q "$GITHUB_RAW/requirements.txt" -O "$INSTALL_DIR/requirements.txt" || exit 1
     else
         print_error_box "Neither curl nor wget found" \
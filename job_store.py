@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Persistent job queue
+Keeps unfinished downloads (URL, options and how far each partial file
+got) in a small JSON file, so after a crash, update or restart they are
+queued again and continue from their `.part` files instead of starting
+over.
+Part of the Flare ecosystem.
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Dict, List, Optional
+
+from paths import get_data_path
+
+# Progress-only changes are written at most this often
+SAVE_INTERVAL = 2.0
+STORE_VERSION = 1
+
+
+class JobStore:
+    """
+    Unfinished jobs keyed by `job.key`. State changes are saved at once,
+    byte counts at most every SAVE_INTERVAL seconds; writes are atomic so
+    a crash mid-save leaves the previous file intact.
+    """
+
+    def __init__(self, path: Optional[str] = None, save_interval: float = SAVE_INTERVAL):
+        self.path = path or get_data_path("queue.json")
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._records: Dict[str, dict] = {}
+        self._dirty = False
+        self._saved_at = 0.0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            jobs = data.get('jobs', [])
+        except (OSError, ValueError, AttributeError):
+            return
+        for record in jobs:
+            if isinstance(record, dict) and record.get('key') and record.get('url'):
+                self._records[record['key']] = record
+
+    def _save(self):
+        """Write the file (lock held)."""
+        data = json.dumps({
+            'version': STORE_VERSION,
+            'jobs': sorted(self._records.values(), key=lambda r: r.get('added', 0)),
+        }, indent=1)
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except OSError:
+            return
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    # ── Queue side ──────────────────────────────────────────────────────
+
+    def update(self, job, force: bool = False):
+        """
+        Record `job`'s options, state and partial file sizes. Saved right
+        away when the state changed (or `force`), otherwise batched.
+        """
+        with self._lock:
+            record = self._records.get(job.key)
+            state_changed = record is None or record.get('state') != job.state
+            self._records[job.key] = {
+                'key': job.key,
+                'url': job.url,
+                'output_dir': job.output_dir,
+                'fmt': job.fmt,
+                'quality': job.quality,
+                'is_audio': job.is_audio,
+                'format_spec': job.format_spec,
+                'state': job.state,
+                'title': job.title,
+                'parts': dict(job.received),
+                'added': record.get('added', time.time()) if record else time.time(),
+            }
+            self._dirty = True
+            if force or state_changed or time.monotonic() - self._saved_at >= self.save_interval:
+                self._save()
+
+    def remove(self, job):
+        with self._lock:
+            if self._records.pop(job.key, None) is not None:
+                self._save()
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    # ── Restore side ────────────────────────────────────────────────────
+
+    def pending(self) -> List[dict]:
+        """Jobs that did not finish in an earlier run, oldest first."""
+        with self._lock:
+            return sorted((dict(r) for r in self._records.values()), key=lambda r: r.get('added', 0))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._save()
+
+
+def resumable_bytes(record: dict) -> int:
+    """Bytes received into the record's partial files that are still on disk."""
+    total = 0
+    for path, received in (record.get('parts') or {}).items():
+        try:
+            total += min(int(received), os.path.getsize(path))
+        except (OSError, TypeError, ValueError):
+            pass
+    return total
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Logging
+All messages go through the standard `logging` module. A rotating file
+keeps the full history on disk, while a fixed-size ring buffer holds the
+recent lines the GUI renders, so long sessions stay fast.
+Part of the Flare ecosystem.
+"""
+
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from typing import Callable, List, Optional, Tuple
+
+from paths import get_data_path
+
+LOGGER_NAME = "flare"
+LOG_FILE_MAX_BYTES = 2 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+RING_CAPACITY = 2000
+
+# Levels offered in the GUI filter
+LEVELS = {
+    "Debug": logging.DEBUG,
+    "Info": logging.INFO,
+    "Warnings": logging.WARNING,
+    "Errors": logging.ERROR,
+}
+
+
+class LogBuffer(logging.Handler):
+    """
+    logging handler that keeps the last `capacity` records in memory.
+
+    emit() may run on any thread. The consumer calls drain() to get the
+    lines added since its last drain in one batch, and snapshot() to
+    re-render everything still buffered (e.g. after a filter change).
+    `on_new` is invoked once per batch, when the first new record arrives
+    after a drain, so the consumer can schedule a flush.
+    """
+
+    def __init__(self, capacity: int = RING_CAPACITY,
+                 on_new: Optional[Callable[[], None]] = None):
+        super().__init__()
+        self.on_new = on_new
+        self._records = deque(maxlen=capacity)
+        self._new = deque(maxlen=capacity)
+        self._dropped = 0
+        self._lock_buffer = threading.Lock()
+        self.setFormatter(logging.Formatter("%(message)s"))
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            line = (record.levelno, self.format(record))
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self._lock_buffer:
+            first = not self._new
+            if len(self._new) == self._new.maxlen:
+                self._dropped += 1
+            self._records.append(line)
+            self._new.append(line)
+
+        if first and self.on_new:
+            self.on_new()
+
+    def drain(self, level: int = logging.NOTSET) -> Tuple[List[str], int]:
+        """New lines at or above `level`, and how many were dropped unseen."""
+        with self._lock_buffer:
+            lines = [text for levelno, text in self._new if levelno >= level]
+            dropped, self._dropped = self._dropped, 0
+            self._new.clear()
+        return lines, dropped
+
+    def snapshot(self, level: int = logging.NOTSET) -> List[str]:
+        with self._lock_buffer:
+            return [text for levelno, text in self._records if levelno >= level]
+
+    def clear(self):
+        with self._lock_buffer:
+            self._records.clear()
+            self._new.clear()
+            self._dropped = 0
+
+
+class _ErrorPrefix(logging.Formatter):
+    """GUI formatter: flag warnings and errors the way the log always has"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        return f"[!] {message}" if record.levelno >= logging.WARNING else message
+
+
+def setup_logging(buffer: Optional[LogBuffer] = None,
+                  log_file: Optional[str] = None,
+                  file_level: int = logging.DEBUG) -> logging.Logger:
+    """
+    Configure the "flare" logger with a rotating file and optional ring buffer.
+    Safe to call more than once; existing handlers are replaced.
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    try:
+        path = log_file or get_data_path("logs", "flare.log")
+        file_handler = RotatingFileHandler(
+            path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8"
+        )
+        file_handler.setLevel(file_level)
+        file_handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)-7s [%(threadName)s] %(message)s"
+        ))
+        logger.addHandler(file_handler)
+    except OSError:
+        # Read-only home or similar - keep running with the in-memory log
+        pass
+
+    if buffer is not None:
+        buffer.setFormatter(_ErrorPrefix("%(message)s"))
+        logger.addHandler(buffer)
+
+    return logger
+
+
+def get_logger() -> logging.Logger:
+    return logging.getLogger(LOGGER_NAME)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Download metrics
+Per-job timings and throughput (queue wait, extraction, time to first
+byte, download, post-processing, bytes, average and peak speed,
+retries). Every finished job is appended to a JSON-lines file
+(metrics.jsonl in the data folder) and added to per-site totals, which
+can be served as Prometheus text on a local port.
+Part of the Flare ecosystem.
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Callable, Dict, Optional
+
+from paths import get_data_path
+
+# Rotated to metrics.jsonl.1 beyond this size
+MAX_FILE_BYTES = 5 * 1024 * 1024
+
+# Phases timed per job, in order
+PHASES = ('queue', 'extract', 'first_byte', 'download', 'postprocess', 'total')
+
+
+class JobMetrics:
+    """Timestamps (time.monotonic()) and counters for one job"""
+
+    def __init__(self):
+        self.queued = time.monotonic()
+        self.started: Optional[float] = None
+        self.extracted: Optional[float] = None
+        self.first_byte: Optional[float] = None
+        self.downloaded: Optional[float] = None
+        self.pp_started: Optional[float] = None
+        self.pp_finished: Optional[float] = None
+        self.ended: Optional[float] = None
+        self.extractor: Optional[str] = None
+        self.retries = 0
+        self.peak_speed = 0.0
+        # Bytes per file as reported by yt-dlp (video and audio are separate files)
+        self.files: Dict[str, int] = {}
+        self.final_size: Optional[int] = None
+
+    def start(self):
+        self.started = time.monotonic()
+
+    def extract_done(self):
+        self.extracted = time.monotonic()
+
+    def progress(self, d: dict):
+        """Take a yt-dlp progress dict."""
+        received = d.get('downloaded_bytes') or 0
+        if received and self.first_byte is None:
+            self.first_byte = time.monotonic()
+        if d.get('status') == 'finished':
+            received = max(received, d.get('total_bytes') or 0)
+        self.files[d.get('filename') or d.get('tmpfilename') or ''] = received
+        speed = d.get('speed')
+        if speed and speed > self.peak_speed:
+            self.peak_speed = speed
+
+    def retry(self):
+        self.retries += 1
+
+    def download_done(self):
+        self.downloaded = time.monotonic()
+
+    def postprocess_start(self):
+        self.pp_started = time.monotonic()
+
+    def postprocess_done(self):
+        self.pp_finished = time.monotonic()
+
+    def end(self, filepath: Optional[str] = None):
+        self.ended = time.monotonic()
+        if filepath:
+            try:
+                self.final_size = os.path.getsize(filepath)
+            except OSError:
+                pass
+
+    @property
+    def bytes(self) -> int:
+        return sum(self.files.values())
+
+    def durations(self) -> Dict[str, Optional[float]]:
+        """Seconds per phase; None for phases the job did not reach."""
+        def span(start, end):
+            return round(end - start, 3) if start is not None and end is not None else None
+
+        return {
+            'queue': span(self.queued, self.started),
+            'extract': span(self.started, self.extracted),
+            'first_byte': span(self.extracted, self.first_byte),
+            'download': span(self.extracted, self.downloaded),
+            'postprocess': span(self.pp_started, self.pp_finished),
+            'total': span(self.queued, self.ended),
+        }
+
+    def average_speed(self) -> Optional[float]:
+        """Bytes per second from the first byte to the end of the download."""
+        if self.first_byte is None or self.downloaded is None or self.downloaded <= self.first_byte:
+            return None
+        return self.bytes / (self.downloaded - self.first_byte)
+
+
+def job_record(job) -> dict:
+    """The JSON-lines record for a finished download_queue.DownloadJob."""
+    m: JobMetrics = job.metrics
+    average = m.average_speed()
+    return {
+        'time': round(time.time(), 3),
+        'key': job.key,
+        'url': job.url,
+        'site': job.site,
+        'extractor': m.extractor,
+        'title': job.title,
+        'mode': 'audio' if job.is_audio else 'video',
+        'format': job.fmt,
+        'state': job.state,
+        'error': job.error,
+        'seconds': m.durations(),
+        'bytes': m.bytes,
+        'final_size': m.final_size,
+        'avg_bps': round(average) if average else None,
+        'peak_bps': round(m.peak_speed) or None,
+        'retries': m.retries,
+    }
+
+
+class SiteTotals:
+    """Running totals for one site"""
+
+    def __init__(self):
+        self.jobs: Dict[str, int] = {}
+        self.bytes = 0
+        self.retries = 0
+        self.phase_sum: Dict[str, float] = {}
+        self.phase_count: Dict[str, int] = {}
+        self.peak_bps = 0.0
+
+    def add(self, record: dict):
+        self.jobs[record['state']] = self.jobs.get(record['state'], 0) + 1
+        self.bytes += record['bytes']
+        self.retries += record['retries']
+        self.peak_bps = max(self.peak_bps, record['peak_bps'] or 0)
+        for phase, seconds in record['seconds'].items():
+            if seconds is not None:
+                self.phase_sum[phase] = self.phase_sum.get(phase, 0.0) + seconds
+                self.phase_count[phase] = self.phase_count.get(phase, 0) + 1
+
+
+def _label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRecorder:
+    """
+    Receives finished jobs (record()), appends them to `path` and keeps
+    per-site totals for summary() and prometheus_text(); `on_record(record)`
+    sees each record as it is written.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = MAX_FILE_BYTES,
+                 on_record: Optional[Callable[[dict], None]] = None):
+        self.path = path or get_data_path("metrics.jsonl")
+        self.max_bytes = max_bytes
+        self.on_record = on_record
+        self._lock = threading.Lock()
+        self._sites: Dict[str, SiteTotals] = {}
+        self._server = None
+
+    def record(self, job) -> dict:
+        record = job_record(job)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._sites.setdefault(record['site'] or 'unknown', SiteTotals()).add(record)
+            self._append(line)
+        if self.on_record is not None:
+            self.on_record(record)
+        return record
+
+    def _append(self, line: str):
+        """Write one line (lock held); a failing disk must not fail the download."""
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + '.1')
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        except OSError:
+            pass
+
+    def summary(self) -> str:
+        """One line over all sites, empty before the first job."""
+        with self._lock:
+            sites = list(self._sites.values())
+        jobs = sum(sum(site.jobs.values()) for site in sites)
+        if not jobs:
+            return ""
+        line = f"{jobs} jobs, {sum(site.bytes for site in sites) / 1048576:.1f} MB"
+        averages = []
+        for phase, label in (('extract', "extract"), ('first_byte', "first byte"),
+                             ('download', "download"), ('postprocess', "processing")):
+            count = sum(site.phase_count.get(phase, 0) for site in sites)
+            if count:
+                seconds = sum(site.phase_sum.get(phase, 0.0) for site in sites) / count
+                averages.append(f"{label} {seconds:.1f}s")
+        if averages:
+            line += "; average " + ", ".join(averages)
+        retries = sum(site.retries for site in sites)
+        if retries:
+            line += f"; {retries} retries"
+        return line
+
+    def prometheus_text(self) -> str:
+        """Per-site totals in the Prometheus text exposition format."""
+        with self._lock:
+            sites = sorted(self._sites.items())
+            lines = [
+                "# HELP flare_jobs_total Finished downloads by site and final state.",
+                "# TYPE flare_jobs_total counter",
+            ]
+            for site, totals in sites:
+                for state, count in sorted(totals.jobs.items()):
+                    lines.append(f'flare_jobs_total{{site="{_label(site)}",state="{_label(state)}"}} {count}')
+            lines += [
+                "# HELP flare_downloaded_bytes_total Bytes downloaded by site.",
+                "# TYPE flare_downloaded_bytes_total counter",
+            ]
+            lines += [f'flare_downloaded_bytes_total{{site="{_label(site)}"}} {totals.bytes}'
+                      for site, totals in sites]
+            lines += [
+                "# HELP flare_retries_total Retried requests by site.",
+                "# TYPE flare_retries_total counter",
+            ]
+            lines += [f'flare_retries_total{{site="{_label(site)}"}} {totals.retries}'
+                      for site, totals in sites]
+            lines += [
+                "# HELP flare_peak_bytes_per_second Highest download speed seen by site.",
+                "# TYPE flare_peak_bytes_per_second gauge",
+            ]
+            lines += [f'flare_peak_bytes_per_second{{site="{_label(site)}"}} {round(totals.peak_bps)}'
+                      for site, totals in sites]
+            lines += [
+                "# HELP flare_phase_seconds Time spent per job phase by site.",
+                "# TYPE flare_phase_seconds summary",
+            ]
+            for site, totals in sites:
+                for phase in PHASES:
+                    if phase in totals.phase_count:
+                        labels = f'phase="{phase}",site="{_label(site)}"'
+                        lines.append(f'flare_phase_seconds_sum{{{labels}}} {totals.phase_sum[phase]:.3f}')
+                        lines.append(f'flare_phase_seconds_count{{{labels}}} {totals.phase_count[phase]}')
+        return "\n".join(lines) + "\n"
+
+    # ── Endpoint ────────────────────────────────────────────────────────
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> int:
+        """Serve prometheus_text() at http://host:port/metrics; returns the port."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = recorder.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Standard locations
+Where the app lives, where it keeps its own data, and where downloads go.
+Part of the Flare ecosystem.
+"""
+
+import os
+import sys
+
+APP_DIR_NAME = "FlareDownload"
+
+
+def get_app_dir() -> str:
+    """Directory of the running script or frozen executable"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def get_data_dir() -> str:
+    """
+    Per-user directory for logs, caches and state, created on first use.
+    Matches the install location used by install.bat / install.sh.
+    Override with the FLARE_DATA_DIR environment variable.
+    """
+    path = os.environ.get("FLARE_DATA_DIR")
+    if not path:
+        if sys.platform == 'win32':
+            base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+            path = os.path.join(base, APP_DIR_NAME)
+        elif sys.platform == 'darwin':
+            path = os.path.expanduser("~/Library/Application Support/Flare Download")
+        else:
+            base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+            path = os.path.join(base, "flare-download")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_data_path(*parts: str) -> str:
+    """Path inside the data directory; parent folders are created."""
+    path = os.path.join(get_data_dir(), *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def get_default_download_dir() -> str:
+    downloads = os.path.expanduser("~/Downloads")
+    return downloads if os.path.isdir(downloads) else os.path.expanduser("~")
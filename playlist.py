@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Playlists and channels
+Lists playlist/channel entries without resolving each video
+(yt-dlp `extract_flat`), and remembers which entries finished so an
+interrupted playlist resumes where it stopped.
+Part of the Flare ecosystem.
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Set
+
+from paths import get_data_path
+from download_queue import JobState, load_yt_dlp
+from ydl_options import base_opts
+
+# Nested playlists (e.g. a channel's Videos/Shorts/Live tabs) are listed in parallel
+EXTRACT_WORKERS = 4
+
+# Cheap pre-check so single videos never pay for a flat extraction
+PLAYLIST_URL_PATTERN = re.compile(
+    r"[?&]list=|/playlist\b|/channel/|/c/|/user/|/@[^/?#]+/?(?:videos|shorts|streams|playlists)?/?(?:[?#]|$)"
+    r"|/sets/|/album/|/showcase/|/collection",
+    re.IGNORECASE,
+)
+
+
+def looks_like_playlist(url: str) -> bool:
+    return bool(PLAYLIST_URL_PATTERN.search(url))
+
+
+class PlaylistEntry:
+    """One video of a playlist, as listed by a flat extraction"""
+
+    def __init__(self, index: int, entry_id: str, url: str,
+                 title: Optional[str] = None, duration: Optional[float] = None):
+        self.index = index
+        self.id = entry_id
+        self.url = url
+        self.title = title or url
+        self.duration = duration
+
+    def label(self) -> str:
+        if self.duration:
+            minutes, seconds = divmod(int(self.duration), 60)
+            return f"{self.index:>4}. {self.title}  ({minutes}:{seconds:02d})"
+        return f"{self.index:>4}. {self.title}"
+
+
+class Playlist:
+    """A flat-extracted playlist or channel"""
+
+    def __init__(self, url: str, playlist_id: str, title: str,
+                 extractor: str, entries: List[PlaylistEntry]):
+        self.url = url
+        self.id = playlist_id
+        self.title = title
+        self.extractor = extractor
+        self.entries = entries
+
+    @property
+    def key(self) -> str:
+        """Stable identifier used for resume state"""
+        return f"{self.extractor}_{self.id}"
+
+
+def _flat_opts() -> dict:
+    opts = base_opts()
+    opts.update({
+        'extract_flat': 'in_playlist',
+        'noplaylist': False,
+        'skip_download': True,
+    })
+    return opts
+
+
+def _entry_url(entry: dict) -> Optional[str]:
+    return entry.get('url') or entry.get('webpage_url') or entry.get('id')
+
+
+def _is_nested_playlist(entry: dict) -> bool:
+    # Flat channel pages list their tabs as url entries pointing at playlists
+    if entry.get('_type') == 'playlist':
+        return True
+    return entry.get('ie_key') == 'YoutubeTab' and not entry.get('duration')
+
+
+def extract_playlist(url: str, log: Optional[Callable[[str], None]] = None,
+                     cookies=None, retry_policy=None, sessions=None) -> Optional[Playlist]:
+    """
+    List the entries of a playlist or channel URL.
+    Returns None if the URL resolves to a single video.
+    `cookies` is a cookie_store.CookieStore to sign in with; `retry_policy`
+    and `sessions` are the download queue's.
+    """
+    yt_dlp = load_yt_dlp()
+    from ydl_session import extracting_ydl
+
+    def _extract(list_url: str):
+        with extracting_ydl(_flat_opts(), list_url, retry_policy, sessions, cookies) as ydl:
+            return ydl.extract_info(list_url, download=False)
+
+    info = _extract(url)
+
+    if not info or info.get('_type') not in ('playlist', 'multi_video'):
+        return None
+
+    raw_entries = [e for e in info.get('entries') or [] if e]
+    nested = [e for e in raw_entries if _is_nested_playlist(e)]
+    videos = [e for e in raw_entries if not _is_nested_playlist(e)]
+
+    if nested:
+        if log:
+            log(f"Listing {len(nested)} sections of {info.get('title') or url}...")
+
+        def _list(entry):
+            # YoutubeDL instances are not shared between threads
+            try:
+                sub = _extract(_entry_url(entry))
+                return [e for e in (sub or {}).get('entries') or [] if e]
+            except yt_dlp.utils.DownloadError as e:
+                if log:
+                    log(f"Skipped section {entry.get('title') or _entry_url(entry)}: {str(e)[:60]}")
+                return []
+
+        with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as pool:
+            for sub_entries in pool.map(_list, nested):
+                videos.extend(sub_entries)
+
+    entries = []
+    seen = set()
+    for entry in videos:
+        entry_url = _entry_url(entry)
+        entry_id = str(entry.get('id') or entry_url)
+        if not entry_url or entry_id in seen:
+            continue
+        seen.add(entry_id)
+        entries.append(PlaylistEntry(
+            index=len(entries) + 1,
+            entry_id=entry_id,
+            url=entry_url,
+            title=entry.get('title'),
+            duration=entry.get('duration'),
+        ))
+
+    extractor = (info.get('extractor_key') or info.get('ie_key') or 'generic').lower()
+    playlist_id = str(info.get('id') or hashlib.sha1(url.encode('utf-8')).hexdigest()[:12])
+    return Playlist(url, playlist_id, info.get('title') or playlist_id, extractor, entries)
+
+
+def playlist_folder(output_dir: str, playlist: Playlist) -> str:
+    """Sub-folder of `output_dir` named after the playlist"""
+    name = load_yt_dlp().utils.sanitize_filename(playlist.title, restricted=False) or playlist.id
+    return os.path.join(output_dir, name)
+
+
+class PlaylistProgress:
+    """
+    Entry ids of a playlist that finished downloading, persisted as JSON
+    under the data directory so a re-run only fetches what is missing.
+    """
+
+    def __init__(self, playlist: Playlist, path: Optional[str] = None):
+        safe_key = re.sub(r'[^\w.-]', '_', playlist.key)
+        self.path = path or get_data_path("playlists", f"{safe_key}.json")
+        self.playlist = playlist
+        self._lock = threading.Lock()
+        self._done: Set[str] = set()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._done = set(json.load(f).get('done', []))
+        except (OSError, ValueError, AttributeError):
+            self._done = set()
+
+    def _save(self):
+        data = {
+            'url': self.playlist.url,
+            'title': self.playlist.title,
+            'total': len(self.playlist.entries),
+            'done': sorted(self._done),
+        }
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def is_done(self, entry: PlaylistEntry) -> bool:
+        with self._lock:
+            return entry.id in self._done
+
+    def pending(self, entries: Optional[Iterable[PlaylistEntry]] = None) -> List[PlaylistEntry]:
+        entries = self.playlist.entries if entries is None else entries
+        with self._lock:
+            return [e for e in entries if e.id not in self._done]
+
+    def mark_done(self, entry: PlaylistEntry):
+        with self._lock:
+            if entry.id in self._done:
+                return
+            self._done.add(entry.id)
+            self._save()
+
+    def reset(self):
+        with self._lock:
+            self._done.clear()
+            self._save()
+
+
+def submit_playlist(queue, playlist: Playlist, entries: Iterable[PlaylistEntry],
+                    output_dir: str, fmt: str, quality: str, is_audio: bool,
+                    progress: Optional[PlaylistProgress] = None) -> list:
+    """
+    Queue the given entries into `output_dir/<playlist title>`; the queue's
+    worker limit bounds how many run at once. Finished entries (and those
+    the archive skips) are recorded in `progress` for resume.
+    """
+    def finish_callback(entry: PlaylistEntry):
+        def on_finish(job):
+            # SKIPPED: the archive already has it, so there is nothing to resume
+            if job.state in (JobState.DONE, JobState.SKIPPED):
+                progress.mark_done(entry)
+        return on_finish
+
+    folder = playlist_folder(output_dir, playlist)
+    jobs = []
+    for entry in entries:
+        on_finish = finish_callback(entry) if progress is not None else None
+        jobs.append(queue.submit(entry.url, folder, fmt, quality, is_audio, on_finish=on_finish))
+    return jobs
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Progress coalescing
+yt-dlp reports progress for every fragment, which on fast DASH/HLS links
+means thousands of events per second. These helpers keep only the latest
+state per job so consumers can refresh at a fixed, low rate.
+Part of the Flare ecosystem.
+"""
+
+import time
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+# Refresh rate for progress consumers (GUI widgets, JSON lines)
+PROGRESS_HZ = 15
+
+
+class ProgressAggregator:
+    """
+    Latest-value-wins mailbox between worker threads and one consumer.
+
+    Producers call push() as often as they like; the consumer calls drain()
+    on its own schedule (e.g. a Tk `after` loop) and gets one entry per key.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, Any] = {}
+
+    def push(self, key: Hashable, item: Any):
+        with self._lock:
+            self._pending[key] = item
+
+    def drain(self) -> Dict[Hashable, Any]:
+        """Return and clear everything pushed since the last drain."""
+        with self._lock:
+            items, self._pending = self._pending, {}
+        return items
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            return bool(self._pending)
+
+
+class RateLimitedCallback:
+    """
+    Forward `callback(item)` at most `max_hz` times per second per key.
+
+    Items whose `urgent(item)` value differs from the last forwarded one
+    (e.g. a job changing state) always pass through immediately, so
+    consumers never miss a transition. Dropped intermediate items are not
+    replayed; the next forwarded item carries the latest state.
+    """
+
+    def __init__(self, callback: Callable[[Any], None], max_hz: float = PROGRESS_HZ,
+                 key: Callable[[Any], Hashable] = id,
+                 urgent: Optional[Callable[[Any], Any]] = None):
+        self.callback = callback
+        self.interval = 1.0 / max_hz if max_hz > 0 else 0.0
+        self.key = key
+        self.urgent = urgent
+
+        self._lock = threading.Lock()
+        self._last_time: Dict[Hashable, float] = {}
+        self._last_urgent: Dict[Hashable, Any] = {}
+
+    def __call__(self, item: Any):
+        k = self.key(item)
+        now = time.monotonic()
+        with self._lock:
+            marker = self.urgent(item) if self.urgent else None
+            changed = self.urgent is not None and self._last_urgent.get(k, object()) != marker
+            if not changed and now - self._last_time.get(k, float('-inf')) < self.interval:
+                return
+            self._last_time[k] = now
+            self._last_urgent[k] = marker
+        self.callback(item)
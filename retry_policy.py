@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Retry policy
+Shared, per-host retry behaviour for all downloads:
+
+  - exponential backoff with full jitter, so parallel jobs that fail
+    together do not retry in lockstep;
+  - Retry-After (from 429/503 responses) pauses every request to that
+    host, not just the one that got the answer; a 429/503 without it
+    pauses the host for a jittered backoff;
+  - a circuit breaker: after `breaker_threshold` failures in a row a
+    host is paused, then a single trial request decides whether it is
+    back (the pause doubles each time the trial fails).
+
+Retry counts, backoff time and pauses are counted per extractor.
+Part of the Flare ecosystem.
+"""
+
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+# Statuses that mean "slow down" rather than "this request is wrong"
+THROTTLE_STATUSES = (429, 503)
+FAILURE_STATUSES = (403, 429, 500, 502, 503, 504)
+
+
+class HostUnavailable(Exception):
+    """A host is paused for longer than a job is willing to wait."""
+
+
+def host_of(url: str) -> str:
+    try:
+        host = urlsplit(url).hostname or ''
+    except ValueError:
+        return ''
+    return host[4:] if host.startswith('www.') else host
+
+
+def stats_key_for_url(url: str) -> str:
+    """Extractor name for a URL's stats ("youtube"), else its host."""
+    from download_archive import archive_id_for_url
+
+    archive_id = archive_id_for_url(url)
+    if archive_id:
+        return archive_id.split()[0]
+    return host_of(url) or 'generic'
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+    return max(0.0, when - (now if now is not None else time.time()))
+
+
+class HostState:
+    """What the policy knows about one host"""
+
+    def __init__(self):
+        self.failures = 0           # consecutive
+        self.paused_until = 0.0     # monotonic time; Retry-After or open circuit
+        self.open_cooldown = 0.0    # current circuit pause, doubles on failed trials
+        self.trial_running = False  # half-open: one request is testing the host
+
+
+class RetryPolicy:
+    """
+    Backoff, Retry-After and circuit breaking, shared by all jobs.
+
+    Attach to yt-dlp through apply() (retry counts and sleep functions)
+    and ydl_session.FlareYoutubeDL (which calls before_request/record_*
+    around every request).
+    """
+
+    def __init__(self, retries: int = 10, fragment_retries: int = 10, extractor_retries: int = 5,
+                 throttle_retries: int = 3, base: float = 1.0, cap: float = 60.0,
+                 breaker_threshold: int = 5, breaker_cooldown: float = 30.0,
+                 breaker_max_cooldown: float = 600.0, max_wait: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.retries = retries
+        self.fragment_retries = fragment_retries
+        self.extractor_retries = extractor_retries
+        self.throttle_retries = throttle_retries
+        self.base = base
+        self.cap = cap
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.breaker_max_cooldown = breaker_max_cooldown
+        # Longer pauses fail the job instead of holding a worker
+        self.max_wait = max_wait
+        self._clock = clock
+        self._sleep = sleep
+
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, HostState] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        # Host of the last failed request, per thread; yt-dlp's sleep
+        # functions only get the attempt number
+        self._local = threading.local()
+
+    # ── Stats ───────────────────────────────────────────────────────────
+
+    def _count(self, key: str, field: str, amount: float = 1):
+        with self._lock:
+            stats = self._stats.setdefault(key or 'generic', {})
+            stats[field] = stats.get(field, 0) + amount
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-extractor counters, e.g. {'youtube': {'retries': 3, 'backoff_s': 4.2}}."""
+        with self._lock:
+            return {key: {field: round(value, 2) for field, value in fields.items()}
+                    for key, fields in self._stats.items()}
+
+    def summary(self) -> str:
+        """One line per extractor, empty when nothing was retried."""
+        lines = []
+        for key, fields in sorted(self.stats().items()):
+            parts = [f"{field}={value:g}" for field, value in sorted(fields.items())]
+            lines.append(f"{key}: {', '.join(parts)}")
+        return "\n".join(lines)
+
+    # ── yt-dlp options ──────────────────────────────────────────────────
+
+    def backoff(self, attempt: int, host: str = '') -> float:
+        """Full-jitter exponential delay before retry `attempt` (0-based), at least any Retry-After."""
+        delay = self._jitter(attempt)
+        if host:
+            with self._lock:
+                state = self._hosts.get(host)
+                if state is not None:
+                    delay = max(delay, state.paused_until - self._clock())
+        return max(0.0, delay)
+
+    def _jitter(self, attempt: int) -> float:
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+    def apply(self, ydl_opts: dict, key: str, on_retry: Optional[Callable[[], None]] = None):
+        """
+        Set retry counts and sleep functions on yt-dlp options; stats go to
+        `key`, and `on_retry()` is called before each retry.
+        """
+        def sleep_function(kind: str) -> Callable[..., float]:
+            def sleep(n: int) -> float:
+                delay = self.backoff(n, getattr(self._local, 'host', ''))
+                if on_retry is not None:
+                    on_retry()
+                self._count(key, 'retries')
+                self._count(key, f'{kind}_retries')
+                self._count(key, 'backoff_s', delay)
+                return delay
+            return sleep
+
+        ydl_opts['retries'] = self.retries
+        ydl_opts['fragment_retries'] = self.fragment_retries
+        ydl_opts['extractor_retries'] = self.extractor_retries
+        ydl_opts['retry_sleep_functions'] = {
+            'http': sleep_function('http'),
+            'fragment': sleep_function('fragment'),
+            'extractor': sleep_function('extractor'),
+        }
+        return ydl_opts
+
+    # ── Request side ────────────────────────────────────────────────────
+
+    def _state(self, host: str) -> HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState()
+        return state
+
+    def before_request(self, url: str, key: str = '',
+                       cancelled: Optional[Callable[[], bool]] = None):
+        """
+        Wait while the host is paused (Retry-After or open circuit). Raises
+        HostUnavailable if the pause is longer than max_wait, and yt-dlp's
+        DownloadCancelled once `cancelled()` is true. Returns True if this
+        request is the half-open trial: the caller must then report it
+        with record_success(), record_failure() or release_trial().
+        """
+        host = host_of(url)
+        waited = 0.0
+        trial = False
+        while True:
+            with self._lock:
+                state = self._state(host)
+                wait = state.paused_until - self._clock()
+                if wait <= 0:
+                    if state.failures < self.breaker_threshold:
+                        break
+                    if not state.trial_running:
+                        # Half-open: this request tests the host
+                        state.trial_running = trial = True
+                        break
+                    wait = 0.5
+            if waited + wait > self.max_wait:
+                raise HostUnavailable(f"{host} is not responding (paused for another {wait:.0f}s)")
+            if cancelled is not None and cancelled():
+                from download_queue import load_yt_dlp
+                raise load_yt_dlp().utils.DownloadCancelled("Cancelled by user")
+            step = min(wait, 1.0)
+            self._sleep(step)
+            waited += step
+        if waited:
+            self._count(key, 'paused_s', waited)
+        return trial
+
+    def release_trial(self, url: str):
+        """End a half-open trial that neither succeeded nor failed (e.g. cancelled)."""
+        with self._lock:
+            state = self._hosts.get(host_of(url))
+            if state is not None:
+                state.trial_running = False
+
+    def record_success(self, url: str):
+        host = host_of(url)
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None and (state.failures or state.trial_running):
+                state.failures = 0
+                state.open_cooldown = 0.0
+                state.trial_running = False
+
+    def record_failure(self, url: str, status: Optional[int] = None,
+                       retry_after: Optional[str] = None, key: str = ''):
+        """Count a failed request (HTTP status, or None for a network error)."""
+        if status is not None and status not in FAILURE_STATUSES:
+            # 404 and friends say nothing about the host's health
+            self.record_success(url)
+            return
+
+        host = host_of(url)
+        self._local.host = host
+        pause = parse_retry_after(retry_after) if status in THROTTLE_STATUSES else None
+        backoff = 0.0
+        opened = False
+        with self._lock:
+            state = self._state(host)
+            state.failures += 1
+            now = self._clock()
+            if status in THROTTLE_STATUSES and pause is None:
+                # No Retry-After: every job on the host backs off, growing
+                # with the failures in a row, instead of resending at once
+                pause = backoff = self._jitter(state.failures - 1)
+            if state.trial_running or state.failures == self.breaker_threshold:
+                state.open_cooldown = min(self.breaker_max_cooldown,
+                                          state.open_cooldown * 2 or self.breaker_cooldown)
+                state.paused_until = max(state.paused_until, now + state.open_cooldown)
+                state.trial_running = False
+                opened = True
+            if pause:
+                state.paused_until = max(state.paused_until, now + pause)
+
+        if status in THROTTLE_STATUSES:
+            self._count(key, 'throttled')
+        if backoff:
+            self._count(key, 'backoff_s', backoff)
+        if opened:
+            self._count(key, 'circuit_opened')
+
+    def retry_throttled(self, status: Optional[int], attempt: int, key: str = '') -> bool:
+        """Whether a request answered with 429/503 should be sent again (after before_request)."""
+        if status not in THROTTLE_STATUSES or attempt >= self.throttle_retries:
+            return False
+        self._count(key, 'retries')
+        self._count(key, 'throttle_retries')
+        return True
+
+    def host_status(self) -> Dict[str, dict]:
+        """Hosts with failures or pauses, for diagnostics."""
+        now = self._clock()
+        with self._lock:
+            return {
+                host: {'failures': state.failures,
+                       'paused_s': round(max(0.0, state.paused_until - now), 1)}
+                for host, state in self._hosts.items()
+                if state.failures or state.paused_until > now
+            }
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Segmented HTTP downloader
+Fetches a progressive file over several connections at once, one byte
+range each, for CDNs that throttle every connection separately. Ranges
+are written straight into a preallocated file and the result is checked
+against the size the server announced.
+
+Used as the "Segmented" engine (see ydl_session.py): progressive http(s)
+formats go through SegmentedDownloader, and DASH/HLS fragments are
+fetched in parallel by yt-dlp (`concurrent_fragment_downloads`).
+Part of the Flare ecosystem.
+"""
+
+import os
+import ssl
+import json
+import time
+import threading
+import http.client
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from download_queue import load_yt_dlp
+
+ENGINES = ("native", "segmented")
+DEFAULT_CONNECTIONS = 4
+MAX_CONNECTIONS = 16
+# Smaller files finish before extra connections pay off
+MIN_FILE_SIZE = 4 * 1024 * 1024
+MIN_SEGMENT_SIZE = 1024 * 1024
+# Segments per connection, so fast connections pick up the slack of slow ones
+SEGMENTS_PER_CONNECTION = 4
+BLOCK_SIZE = 256 * 1024
+MAX_REDIRECTS = 5
+
+
+class SegmentedDownloadError(Exception):
+    """The segmented download failed; the caller may fall back to one connection."""
+
+
+class RangeNotSupported(SegmentedDownloadError):
+    """The server does not answer byte-range requests with a known size."""
+
+
+class ConnectionPool:
+    """Keep-alive http.client connections, reused per (scheme, host, port)"""
+
+    def __init__(self, timeout: float = 30, verify: bool = True):
+        self.timeout = timeout
+        self._context = ssl.create_default_context() if verify else ssl._create_unverified_context()
+        self._lock = threading.Lock()
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+
+    @staticmethod
+    def _key(url: str) -> Tuple[str, str, int]:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        return scheme, parts.hostname or '', parts.port or (443 if scheme == 'https' else 80)
+
+    def get(self, url: str) -> http.client.HTTPConnection:
+        with self._lock:
+            idle = self._idle.get(self._key(url))
+            if idle:
+                return idle.pop()
+        return self.new(url)
+
+    def new(self, url: str) -> http.client.HTTPConnection:
+        scheme, host, port = self._key(url)
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def put(self, url: str, conn: http.client.HTTPConnection):
+        """Return a connection whose last response was read to the end."""
+        with self._lock:
+            self._idle.setdefault(self._key(url), []).append(conn)
+
+    def close(self):
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+
+def _path_of(url: str) -> str:
+    parts = urlsplit(url)
+    return (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+
+
+def _request(pool: ConnectionPool, url: str, headers: Dict[str, str]):
+    """Send a GET on a pooled connection; returns (connection, response)."""
+    conn = pool.get(url)
+    try:
+        conn.request('GET', _path_of(url), headers=headers)
+        return conn, conn.getresponse()
+    except (OSError, http.client.HTTPException):
+        conn.close()
+    # The server may have dropped an idle kept-alive connection; retry once on a fresh one
+    conn = pool.new(url)
+    try:
+        conn.request('GET', _path_of(url), headers=headers)
+        return conn, conn.getresponse()
+    except BaseException:
+        conn.close()
+        raise
+
+
+def probe_ranges(pool: ConnectionPool, url: str, headers: Dict[str, str]) -> Tuple[str, int]:
+    """
+    Ask for the first byte to learn the file size and whether ranges work.
+    Returns (final url after redirects, total size).
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        conn, resp = _request(pool, url, dict(headers, Range='bytes=0-0'))
+        if resp.status in (301, 302, 303, 307, 308) and resp.getheader('Location'):
+            conn.close()
+            url = urljoin(url, resp.getheader('Location'))
+            continue
+        if resp.status != 206:
+            # Do not read what may be the whole file
+            conn.close()
+            raise RangeNotSupported(f"HTTP {resp.status} to a range request")
+        resp.read()
+        pool.put(url, conn)
+        content_range = resp.getheader('Content-Range') or ''
+        total = content_range.rpartition('/')[2]
+        if not total.isdigit():
+            raise RangeNotSupported(f"Unknown size ({content_range or 'no Content-Range'})")
+        return url, int(total)
+    raise SegmentedDownloadError("Too many redirects")
+
+
+def split_ranges(total: int, connections: int,
+                 min_segment: int = MIN_SEGMENT_SIZE) -> List[Tuple[int, int]]:
+    """Inclusive (start, end) byte ranges covering `total` bytes."""
+    if total <= 0:
+        return []
+    count = max(1, min(connections * SEGMENTS_PER_CONNECTION, total // max(1, min_segment)))
+    size = -(-total // count)
+    return [(start, min(start + size, total) - 1) for start in range(0, total, size)]
+
+
+if hasattr(os, 'pwrite'):
+    def _write_at(fd: int, data: bytes, offset: int, lock: threading.Lock):
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data = data[written:]
+            offset += written
+else:
+    # Windows has no pwrite; seek and write under a lock instead
+    def _write_at(fd: int, data: bytes, offset: int, lock: threading.Lock):
+        with lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            while data:
+                written = os.write(fd, data)
+                data = data[written:]
+
+
+class SegmentedDownloader:
+    """
+    Download `url` to `path` with up to `connections` parallel range
+    requests.
+
+    `progress(downloaded, total)` is called after every block, from the
+    worker threads but never concurrently. It may raise to abort (yt-dlp
+    cancels that way) and may sleep to slow all connections down (see
+    bandwidth.BandwidthManager).
+    Raises RangeNotSupported before touching `path` if the server cannot
+    serve ranges, and SegmentedDownloadError if a range keeps failing or
+    the assembled file has the wrong size.
+
+    With `resume`, finished ranges are listed in `<path>.segments` as they
+    complete, and a later download of the same size only fetches the rest.
+    """
+
+    def __init__(self, url: str, path: str, headers: Optional[Dict[str, str]] = None,
+                 connections: int = DEFAULT_CONNECTIONS, min_segment: int = MIN_SEGMENT_SIZE,
+                 timeout: float = 30, retries: int = 3, verify: bool = True,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 resume: bool = True,
+                 backoff: Optional[Callable[[int], float]] = None):
+        self.url = url
+        self.path = path
+        self.headers = dict(headers or {})
+        # Ranges of a compressed body would not line up
+        self.headers['Accept-Encoding'] = 'identity'
+        self.connections = max(1, min(connections, MAX_CONNECTIONS))
+        self.min_segment = min_segment
+        self.retries = retries
+        self.progress = progress
+        self.resume = resume
+        # Seconds to wait before retry number n of a range (n starts at 0)
+        self.backoff = backoff or (lambda n: min(0.5 * 2 ** (n + 1), 5))
+        self.state_path = path + '.segments'
+        self.pool = ConnectionPool(timeout=timeout, verify=verify)
+
+        self.total = 0
+        self.downloaded = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._segments: List[Tuple[int, int]] = []
+        self._finished: set = set()
+
+    def probe(self) -> int:
+        """Resolve redirects and return the file size (cached)."""
+        if not self.total:
+            self.url, self.total = probe_ranges(self.pool, self.url, self.headers)
+        return self.total
+
+    def download(self) -> int:
+        """Fetch the whole file; returns its size."""
+        total = self.probe()
+        self._stop.clear()
+
+        resumed = self.resume and self._load_state(total)
+        if not resumed:
+            self._segments = split_ranges(total, self.connections, self.min_segment)
+            self._finished = set()
+        segments = deque((i, start, end) for i, (start, end) in enumerate(self._segments)
+                         if i not in self._finished)
+        self.downloaded = sum(self._segments[i][1] - self._segments[i][0] + 1 for i in self._finished)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        fd = os.open(self.path, flags if resumed else flags | os.O_TRUNC, 0o666)
+        try:
+            # Preallocate so every range can be written in place
+            os.ftruncate(fd, total)
+            if self.resume and not resumed:
+                self._save_state()
+            workers = max(1, min(self.connections, len(segments)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(self._worker, fd, segments) for _ in range(workers)]
+                try:
+                    done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                    for future in done:
+                        future.result()
+                except BaseException:
+                    self._stop.set()
+                    raise
+            os.fsync(fd)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+            self.pool.close()
+
+        if self.downloaded != total or size != total:
+            raise SegmentedDownloadError(
+                f"Incomplete download: got {self.downloaded} of {total} bytes (file is {size})")
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+        self._report()
+        return total
+
+    def _load_state(self, total: int) -> bool:
+        """Pick up finished ranges from an interrupted download of the same file."""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state['total'] != total or os.path.getsize(self.path) != total:
+                return False
+            self._segments = [(int(start), int(end)) for start, end in state['segments']]
+            self._finished = {int(i) for i in state['finished'] if 0 <= int(i) < len(self._segments)}
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        return True
+
+    def _save_state(self):
+        data = json.dumps({'total': self.total, 'segments': self._segments,
+                           'finished': sorted(self._finished)})
+        tmp = self.state_path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp, self.state_path)
+        except OSError:
+            pass
+
+    def _report(self):
+        if self.progress:
+            self.progress(self.downloaded, self.total)
+
+    def _next_segment(self, segments: deque) -> Optional[Tuple[int, int, int]]:
+        try:
+            return segments.popleft()
+        except IndexError:
+            return None
+
+    def _worker(self, fd: int, segments: deque):
+        while not self._stop.is_set():
+            segment = self._next_segment(segments)
+            if segment is None:
+                return
+            index, start, end = segment
+            # cursor[0] is the next missing byte, so a retry resumes mid-range
+            cursor = [start]
+            attempt = 0
+            while cursor[0] <= end:
+                try:
+                    self._fetch(fd, cursor, end)
+                except (OSError, http.client.HTTPException, SegmentedDownloadError) as e:
+                    attempt += 1
+                    if attempt > self.retries or self._stop.is_set():
+                        raise SegmentedDownloadError(f"Range {cursor[0]}-{end} failed: {e}") from e
+                    time.sleep(self.backoff(attempt - 1))
+            if self.resume:
+                with self._lock:
+                    self._finished.add(index)
+                    self._save_state()
+
+    def _fetch(self, fd: int, cursor: List[int], end: int):
+        """Fetch bytes cursor[0]..end into the file, advancing cursor[0]."""
+        start = cursor[0]
+        conn, resp = _request(self.pool, self.url, dict(self.headers, Range=f'bytes={start}-{end}'))
+        try:
+            if resp.status != 206:
+                raise SegmentedDownloadError(f"HTTP {resp.status} for range {start}-{end}")
+            content_range = resp.getheader('Content-Range') or ''
+            if not content_range.startswith(f'bytes {start}-'):
+                raise SegmentedDownloadError(f"Server sent {content_range!r} for range {start}-{end}")
+
+            while cursor[0] <= end:
+                if self._stop.is_set():
+                    raise SegmentedDownloadError("Stopped")
+                data = resp.read(min(BLOCK_SIZE, end - cursor[0] + 1))
+                if not data:
+                    raise SegmentedDownloadError(f"Connection closed at byte {cursor[0]}")
+                _write_at(fd, data, cursor[0], self._write_lock)
+                cursor[0] += len(data)
+                with self._lock:
+                    self.downloaded += len(data)
+                    self._report()
+        except BaseException:
+            conn.close()
+            raise
+
+        if resp.isclosed():
+            self.pool.put(self.url, conn)
+        else:
+            conn.close()
+
+
+def is_progressive(info: dict) -> bool:
+    """True for a single plain http(s) file that ranges can be used on."""
+    if info.get('requested_formats') or info.get('is_live') or info.get('request_data'):
+        return False
+    if info.get('section_start') or info.get('section_end') or info.get('impersonate'):
+        return False
+    if info.get('filesize') and info['filesize'] < MIN_FILE_SIZE:
+        return False
+    protocol = load_yt_dlp().utils.determine_protocol(info)
+    return protocol in ('http', 'https')
+
+
+_fd_class = None
+_class_lock = threading.Lock()
+
+
+def segmented_fd_class():
+    """
+    yt-dlp FileDownloader that runs SegmentedDownloader, falling back to
+    yt-dlp's HttpFD when ranges are not available or the file is small.
+    The connection count is the `concurrent_fragment_downloads` option.
+    """
+    global _fd_class
+    with _class_lock:
+        if _fd_class is None:
+            _fd_class = _build_fd_class()
+        return _fd_class
+
+
+def _build_fd_class():
+    load_yt_dlp()
+    from yt_dlp.downloader.http import HttpFD
+
+    class SegmentedHttpFD(HttpFD):
+        def real_download(self, filename, info_dict):
+            url = info_dict['url']
+            if self.params.get('proxy') or self.params.get('test'):
+                return super().real_download(filename, info_dict)
+
+            headers = dict(info_dict.get('http_headers') or {})
+            cookie = self.ydl.cookiejar.get_cookie_header(url)
+            if cookie:
+                headers['Cookie'] = cookie
+
+            # Not the usual .part: a preallocated file with gaps must never be
+            # mistaken for a contiguous partial download by yt-dlp's resume logic
+            tmpfilename = filename + '.segmented.part'
+            start = time.time()
+
+            def report(done: int, total: int):
+                now = time.time()
+                self._hook_progress({
+                    'status': 'downloading',
+                    'downloaded_bytes': done,
+                    'total_bytes': total,
+                    'tmpfilename': tmpfilename,
+                    'filename': filename,
+                    'eta': self.calc_eta(start, now, total, done),
+                    'speed': self.calc_speed(start, now, done),
+                    'elapsed': now - start,
+                    'ctx_id': info_dict.get('ctx_id'),
+                }, info_dict)
+
+            downloader = SegmentedDownloader(
+                url, tmpfilename, headers,
+                resume=self.params.get('continuedl', True),
+                connections=self.params.get('concurrent_fragment_downloads') or DEFAULT_CONNECTIONS,
+                timeout=self.params.get('socket_timeout') or 30,
+                retries=self.params.get('retries') or 3,
+                verify=not self.params.get('nocheckcertificate'),
+                progress=report,
+                backoff=self.params.get('retry_sleep_functions', {}).get('http'),
+            )
+            try:
+                total = downloader.probe()
+            except (SegmentedDownloadError, OSError, http.client.HTTPException) as e:
+                self.write_debug(f'Segmented download not possible: {e}')
+                return super().real_download(filename, info_dict)
+            if total < MIN_FILE_SIZE:
+                return super().real_download(filename, info_dict)
+
+            self.report_destination(filename)
+            try:
+                downloader.download()
+            except (SegmentedDownloadError, OSError, http.client.HTTPException) as e:
+                self.report_warning(f'Segmented download failed ({e}), retrying over one connection')
+                for path in (tmpfilename, downloader.state_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                return super().real_download(filename, info_dict)
+
+            self.try_rename(tmpfilename, filename)
+            self._hook_progress({
+                'status': 'finished',
+                'downloaded_bytes': total,
+                'total_bytes': total,
+                'filename': filename,
+                'elapsed': time.time() - start,
+                'ctx_id': info_dict.get('ctx_id'),
+            }, info_dict)
+            return True
+
+    return SegmentedHttpFD
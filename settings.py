@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Flare Download - User settings
+Small JSON file of preferences in the per-user data directory.
+Part of the Flare ecosystem.
+"""
+
+import os
+import json
+import threading
+from typing import Any, Dict, Optional
+
+from paths import get_data_path
+from download_queue import DEFAULT_SITE_LIMITS, DEFAULT_WORKERS
+from format_plan import DEFAULT_PRESET
+
+DEFAULTS: Dict[str, Any] = {
+    "reduced_motion": False,
+    "workers": DEFAULT_WORKERS,
+    "expand_playlists": True,
+    "use_archive": True,
+    # Queue video links copied anywhere (see clipboard_watch)
+    "watch_clipboard": False,
+    "engine": "native",
+    # Bytes per second or strings like "2M"; "" for unlimited
+    "bandwidth_limit": "",
+    "bandwidth_per_job": "",
+    # e.g. ["mon-fri 09:00-18:00 2M"] - replaces bandwidth_limit while active
+    "bandwidth_schedule": [],
+    # Parallel downloads per site, e.g. {"youtube.com": 2, "vimeo.com": 4}
+    "site_limits": DEFAULT_SITE_LIMITS,
+    # x264 preset for videos that cannot be stream-copied into their container
+    "encode_preset": DEFAULT_PRESET,
+    # FFmpeg directory or executable; "" to search next to the app and on PATH
+    "ffmpeg_location": "",
+    # Sign-in cookies shared by all downloads: a cookies.txt (refreshed
+    # cookies are saved back to it) and/or a browser, e.g. "firefox" or
+    # "chrome:Profile 1"
+    "cookies_file": "",
+    "cookies_from_browser": "",
+    # Own download profiles, e.g. [{"name": "music", "label": "Music M4A",
+    # "format": "m4a", "quality": "Best", "audio": true}] (see ydl_options)
+    "profiles": [],
+    # Serve download metrics (Prometheus text) on 127.0.0.1:PORT; 0 = off
+    "metrics_port": 0,
+}
+
+
+class Settings:
+    """Preferences with defaults, saved atomically on every change"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_data_path("settings.json")
+        self._lock = threading.Lock()
+        self._values: Dict[str, Any] = dict(DEFAULTS)
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(stored, dict):
+            with self._lock:
+                self._values.update(stored)
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self._values, indent=2, sort_keys=True)
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._values.get(key, DEFAULTS.get(key, default))
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            if self._values.get(key) == value:
+                return
+            self._values[key] = value
+        self.save()
@@ -4,8 +4,12 @@ NeonTube - Setup Script
 For building and distributing the application
 """
 
+import os
+
 from setuptools import setup, find_packages
 
+from version import APP_MODULES
+
 with open("README.md", "r", encoding="utf-8") as fh:
     long_description = fh.read()
 
@@ -18,7 +22,8 @@ setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/neontube/neontube",
-    py_modules=["youtube_downloader"],
+    py_modules=["youtube_downloader", "version", "updater"]
+               + [os.path.splitext(module)[0] for module in APP_MODULES],
     classifiers=[
         "Development Status :: 4 - Beta",
         "Environment :: X11 Applications",
@@ -44,6 +49,7 @@ setup(
     entry_points={
         "console_scripts": [
             "neontube=youtube_downloader:main",
+            "neontube-batch=flare_cli:main",
         ],
         "gui_scripts": [
             "neontube-gui=youtube_downloader:main",
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+# Keep logs, caches and resume state out of the real data directory
+os.environ.setdefault("FLARE_DATA_DIR", tempfile.mkdtemp(prefix="flare-tests-"))
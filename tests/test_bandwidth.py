@@ -0,0 +1,30 @@
+from datetime import datetime
+
+import pytest
+
+from bandwidth import ScheduleRule, parse_schedule
+
+
+def test_schedule_rule_parses_window_and_rate():
+    rule = ScheduleRule.parse("mon-fri 09:00-18:00 2M")
+    assert (rule.start, rule.end, rule.rate) == (9 * 60, 18 * 60, 2 * 1024 * 1024)
+    assert rule.days == [0, 1, 2, 3, 4]
+
+
+def test_schedule_rule_accepts_24_00_only_as_end():
+    rule = ScheduleRule.parse("22:00-24:00 500K")
+    assert rule.end == 24 * 60
+    # Monday 2024-05-06, 23:59
+    assert rule.active(datetime(2024, 5, 6, 23, 59))
+
+
+@pytest.mark.parametrize("text", [
+    "24:30-06:00 1M",
+    "22:00-24:59 1M",
+    "24:00-06:00 1M",
+    "09:60-18:00 1M",
+    "25:00-06:00 1M",
+])
+def test_schedule_rule_rejects_times_past_the_day(text):
+    with pytest.raises(ValueError):
+        parse_schedule([text])
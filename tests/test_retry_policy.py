@@ -0,0 +1,178 @@
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import retry_policy
+from retry_policy import RetryPolicy, parse_retry_after
+
+URL = "https://media.example.com/video.mp4"
+
+
+class FakeClock:
+    """Monotonic clock that only moves when the policy sleeps"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_policy(clock, **kwargs) -> RetryPolicy:
+    kwargs.setdefault('breaker_threshold', 3)
+    kwargs.setdefault('breaker_cooldown', 10.0)
+    return RetryPolicy(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_breaker_opens_then_half_open_trial_closes_it(clock):
+    policy = make_policy(clock)
+    for _ in range(3):
+        assert policy.before_request(URL) is False
+        policy.record_failure(URL, None)
+    assert policy.host_status()['media.example.com']['paused_s'] == 10.0
+
+    # Open: the next request waits out the cooldown and becomes the trial
+    assert policy.before_request(URL) is True
+    assert sum(clock.sleeps) == pytest.approx(10.0)
+
+    policy.record_success(URL)
+    clock.sleeps.clear()
+    assert policy.before_request(URL) is False
+    assert clock.sleeps == []
+    assert policy.host_status() == {}
+
+
+def test_failed_trial_doubles_the_pause(clock):
+    policy = make_policy(clock)
+    for _ in range(3):
+        policy.record_failure(URL, 503, '0')
+    assert policy.before_request(URL) is True
+    policy.record_failure(URL, None)
+    assert policy.host_status()['media.example.com']['paused_s'] == 20.0
+
+
+def test_released_trial_lets_the_next_request_test_the_host(clock):
+    policy = make_policy(clock)
+    for _ in range(3):
+        policy.record_failure(URL, None)
+    assert policy.before_request(URL) is True
+    policy.release_trial(URL)
+    # Still half-open, so the next request is the trial again
+    assert policy.before_request(URL) is True
+
+
+def test_retry_after_seconds_pauses_the_host(clock):
+    policy = make_policy(clock)
+    policy.record_failure(URL, 429, '30')
+    assert policy.host_status()['media.example.com']['paused_s'] == 30.0
+    policy.before_request(URL)
+    assert sum(clock.sleeps) == pytest.approx(30.0)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120.0
+    now = datetime(2024, 5, 1, 12, 0, 0, tzinfo=timezone.utc)
+    later = format_datetime(datetime(2024, 5, 1, 12, 1, 30, tzinfo=timezone.utc), usegmt=True)
+    assert parse_retry_after(later, now=now.timestamp()) == pytest.approx(90.0)
+    # A date in the past means "now"
+    assert parse_retry_after(later, now=now.timestamp() + 3600) == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+
+def test_throttle_without_retry_after_backs_off(clock, monkeypatch):
+    monkeypatch.setattr(retry_policy.random, 'uniform', lambda low, high: high)
+    policy = make_policy(clock, base=2.0)
+    policy.record_failure(URL, 429)
+    policy.before_request(URL)
+    assert sum(clock.sleeps) == pytest.approx(2.0)
+    # Grows with the throttled answers in a row
+    policy.record_failure(URL, 503)
+    assert policy.host_status()['media.example.com']['paused_s'] == 4.0
+    assert policy.stats()['generic']['backoff_s'] == 6.0
+
+
+def test_before_request_stops_waiting_on_cancel(clock):
+    from download_queue import load_yt_dlp
+    policy = make_policy(clock)
+    policy.record_failure(URL, 429, '60')
+    with pytest.raises(load_yt_dlp().utils.DownloadCancelled):
+        policy.before_request(URL, cancelled=lambda: len(clock.sleeps) >= 2)
+    assert sum(clock.sleeps) == pytest.approx(2.0)
+
+
+# ── Through FlareYoutubeDL ───────────────────────────────────────────────
+
+def test_trial_released_after_non_http_error(clock, monkeypatch):
+    from download_queue import load_yt_dlp
+    from ydl_session import flare_youtube_dl
+    yt_dlp = load_yt_dlp()
+
+    def broken_urlopen(self, req):
+        raise ValueError("bad request")
+
+    policy = make_policy(clock)
+    for _ in range(3):
+        policy.record_failure(URL, None)
+    monkeypatch.setattr(yt_dlp.YoutubeDL, 'urlopen', broken_urlopen)
+    with flare_youtube_dl()({'quiet': True}, retry_policy=policy) as ydl:
+        with pytest.raises(ValueError):
+            ydl.urlopen(URL)
+    assert policy.before_request(URL) is True
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """Answers 429 (without Retry-After) once, then 200"""
+
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(time.monotonic())
+        if len(self.requests) == 1:
+            self.send_response(429)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = b'ok'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_throttled_request_is_resent_after_a_delay(monkeypatch):
+    from ydl_session import flare_youtube_dl
+
+    monkeypatch.setattr(retry_policy.random, 'uniform', lambda low, high: high)
+    ThrottlingHandler.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ThrottlingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/video"
+        policy = RetryPolicy(base=0.3)
+        with flare_youtube_dl()({'quiet': True}, retry_policy=policy) as ydl:
+            assert ydl.urlopen(url).read() == b'ok'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    first, second = ThrottlingHandler.requests
+    assert second - first >= 0.3
+    assert policy.stats()['generic']['throttle_retries'] == 1
@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import segmented
+from segmented import (SegmentedDownloader, SegmentedDownloadError, RangeNotSupported,
+                       segmented_fd_class, split_ranges)
+
+RANGE_HEADER = re.compile(r"bytes=(\d+)-(\d*)$")
+SIZE = 300 * 1024
+MIN_SEGMENT = 16 * 1024
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """
+    Serves `server.payload` with single byte ranges. Without
+    `server.ranges` the Range header is ignored; `server.total` is the
+    size announced in Content-Range.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        data = self.server.payload
+        start, end = 0, len(data) - 1
+        status = 200
+
+        match = RANGE_HEADER.match(self.headers.get("Range", "")) if self.server.ranges else None
+        if match:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(int(match.group(2)), end)
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{self.server.total}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{self.server.total}")
+        self.end_headers()
+        self.wfile.write(data[start:end + 1])
+
+
+@pytest.fixture
+def payload():
+    return os.urandom(SIZE)
+
+
+@pytest.fixture
+def serve(payload):
+    servers = []
+
+    def start(ranges: bool = True, total: int = None) -> str:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        server.daemon_threads = True
+        server.payload = payload
+        server.ranges = ranges
+        server.total = total or len(payload)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/clip.mp4"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def downloader(url: str, path: str, **kwargs) -> SegmentedDownloader:
+    kwargs.setdefault('connections', 4)
+    kwargs.setdefault('min_segment', MIN_SEGMENT)
+    kwargs.setdefault('backoff', lambda n: 0)
+    return SegmentedDownloader(url, path, **kwargs)
+
+
+def read(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_segments_assemble_the_exact_bytes(tmp_path, payload, serve):
+    url = serve()
+    path = str(tmp_path / "clip.mp4")
+    seen = []
+    size = downloader(url, path, progress=lambda done, total: seen.append(done)).download()
+
+    assert size == SIZE
+    assert read(path) == payload
+    assert seen[-1] == SIZE
+    assert len(split_ranges(SIZE, 4, MIN_SEGMENT)) > 1
+    assert not os.path.exists(path + '.segments')
+
+
+def test_resume_fetches_only_unfinished_segments(tmp_path, payload, serve):
+    url = serve()
+    path = str(tmp_path / "clip.mp4")
+    ranges = split_ranges(SIZE, 4, MIN_SEGMENT)
+    finished = list(range(0, len(ranges), 2))
+
+    # An interrupted download: finished ranges written, the rest zeros
+    data = bytearray(SIZE)
+    for i in finished:
+        start, end = ranges[i]
+        data[start:end + 1] = payload[start:end + 1]
+    with open(path, 'wb') as f:
+        f.write(data)
+    with open(path + '.segments', 'w', encoding='utf-8') as f:
+        json.dump({'total': SIZE, 'segments': ranges, 'finished': finished}, f)
+
+    fetched = []
+    dl = downloader(url, path)
+    original = dl._fetch
+
+    def fetch(fd, cursor, end):
+        fetched.append((cursor[0], end))
+        original(fd, cursor, end)
+
+    dl._fetch = fetch
+    dl.download()
+
+    assert read(path) == payload
+    assert sorted(fetched) == [ranges[i] for i in range(len(ranges)) if i not in finished]
+
+
+def test_server_ignoring_range_is_refused(tmp_path, serve):
+    path = str(tmp_path / "clip.mp4")
+    with pytest.raises(RangeNotSupported):
+        downloader(serve(ranges=False), path).download()
+    assert not os.path.exists(path)
+
+
+def test_short_body_is_rejected(tmp_path, serve):
+    # The server announces more bytes than it has
+    url = serve(total=SIZE + 64 * 1024)
+    path = str(tmp_path / "clip.mp4")
+    with pytest.raises(SegmentedDownloadError):
+        downloader(url, path, retries=1).download()
+
+
+# ── Through yt-dlp ───────────────────────────────────────────────────────
+
+@pytest.fixture
+def http_fd_calls(monkeypatch):
+    from download_queue import load_yt_dlp
+    load_yt_dlp()
+    from yt_dlp.downloader.http import HttpFD
+
+    calls = []
+    original = HttpFD.real_download
+
+    def real_download(self, filename, info_dict):
+        calls.append(filename)
+        return original(self, filename, info_dict)
+
+    monkeypatch.setattr(HttpFD, 'real_download', real_download)
+    # Test files are far below the size segmenting normally starts at
+    monkeypatch.setattr(segmented, 'MIN_FILE_SIZE', 1024)
+    return calls
+
+
+def fd_download(url: str, path: str) -> bool:
+    from download_queue import load_yt_dlp
+
+    ydl = load_yt_dlp().YoutubeDL({'quiet': True, 'noprogress': True})
+    fd = segmented_fd_class()(ydl, {'concurrent_fragment_downloads': 4, 'noprogress': True})
+    return fd.real_download(path, {'url': url})
+
+
+def test_fd_downloads_in_segments(tmp_path, payload, serve, http_fd_calls):
+    path = str(tmp_path / "clip.mp4")
+    assert fd_download(serve(), path)
+    assert read(path) == payload
+    assert http_fd_calls == []
+
+
+def test_fd_falls_back_to_http_fd_without_ranges(tmp_path, payload, serve, http_fd_calls):
+    path = str(tmp_path / "clip.mp4")
+    assert fd_download(serve(ranges=False), path)
+    assert read(path) == payload
+    assert http_fd_calls == [path]
@@ -0,0 +1,19 @@
+import os
+
+from updater import modules_from_version
+from version import APP_MODULES
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_app_modules_exist():
+    missing = [m for m in APP_MODULES if not os.path.isfile(os.path.join(PROJECT_DIR, m))]
+    assert missing == []
+
+
+def test_updater_reads_module_list_without_importing():
+    with open(os.path.join(PROJECT_DIR, 'version.py'), encoding='utf-8') as f:
+        assert modules_from_version(f.read()) == APP_MODULES
+    source = 'APP_MODULES = [\n    "a.py",\n    "new_module.py",\n]\n'
+    assert modules_from_version(source) == ["a.py", "new_module.py"]
+    assert modules_from_version('APP_MODULES = [') == APP_MODULES
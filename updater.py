@@ -6,6 +6,7 @@ Part of the Flare ecosystem.
 """
 
 import os
+import ast
 import sys
 import json
 import shutil
@@ -14,15 +15,16 @@ import threading
 import subprocess
 from urllib.request import urlopen, Request
 from urllib.error import URLError, HTTPError
-from typing import Optional, Tuple, Callable
+from typing import Callable, List, Optional, Tuple
 
 try:
-    from version import __version__, GITHUB_API_URL, GITHUB_REPO, GITHUB_RAW_URL
+    from version import __version__, GITHUB_API_URL, GITHUB_REPO, GITHUB_RAW_URL, APP_MODULES
 except ImportError:
     __version__ = "2.8.4"
     GITHUB_REPO = "contactmukundthiru-cyber/Multi-Platform-Downloader"
     GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
     GITHUB_RAW_URL = f"https://raw.githubusercontent.com/{GITHUB_REPO}/main"
+    APP_MODULES = []
 
 
 class Updater:
@@ -136,46 +138,49 @@ class Updater:
             else:
                 app_dir = os.path.dirname(os.path.abspath(__file__))
 
-            # Files to update
-            update_files = [
-                'youtube_downloader.py',
-                'updater.py',
-                'version.py'
-            ]
+            # The new version.py lists the modules of the new release,
+            # including any it adds
+            version_source = self._update_file(app_dir, 'version.py')
+            modules = modules_from_version(version_source) if version_source else APP_MODULES
+            for filename in ['youtube_downloader.py', 'updater.py'] + modules:
+                self._update_file(app_dir, filename)
 
-            for filename in update_files:
-                url = f"{GITHUB_RAW_URL}/{filename}"
-                request = Request(url, headers={'User-Agent': 'FlareDownload-Updater'})
+            self._log("Update complete! Please restart the application.")
+            return True
 
-                try:
-                    with urlopen(request, timeout=30) as response:
-                        content = response.read().decode('utf-8')
+        except Exception as e:
+            self._log(f"Update failed: {str(e)}")
+            return False
 
-                    filepath = os.path.join(app_dir, filename)
+    def _update_file(self, app_dir: str, filename: str) -> Optional[str]:
+        """Replace `filename` with the copy on GitHub (keeping a .backup); returns the new text."""
+        url = f"{GITHUB_RAW_URL}/{filename}"
+        request = Request(url, headers={'User-Agent': 'FlareDownload-Updater'})
 
-                    # Backup current file
-                    if os.path.exists(filepath):
-                        backup = filepath + '.backup'
-                        try:
-                            shutil.copy2(filepath, backup)
-                        except:
-                            pass
+        try:
+            with urlopen(request, timeout=30) as response:
+                content = response.read().decode('utf-8')
 
-                    # Write new file
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        f.write(content)
+            filepath = os.path.join(app_dir, filename)
 
-                    self._log(f"Updated: {filename}")
+            # Backup current file
+            if os.path.exists(filepath):
+                backup = filepath + '.backup'
+                try:
+                    shutil.copy2(filepath, backup)
+                except:
+                    pass
 
-                except Exception as e:
-                    self._log(f"Failed to update {filename}: {e}")
+            # Write new file
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(content)
 
-            self._log("Update complete! Please restart the application.")
-            return True
+            self._log(f"Updated: {filename}")
+            return content
 
         except Exception as e:
-            self._log(f"Update failed: {str(e)}")
-            return False
+            self._log(f"Failed to update {filename}: {e}")
+            return None
 
     def get_update_info(self) -> dict:
         """Get information about available update."""
@@ -189,6 +194,20 @@ class Updater:
         }
 
 
+def modules_from_version(source: str) -> List[str]:
+    """APP_MODULES of a version.py, read without running it; falls back to ours."""
+    try:
+        for node in ast.parse(source).body:
+            if isinstance(node, ast.Assign) and any(
+                    isinstance(target, ast.Name) and target.id == 'APP_MODULES' for target in node.targets):
+                modules = ast.literal_eval(node.value)
+                if isinstance(modules, list) and all(isinstance(m, str) for m in modules):
+                    return modules
+    except (SyntaxError, ValueError):
+        pass
+    return list(APP_MODULES)
+
+
 def check_for_updates_sync() -> Tuple[bool, Optional[str], Optional[str]]:
     """
     Convenience function to check for updates.
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Flare Download - URL routing
+Which yt-dlp extractor takes a link, known before any network call and
+without asking all ~1800 extractors in turn. Every extractor's
+_VALID_URL is read once (on first use, about a second) for the hosts it
+can match, and the extractor is filed under them: "youtube.com" for
+(?:www\.)?youtube\.com, or one label such as "amazon" for amazon.<any>.
+A link is then only checked against the extractors filed under its own
+host - plus the few whose patterns take any host - with their own
+suitable(), in yt-dlp's order, so the answer is the one yt-dlp itself
+would give. Text every match must contain ("vimeo.com/") rules most of
+those out before their regex runs.
+Part of the Flare ecosystem.
+"""
+
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import re._parser as _parser
+    import re._constants as _sre
+except ImportError:  # Python < 3.11
+    import sre_parse as _parser
+    import sre_constants as _sre
+
+from download_queue import load_yt_dlp
+
+# Stands for characters a pattern does not pin down inside a host name
+WILD = '\0'
+# Host spellings worked out per pattern before it counts as "any host"
+MAX_HOSTS = 4096
+
+# Walking a pattern against "http(s)://": states 0-7 are positions in
+# that prefix (4 is the optional "s"), then the host, then past it
+_PREFIX = 'https://'
+_HOST = 8
+_DONE = 9
+_HOST_END = '/?#:'
+_REPEATS = tuple(op for op in (_sre.MAX_REPEAT, _sre.MIN_REPEAT, getattr(_sre, 'POSSESSIVE_REPEAT', None)) if op)
+_IGNORED = (_sre.AT, _sre.ASSERT, _sre.ASSERT_NOT)
+_CATEGORIES = {
+    _sre.CATEGORY_DIGIT: str.isdigit,
+    _sre.CATEGORY_WORD: lambda c: c.isalnum() or c == '_',
+    _sre.CATEGORY_SPACE: str.isspace,
+}
+_NOT_CATEGORIES = {
+    _sre.CATEGORY_NOT_DIGIT: _sre.CATEGORY_DIGIT,
+    _sre.CATEGORY_NOT_WORD: _sre.CATEGORY_WORD,
+    _sre.CATEGORY_NOT_SPACE: _sre.CATEGORY_SPACE,
+}
+
+
+class Unroutable(Exception):
+    """A pattern whose hosts cannot be narrowed down; it is tried for every link."""
+
+
+# ── Reading patterns ────────────────────────────────────────────────────
+
+def _matches(op, av, char: str) -> bool:
+    """Whether a one-character regex node matches `char`."""
+    if op is _sre.LITERAL:
+        return chr(av) == char
+    if op is _sre.NOT_LITERAL:
+        return chr(av) != char
+    if op is _sre.ANY:
+        return char != '\n'
+    if op is _sre.IN:
+        negate, hit = False, False
+        for item_op, item in av:
+            if item_op is _sre.NEGATE:
+                negate = True
+            elif item_op is _sre.LITERAL:
+                hit = hit or chr(item) == char
+            elif item_op is _sre.RANGE:
+                hit = hit or item[0] <= ord(char) <= item[1]
+            elif item_op is _sre.CATEGORY and item in _CATEGORIES:
+                hit = hit or _CATEGORIES[item](char)
+            elif item_op is _sre.CATEGORY and item in _NOT_CATEGORIES:
+                hit = hit or not _CATEGORIES[_NOT_CATEGORIES[item]](char)
+            else:
+                raise Unroutable(f"character class item {item_op}")
+        return hit != negate
+    raise Unroutable(f"node {op}")
+
+
+def _chars(op, av) -> Optional[Set[str]]:
+    """The few characters a one-character node matches; None for a broad class."""
+    if op is _sre.LITERAL:
+        return {chr(av)}
+    if op is _sre.IN and all(item_op in (_sre.LITERAL, _sre.RANGE) for item_op, _ in av):
+        chars = set()
+        for item_op, item in av:
+            low, high = (item, item) if item_op is _sre.LITERAL else item
+            if high - low > 25:
+                return None
+            chars.update(map(chr, range(low, high + 1)))
+        return chars
+    return None
+
+
+def _prefix_step(states: set, op, av, ignore_case: bool) -> set:
+    """States in "http(s)://" after one character matched by a node."""
+    out = set()
+    for state, host in states:
+        expected = ('s', ':') if state == 4 else (_PREFIX[state],)
+        for char in expected:
+            if _matches(op, av, char) or (ignore_case and _matches(op, av, char.upper())):
+                out.add((6 if state == 4 and char == ':' else state + 1, host))
+    return out
+
+
+def _host_step(states: set, op, av) -> set:
+    """States in the host after one character matched by a node."""
+    if not states:
+        return states
+    chars = _chars(op, av)
+    if chars is None:
+        if op is _sre.ANY:
+            chars = {'.'}  # an unescaped dot between labels
+        elif _matches(op, av, '/'):
+            raise Unroutable("host may run into the path")
+        else:
+            return {(_HOST, host + WILD) for _, host in states}
+    out = set()
+    for _, host in states:
+        for char in chars:
+            char = char.lower()
+            out.add((_DONE, host) if char in _HOST_END else (_HOST, host + char))
+    return out
+
+
+def _walk(items, states: set, ignore_case: bool) -> set:
+    """
+    Follow a parsed pattern from `states` - (position, host so far)
+    pairs - keeping only the ways it can match the start of an http(s)
+    link. Raises Unroutable where the host could be anything.
+    """
+    for op, av in items:
+        done = {s for s in states if s[0] == _DONE}
+        live = states - done
+        if not live:
+            return states
+        if op in _IGNORED:
+            continue
+        if op is _sre.SUBPATTERN:
+            sub_ignore_case = ignore_case or bool(av[1] & re.IGNORECASE)
+            states = done | _walk(av[-1], live, sub_ignore_case)
+        elif op is _sre.BRANCH:
+            states = done.union(*(_walk(branch, live, ignore_case) for branch in av[1]))
+        elif op is _sre.GROUPREF_EXISTS:
+            states = done | _walk(av[1], live, ignore_case) | (_walk(av[2], live, ignore_case) if av[2] else live)
+        elif op in _REPEATS:
+            states = done | _walk_repeat(av, live, ignore_case)
+        else:
+            prefix = {s for s in live if s[0] < _HOST}
+            states = done | _prefix_step(prefix, op, av, ignore_case) | _host_step(live - prefix, op, av)
+        if len(states) > MAX_HOSTS:
+            raise Unroutable("too many host spellings")
+    return states
+
+
+def _walk_repeat(av, live: set, ignore_case: bool) -> set:
+    low, high, body = av
+    if high == 1:
+        once = _walk(body, live, ignore_case)
+        return once | live if low == 0 else once
+    out = set(live) if low == 0 else set()
+    prefix = {s for s in live if s[0] < _HOST}
+    if prefix:
+        # e.g. a bare video id: it must not be able to eat "https://"
+        if len(body) != 1:
+            raise Unroutable("repeat before the host")
+        (op, node), = body
+        current, count = prefix, 0
+        while current and count < high:
+            current = _prefix_step(current, op, node, ignore_case)
+            count += 1
+            if any(state >= _HOST for state, _ in current):
+                raise Unroutable("repeat runs through the prefix")
+            if count >= low:
+                out |= current
+        live = live - prefix
+    for state in live:
+        once = _walk(body, {state}, ignore_case)
+        if all(s[0] == _DONE for s in once):
+            out |= once  # e.g. (?:/[^/]+)+ - the host is already over
+            continue
+        if any(s[0] == _DONE for s in once):
+            raise Unroutable("repeat may or may not end the host")
+        host = state[1]
+        # Repeated labels such as (?:\w+\.)* stay whole labels
+        whole = all(h.endswith('.') for _, h in once)
+        out.add((_HOST, host + WILD + ('.' if whole else '')))
+    return out
+
+
+def _host_keys(tree) -> Set[str]:
+    """
+    What the hosts of http(s) links matching a parsed pattern are filed
+    under (see _host_key), e.g. {"youtube.com"} for
+    https?://(?:www\\.)?youtube\\.com/... Raises Unroutable if the
+    pattern takes any host.
+    """
+    ignore_case = bool(tree.state.flags & re.IGNORECASE)
+    keys = set()
+    for state, host in _walk(list(tree), {(0, '')}, ignore_case):
+        if state < _HOST:
+            raise Unroutable("matches without a host")
+        keys.add(_host_key(host, closed=state == _DONE))
+    return keys
+
+
+def _whole(label: str) -> bool:
+    return bool(label) and WILD not in label
+
+
+def _host_key(host: str, closed: bool) -> str:
+    """
+    A host's last two labels ("youtube.com") when the pattern spells them
+    out and ends the host there; otherwise its longest label spelled out
+    in full ("amazon" for amazon.<any>), which a matching host contains
+    somewhere.
+    """
+    labels = host.split('.')
+    if closed and len(labels) >= 2 and _whole(labels[-2]) and _whole(labels[-1]):
+        return '.'.join(labels[-2:])
+    # The last label is only whole if the pattern ends the host there
+    whole = [label for label in labels[:-1] if _whole(label)]
+    if not whole and closed and _whole(labels[-1]):
+        whole = labels[-1:]
+    if not whole:
+        raise Unroutable(f"no whole label in {host!r}")
+    return max(reversed(whole), key=len)
+
+
+def _mandatory_chars(items) -> Iterable[Optional[str]]:
+    """
+    The literal characters every match of a parsed pattern contains, in
+    order, with None wherever something else may come between them.
+    """
+    for op, av in items:
+        if op is _sre.LITERAL and av < 128:
+            yield chr(av).lower()
+        elif op is _sre.SUBPATTERN:
+            yield from _mandatory_chars(av[-1])
+        else:
+            yield None
+            if op in _REPEATS and av[0] >= 1:
+                yield from _mandatory_chars(av[2])
+                yield None
+
+
+def _required_text(tree) -> Optional[str]:
+    """The longest text (lowercase) every match of a parsed pattern contains, if worth checking."""
+    runs = ''.join(char or '\n' for char in _mandatory_chars(list(tree))).split('\n')
+    longest = max(runs, key=len)
+    return longest if len(longest) >= 4 else None
+
+
+def extractor_route(ie) -> Tuple[Optional[Set[str]], Optional[Tuple[str, ...]]]:
+    """
+    (keys, texts) for an extractor: the host keys it is filed under -
+    None if it may take any host, empty if it takes no links at all
+    (embed-only extractors) - and pieces of text of which every link it
+    takes contains one (None if there are none to check).
+    """
+    patterns = getattr(ie, '_VALID_URL', None)
+    if patterns is False:
+        return set(), None
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    if not isinstance(patterns, (list, tuple)) or not patterns:
+        return None, None
+    keys, texts = set(), []
+    for pattern in patterns:
+        try:
+            tree = _parser.parse(pattern)
+        except (re.error, RecursionError):
+            return None, None
+        texts.append(_required_text(tree))
+        if keys is not None:
+            try:
+                keys |= _host_keys(tree)
+            except Unroutable:
+                keys = None
+    return keys, None if None in texts else tuple(texts)
+
+
+# ── Index ───────────────────────────────────────────────────────────────
+
+class RoutingIndex:
+    """
+    yt-dlp's extractors (without the generic one) filed by host key.
+    `extractors` is gen_extractor_classes() - their order decides, as in
+    yt-dlp, when several take a link.
+    """
+
+    def __init__(self, extractors: Iterable):
+        self.extractors = [ie for ie in extractors if ie.ie_key() != 'Generic']
+        self.by_key: Dict[str, List[int]] = {}
+        self.any_host: List[int] = []
+        self.texts: List[Optional[Tuple[str, ...]]] = []
+        for position, ie in enumerate(self.extractors):
+            keys, texts = extractor_route(ie)
+            self.texts.append(texts)
+            if keys is None:
+                self.any_host.append(position)
+            for key in keys or ():
+                self.by_key.setdefault(key, []).append(position)
+        self._candidates = lru_cache(maxsize=4096)(self._host_candidates)
+
+    def _host_candidates(self, host: str) -> Tuple:
+        labels = host.split('.')
+        positions = set(self.any_host)
+        for key in {'.'.join(labels[-2:]), *labels}:
+            positions.update(self.by_key.get(key, ()))
+        return tuple((self.extractors[position], self.texts[position]) for position in sorted(positions))
+
+    def candidates(self, url: str) -> Iterable[Tuple]:
+        """
+        (extractor, texts) for the extractors that may take a link, in
+        yt-dlp's order; the link needs one of `texts` (None: no such test).
+        """
+        try:
+            parts = urlsplit(url)
+            host = parts.hostname if parts.scheme in ('http', 'https') else None
+        except ValueError:
+            host = None
+        if not host:
+            # Other schemes ("lbry://...") are rare
+            return tuple(zip(self.extractors, self.texts))
+        return self._candidates(host)
+
+    def extractor_for(self, url: str):
+        """The extractor class yt-dlp would use for a link, None for the generic one."""
+        # Quick text checks first; case-folding is only simple for ASCII
+        lowered = url.lower() if url.isascii() else None
+        for ie, texts in self.candidates(url):
+            if texts and lowered is not None and not any(text in lowered for text in texts):
+                continue
+            if ie.suitable(url):
+                return ie
+        return None
+
+
+_index: Optional[RoutingIndex] = None
+_index_lock = threading.Lock()
+
+
+def routing_index() -> RoutingIndex:
+    """The index, built on first use (needs yt-dlp); safe from any thread."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                load_yt_dlp()
+                from yt_dlp.extractor import gen_extractor_classes
+
+                _index = RoutingIndex(gen_extractor_classes())
+    return _index
+
+
+def index_ready() -> bool:
+    """True once the index is built, so lookups no longer wait for it."""
+    return _index is not None
+
+
+@lru_cache(maxsize=4096)
+def extractor_for_url(url: str):
+    """Extractor class for a link, None if only the generic extractor would try it."""
+    return routing_index().extractor_for(url)
+
+
+def extractor_name(url: str) -> Optional[str]:
+    """yt-dlp's name for the extractor of a link ("Youtube"), else None."""
+    ie = extractor_for_url(url)
+    return ie.ie_key() if ie else None
+
+
+def is_supported_url(url: str) -> bool:
+    """True if a yt-dlp extractor other than the generic one takes the link."""
+    return extractor_for_url(url) is not None
+
+
+def split_supported(urls: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """(supported, unsupported) links, each in their original order."""
+    supported, unsupported = [], []
+    for url in urls:
+        (supported if is_supported_url(url) else unsupported).append(url)
+    return supported, unsupported
@@ -13,5 +13,33 @@ GITHUB_REPO = "contactmukundthiru-cyber/Multi-Platform-Downloader"
 GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
 GITHUB_RAW_URL = f"https://raw.githubusercontent.com/{GITHUB_REPO}/main"
 
+# Support modules shipped alongside youtube_downloader.py
+APP_MODULES = [
+    "download_queue.py",
+    "flare_cli.py",
+    "progress.py",
+    "paths.py",
+    "log_buffer.py",
+    "animation.py",
+    "settings.py",
+    "playlist.py",
+    "download_archive.py",
+    "info_cache.py",
+    "format_probe.py",
+    "segmented.py",
+    "bandwidth.py",
+    "job_store.py",
+    "retry_policy.py",
+    "ydl_session.py",
+    "audio_extract.py",
+    "format_plan.py",
+    "ffmpeg_locator.py",
+    "metrics.py",
+    "ydl_options.py",
+    "cookie_store.py",
+    "clipboard_watch.py",
+    "url_router.py",
+]
+
 # Gumroad info
 GUMROAD_PRODUCT_ID = "flare-download"
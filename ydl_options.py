@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Flare Download - Download options
+The yt-dlp options for a download, built from plain values (output
+folder, format, quality, audio or video) without Tk or yt-dlp, and named
+download profiles ("archive-max", "mobile-720p", "podcast-mp3", or the
+user's own from settings) that fill those values in. Format selectors are
+worked out once per combination.
+Used by the GUI, the headless batch mode and the download queue.
+Part of the Flare ecosystem.
+"""
+
+import os
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional
+
+VIDEO_FORMATS = ["mp4", "webm", "mkv", "mov", "avi"]
+AUDIO_FORMATS = ["mp3", "m4a", "wav", "flac", "opus"]
+VIDEO_QUALITIES = ["Best", "1080p", "720p", "480p", "360p"]
+AUDIO_QUALITIES = ["Best", "320k", "256k", "192k", "128k"]
+
+# Audio quality -> FFmpeg VBR quality (0 = best)
+AUDIO_QUALITY = {'Best': '0', '320k': '0', '256k': '1', '192k': '2', '128k': '5'}
+DEFAULT_AUDIO_QUALITY = '2'
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+# Options every download shares; base_opts() starts from a copy
+BASE_OPTS = {
+    'noplaylist': True,
+    'socket_timeout': 30,
+    'retries': 10,
+    'fragment_retries': 10,
+    'quiet': True,
+    'noprogress': True,
+    'no_warnings': True,
+    'ignoreerrors': False,
+    'nocheckcertificate': True,
+    'geo_bypass': True,
+    'extractor_retries': 5,
+    'file_access_retries': 5,
+}
+
+
+def base_opts() -> dict:
+    """
+    A copy of BASE_OPTS with the browser User-Agent. Format probes and
+    playlist listings start from it too, so they send the same requests
+    (and share sessions) as the downloads that follow.
+    """
+    opts = dict(BASE_OPTS)
+    opts['http_headers'] = {'User-Agent': USER_AGENT}
+    return opts
+
+
+@lru_cache(maxsize=256)
+def format_selector(fmt: str, quality: str, is_audio: bool, merge: bool = True) -> str:
+    """
+    yt-dlp format selector for a format and quality. Video prefers
+    streams the container holds as they are (format_plan); without
+    `merge` (no FFmpeg) only single files are chosen. Audio prefers a
+    stream that needs no transcoding (audio_extract).
+    """
+    if is_audio:
+        from audio_extract import audio_format_selector
+        return audio_format_selector(fmt)
+    from format_plan import video_selector
+    return video_selector(fmt, quality, merge=merge)
+
+
+def audio_quality(quality: str) -> str:
+    """FFmpeg VBR quality for an audio quality label."""
+    return AUDIO_QUALITY.get(quality, DEFAULT_AUDIO_QUALITY)
+
+
+def build_ydl_opts(output_dir: str, fmt: str, quality: str, is_audio: bool,
+                   ffmpeg_location: Optional[str] = None,
+                   progress_hooks: Optional[List[Callable]] = None,
+                   download_archive=None,
+                   format_spec: Optional[str] = None,
+                   concurrent_fragments: Optional[int] = None,
+                   has_ffmpeg: bool = True) -> dict:
+    """
+    Build the yt-dlp options dict for one download.
+    `download_archive` may be a file path or a DownloadArchive instance.
+    `format_spec` replaces the quality-based format selector.
+    `concurrent_fragments` sets how many DASH/HLS fragments (or, with the
+    segmented engine, byte ranges) are fetched at once.
+    Without `has_ffmpeg`, video comes as single files, which need no merging.
+    """
+    ydl_opts = base_opts()
+    ydl_opts['outtmpl'] = os.path.join(output_dir, '%(title)s.%(ext)s')
+    ydl_opts['progress_hooks'] = list(progress_hooks or [])
+
+    if ffmpeg_location:
+        ydl_opts['ffmpeg_location'] = ffmpeg_location
+
+    if download_archive is not None:
+        ydl_opts['download_archive'] = download_archive
+
+    if concurrent_fragments:
+        ydl_opts['concurrent_fragment_downloads'] = concurrent_fragments
+
+    ydl_opts['format'] = format_spec or format_selector(fmt, quality, is_audio, has_ffmpeg)
+    if is_audio:
+        ydl_opts['postprocessors'] = [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': fmt,
+            'preferredquality': audio_quality(quality),
+        }]
+    else:
+        ydl_opts['merge_output_format'] = fmt
+
+    return ydl_opts
+
+
+# ── Profiles ────────────────────────────────────────────────────────────
+
+class Profile:
+    """A named set of download choices, stored as a plain dict"""
+
+    def __init__(self, name: str, label: str, fmt: str, quality: str = "Best", is_audio: bool = False):
+        formats, qualities = (AUDIO_FORMATS, AUDIO_QUALITIES) if is_audio else (VIDEO_FORMATS, VIDEO_QUALITIES)
+        if fmt not in formats:
+            raise ValueError(f"Profile {name!r}: unsupported format {fmt!r} (choose from {', '.join(formats)})")
+        if quality not in qualities:
+            raise ValueError(f"Profile {name!r}: unsupported quality {quality!r} "
+                             f"(choose from {', '.join(qualities)})")
+        self.name = name
+        self.label = label
+        self.fmt = fmt
+        self.quality = quality
+        self.is_audio = is_audio
+
+    @property
+    def format_selector(self) -> str:
+        return format_selector(self.fmt, self.quality, self.is_audio)
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'label': self.label, 'format': self.fmt,
+                'quality': self.quality, 'audio': self.is_audio}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Profile':
+        """Raises ValueError for a missing name/format or unsupported values."""
+        try:
+            name = str(data['name'])
+            fmt = str(data['format'])
+        except (KeyError, TypeError):
+            raise ValueError(f"Profile needs a name and a format: {data!r}")
+        return cls(name, str(data.get('label') or name), fmt,
+                   str(data.get('quality') or "Best"), bool(data.get('audio')))
+
+    def __repr__(self):
+        return f'Profile({self.name!r})'
+
+
+PROFILES: Dict[str, Profile] = {profile.name: profile for profile in (
+    # MKV holds any codecs, so the best streams are never re-encoded
+    Profile('archive-max', "Archive (best quality)", 'mkv', "Best"),
+    Profile('mobile-720p', "Mobile 720p", 'mp4', "720p"),
+    Profile('podcast-mp3', "Podcast MP3", 'mp3', "128k", is_audio=True),
+)}
+
+
+def load_profiles(custom: Iterable[dict] = ()) -> Dict[str, Profile]:
+    """
+    Built-in profiles plus `custom` ones (dicts as from Profile.to_dict(),
+    e.g. the "profiles" setting); a custom profile replaces a built-in one
+    of the same name. Invalid entries raise ValueError.
+    """
+    profiles = dict(PROFILES)
+    for data in custom:
+        profile = Profile.from_dict(data)
+        profiles[profile.name] = profile
+    return profiles
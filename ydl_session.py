@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Flare Download - yt-dlp session
+The YoutubeDL subclass every download runs in. It adds what plain
+yt-dlp options cannot express:
+
+  - every HTTP request passes through the shared RetryPolicy, so a host
+    that answers 429/503 (honouring Retry-After) or keeps failing is
+    paused for all jobs at once;
+  - with `segmented=True`, progressive http(s) formats are downloaded
+    by segmented.SegmentedHttpFD instead of yt-dlp's HttpFD;
+  - in audio mode, yt-dlp's audio extraction is replaced by the
+    codec-aware one in audio_extract.py (skips matching files, converts
+    progressive streams while they download);
+  - with `defer_postprocessing=True`, merging and conversion are held
+    back so the caller can run them on a separate pool;
+  - with a `session` from a SessionPool, the cookie jar and request
+    handlers (and with them keep-alive connections and TLS sessions)
+    outlive the download and are reused by the next job;
+  - with a cookie_store.CookieStore, every download uses its shared
+    cookie jar instead of reading cookie files itself.
+Part of the Flare ecosystem.
+"""
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from download_queue import load_yt_dlp
+
+_ydl_class = None
+_class_lock = threading.Lock()
+
+# Options the request handlers are built from; sessions are only shared
+# between downloads that agree on all of them
+NETWORK_OPTIONS = (
+    'proxy', 'source_address', 'nocheckcertificate', 'socket_timeout', 'impersonate',
+    'legacyserverconnect', 'cookiefile', 'cookiesfrombrowser', 'http_headers',
+    'client_certificate', 'client_certificate_key', 'compat_opts', 'debug_printtraffic',
+)
+
+
+def session_key(params: dict) -> str:
+    return repr(tuple(params.get(name) for name in NETWORK_OPTIONS))
+
+
+class YdlSession:
+    """A cookie jar and request director carried from one YoutubeDL to the next"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.cookiejar = None
+        self.director = None
+        self.uses = 0
+
+    def close(self):
+        if self.director is not None:
+            self.director.close()
+            self.director = None
+
+
+class SessionPool:
+    """
+    Idle sessions, at most `max_idle`. A download acquire()s one matching
+    its network options (or a fresh one), runs in it and release()s it;
+    the same session is never used by two downloads at once.
+    """
+
+    def __init__(self, max_idle: int = 8):
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle: 'OrderedDict[int, YdlSession]' = OrderedDict()
+        self._closed = False
+
+    def acquire(self, params: dict) -> YdlSession:
+        key = session_key(params)
+        with self._lock:
+            for ident, session in reversed(self._idle.items()):
+                if session.key == key:
+                    del self._idle[ident]
+                    return session
+        return YdlSession(key)
+
+    def release(self, session: YdlSession):
+        evicted = []
+        with self._lock:
+            if self._closed:
+                evicted.append(session)
+            else:
+                self._idle[id(session)] = session
+                while len(self._idle) > self.max_idle:
+                    evicted.append(self._idle.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+
+    def close(self):
+        """Close idle sessions; sessions released later are closed right away."""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle.values())
+            self._idle.clear()
+        for session in idle:
+            session.close()
+
+
+def flare_youtube_dl():
+    """The FlareYoutubeDL class (built on first use, yt-dlp is imported lazily)."""
+    global _ydl_class
+    with _class_lock:
+        if _ydl_class is None:
+            _ydl_class = _build_ydl_class()
+        return _ydl_class
+
+
+@contextmanager
+def extracting_ydl(params: dict, url: str, retry_policy=None,
+                   sessions: Optional[SessionPool] = None, cookies=None):
+    """
+    A FlareYoutubeDL for extraction without a download (format probes,
+    playlist listings): its requests go through `retry_policy`, counted
+    under the extractor of `url`, in a session from `sessions`.
+    """
+    stats_key = 'generic'
+    if retry_policy is not None:
+        from retry_policy import stats_key_for_url
+        stats_key = stats_key_for_url(url)
+        retry_policy.apply(params, stats_key)
+    session = sessions.acquire(params) if sessions is not None else None
+    try:
+        with flare_youtube_dl()(params, retry_policy=retry_policy, stats_key=stats_key,
+                                session=session, cookies=cookies) as ydl:
+            yield ydl
+    finally:
+        if session is not None:
+            sessions.release(session)
+
+
+def _request_url(req) -> str:
+    if isinstance(req, str):
+        return req
+    return getattr(req, 'url', None) or getattr(req, 'full_url', '')
+
+
+def _build_ydl_class():
+    yt_dlp = load_yt_dlp()
+    from yt_dlp.networking.exceptions import HTTPError, TransportError
+
+    class FlareYoutubeDL(yt_dlp.YoutubeDL):
+        """
+        `retry_policy` (retry_policy.RetryPolicy) gates and records every
+        request, counting under `stats_key` (usually the extractor name);
+        `cancelled()` stops waiting for a paused host early and `on_retry()`
+        is called for each throttled request sent again. With a
+        `session`, cookies and connections come from (and go back to) it;
+        `cookies` (a cookie_store.CookieStore) supplies the cookie jar.
+        With `defer_postprocessing`, merging/conversion and the archive
+        record are left for run_deferred(), which may run on another
+        thread after this instance is closed.
+        """
+
+        def __init__(self, params=None, auto_init=True, retry_policy=None,
+                     segmented: bool = False, stats_key: str = 'generic',
+                     cancelled: Optional[Callable[[], bool]] = None,
+                     session: Optional[YdlSession] = None, stream_audio: bool = True,
+                     defer_postprocessing: bool = False,
+                     on_retry: Optional[Callable[[], None]] = None, cookies=None):
+            self.retry_policy = retry_policy
+            self.segmented = segmented
+            self.stats_key = stats_key
+            self.cancelled = cancelled
+            self.session = session
+            self.stream_audio = stream_audio
+            self.defer_postprocessing = defer_postprocessing
+            self.on_retry = on_retry
+            # Post-processing and archive records held back for run_deferred()
+            self.deferred = []
+            # Both are cached properties; seeding them skips building new ones
+            if session is not None and session.director is not None:
+                self.__dict__['cookiejar'] = session.cookiejar
+                self.__dict__['_request_director'] = session.director
+            if cookies is not None and cookies.configured:
+                self.__dict__['cookiejar'] = cookies.jar()
+            super().__init__(params, auto_init=auto_init)
+            self._use_flare_audio_pp()
+
+        def _use_flare_audio_pp(self):
+            """Swap yt-dlp's FFmpegExtractAudio for the codec-aware one in audio_extract."""
+            from yt_dlp.postprocessor.ffmpeg import FFmpegExtractAudioPP
+            from audio_extract import audio_classes
+
+            pp_class = audio_classes()[0]
+            pps = self._pps['post_process']
+            for i, pp in enumerate(pps):
+                if type(pp) is FFmpegExtractAudioPP:
+                    pps[i] = pp_class(self, pp.mapping, pp._preferredquality, pp._nopostoverwrites)
+
+        def _audio_pp(self):
+            from audio_extract import audio_classes
+
+            pp_class = audio_classes()[0]
+            return next((pp for pp in self._pps['post_process'] if isinstance(pp, pp_class)), None)
+
+        def close(self):
+            session = self.session
+            if session is not None and '_request_director' in self.__dict__:
+                # Hand the director to the session instead of closing it.
+                # Its handlers keep logging through the first instance's
+                # logger, which is the same for every download of a queue.
+                session.cookiejar = self.cookiejar
+                session.director = self.__dict__.pop('_request_director')
+                session.uses += 1
+            super().close()
+
+        def urlopen(self, req):
+            policy = self.retry_policy
+            if policy is None:
+                return super().urlopen(req)
+
+            url = _request_url(req)
+            # yt-dlp does not retry 429/503 itself; requests without a
+            # body are safe to send again once the host's pause is over
+            can_repeat = getattr(req, 'data', None) is None
+            attempt = 0
+            while True:
+                trial = policy.before_request(url, self.stats_key, self.cancelled)
+                try:
+                    response = super().urlopen(req)
+                except HTTPError as e:
+                    # Read Retry-After here: yt-dlp's retry sleep functions
+                    # only receive the attempt number
+                    headers = getattr(e.response, 'headers', None) or {}
+                    policy.record_failure(url, e.status, headers.get('Retry-After'), self.stats_key)
+                    if not (can_repeat and policy.retry_throttled(e.status, attempt, self.stats_key)):
+                        raise
+                    if self.on_retry is not None:
+                        self.on_retry()
+                    attempt += 1
+                    continue
+                except TransportError:
+                    policy.record_failure(url, None, key=self.stats_key)
+                    raise
+                except BaseException:
+                    # Says nothing about the host (bad request, cancelled...);
+                    # let the next request test it instead
+                    if trial:
+                        policy.release_trial(url)
+                    raise
+                policy.record_success(url)
+                return response
+
+        def dl(self, name, info, subtitle=False, test=False):
+            from audio_extract import audio_classes, can_stream
+            from segmented import is_progressive, segmented_fd_class
+
+            if subtitle or test or name == '-' or not info.get('url'):
+                return super().dl(name, info, subtitle=subtitle, test=test)
+
+            audio_pp = self._audio_pp() if self.stream_audio and not self.params.get('proxy') else None
+            if audio_pp is not None and can_stream(info) and audio_pp.stream_args(info):
+                fd = audio_classes()[1](self, self.params, audio_pp)
+                success, real_download = self._run_fd(fd, name, info)
+                if fd.output:
+                    audio_pp.streamed[name] = fd.output
+                    # FFmpeg wrote a fresh file; the source fixups do not apply
+                    real_download = False
+                return success, real_download
+
+            if self.segmented and is_progressive(info):
+                return self._run_fd(segmented_fd_class()(self, self.params), name, info)
+            return super().dl(name, info, subtitle=subtitle, test=test)
+
+        # ── Deferred post-processing ─────────────────────────────────────
+
+        def post_process(self, filename, info, files_to_move=None):
+            if not self.defer_postprocessing:
+                return super().post_process(filename, info, files_to_move)
+            # yt-dlp keeps editing `info` after this returns; keep a snapshot
+            self.deferred.append(('post_process', filename, dict(info), files_to_move))
+            info['filepath'] = filename
+            return info
+
+        def record_download_archive(self, info_dict):
+            if not self.defer_postprocessing:
+                return super().record_download_archive(info_dict)
+            # Only record the video once its files are final
+            self.deferred.append(('archive', None, dict(info_dict), None))
+
+        def run_deferred(self) -> Optional[str]:
+            """
+            Run held-back post-processing, then archive records. Returns the
+            final file (of the last download), raises on failure.
+            """
+            deferred, self.deferred = self.deferred, []
+            filepath = None
+            for action, filename, info, files_to_move in deferred:
+                if action == 'post_process':
+                    filepath = super().post_process(filename, info, files_to_move).get('filepath')
+                else:
+                    super().record_download_archive(info)
+            return filepath
+
+        def _run_fd(self, fd, name, info):
+            for ph in self._progress_hooks:
+                fd.add_progress_hook(ph)
+            new_info = self._copy_infodict(info)
+            if new_info.get('http_headers') is None:
+                new_info['http_headers'] = self._calc_headers(new_info)
+            return fd.download(name, new_info)
+
+    return FlareYoutubeDL
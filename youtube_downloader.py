@@ -5,22 +5,24 @@ Clean. Cinematic. Fast.
 """
 
 import sys
-import os
 
-# Dependency check
+# Headless batch mode never touches Tk
+if __name__ == "__main__":
+    from flare_cli import wants_cli
+    if wants_cli(sys.argv[1:]):
+        from flare_cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
+# Dependency check - find_spec locates modules without importing them,
+# so the heavy imports happen once, below or lazily in the background
 def check_dependencies():
+    from importlib.util import find_spec
     errors = []
-    try:
-        import tkinter
-    except ImportError:
+    if find_spec("tkinter") is None:
         errors.append("tkinter not installed - reinstall Python with tcl/tk")
-    try:
-        import customtkinter
-    except ImportError:
+    if find_spec("customtkinter") is None:
         errors.append("customtkinter not installed - run: pip install customtkinter")
-    try:
-        import yt_dlp
-    except ImportError:
+    if find_spec("yt_dlp") is None:
         errors.append("yt-dlp not installed - run: pip install yt-dlp")
     if errors:
         print("Missing dependencies:")
@@ -31,12 +33,36 @@ def check_dependencies():
 check_dependencies()
 
 import customtkinter as ctk
+import tkinter as tk
 from tkinter import filedialog, messagebox
 import threading
-import subprocess
-import math
-from typing import Optional
-import yt_dlp
+from typing import Optional, List
+
+from download_queue import (
+    DownloadQueue, DownloadJob, JobState, MAX_WORKERS, preload_yt_dlp, friendly_error,
+)
+from progress import ProgressAggregator, PROGRESS_HZ
+from log_buffer import LogBuffer, setup_logging, LEVELS
+from paths import get_default_download_dir
+from settings import Settings
+from animation import GlowAnimation, glow_palette
+from download_archive import DownloadArchive
+from info_cache import InfoCache
+from bandwidth import BandwidthManager, format_rate, parse_rate, parse_schedule
+from job_store import JobStore, resumable_bytes
+from retry_policy import RetryPolicy
+from metrics import MetricsRecorder
+from cookie_store import CookieStore
+from clipboard_watch import POLL_INTERVAL, ClipboardWatcher, system_reader
+from url_router import index_ready, is_supported_url
+from format_probe import PROBE_URL_PATTERN, FormatOption, ProbeResult, probe
+from format_plan import plan_probed
+from ydl_options import (
+    VIDEO_FORMATS, AUDIO_FORMATS, VIDEO_QUALITIES, AUDIO_QUALITIES, PROFILES, load_profiles,
+)
+from playlist import (
+    Playlist, PlaylistEntry, PlaylistProgress, looks_like_playlist, extract_playlist, submit_playlist,
+)
 
 try:
     from version import __version__, GITHUB_REPO
@@ -71,6 +97,26 @@ class Colors:
     ERROR = "#ff3333"
 
 
+# Log widget limits - full history lives in the rotating log file
+LOG_VISIBLE_LINES = 500
+LOG_FLUSH_MS = 100
+
+# Wait for typing to settle before probing a URL
+PROBE_DELAY_MS = 500
+AUTO_FORMAT = "Auto (quality preset)"
+
+# Profile menu entry for choices made by hand
+CUSTOM_PROFILE = "Custom"
+
+# Download engine labels -> DownloadQueue engine names
+ENGINE_LABELS = {"Standard": "native", "Segmented": "segmented"}
+
+# Offered speed limits; any other value can be set in settings.json
+RATE_CHOICES = ["", "512K", "1M", "2M", "5M", "10M", "25M"]
+# Re-check the bandwidth schedule for the status text this often
+SCHEDULE_REFRESH_MS = 30000
+
+
 class FlareDownloadApp(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -82,28 +128,125 @@ class FlareDownloadApp(ctk.CTk):
         self.configure(fg_color=Colors.BLACK)
 
         # State
-        self.is_downloading = False
-        self._glow_phase = 0
+        self.settings = Settings()
+        self._job_states = {}
+        self._batch_done = 0
+        self._batch_failed = 0
+        self._batch_skipped = 0
 
         # Variables
         self.url_var = ctk.StringVar()
-        self.output_dir = ctk.StringVar(value=self._get_default_download_dir())
+        self.output_dir = ctk.StringVar(value=get_default_download_dir())
         self.format_var = ctk.StringVar(value="mp4")
         self.quality_var = ctk.StringVar(value="Best")
         self.media_type = ctk.StringVar(value="Video")
-
-        self.video_formats = ["mp4", "webm", "mkv", "mov", "avi"]
-        self.audio_formats = ["mp3", "m4a", "wav", "flac", "opus"]
-        self.video_qualities = ["Best", "1080p", "720p", "480p", "360p"]
-        self.audio_qualities = ["Best", "320k", "256k", "192k", "128k"]
+        self.workers_var = ctk.StringVar(value=str(self.settings.get("workers")))
+        self.reduced_motion = ctk.BooleanVar(value=bool(self.settings.get("reduced_motion")))
+        self.expand_playlists = ctk.BooleanVar(value=bool(self.settings.get("expand_playlists")))
+        self.use_archive = ctk.BooleanVar(value=bool(self.settings.get("use_archive")))
+        self.watch_clipboard = ctk.BooleanVar(value=bool(self.settings.get("watch_clipboard")))
+        self.log_level_var = ctk.StringVar(value="Info")
+        engine = self.settings.get("engine")
+        self.engine_var = ctk.StringVar(
+            value=next((label for label, name in ENGINE_LABELS.items() if name == engine), "Standard"))
+        self.stream_var = ctk.StringVar(value=AUTO_FORMAT)
+        self.limit_var = ctk.StringVar(value=self._rate_label(self.settings.get("bandwidth_limit")))
+        self.job_limit_var = ctk.StringVar(value=self._rate_label(self.settings.get("bandwidth_per_job")))
+
+        # Format probe - latest result for the URL in the entry
+        self._probe_after = None
+        self._probe_url = None
+        self._probe_result: Optional[ProbeResult] = None
+        self._stream_options = {}
+
+        # Download profiles by menu label; user profiles come from settings
+        profile_error = None
+        try:
+            profiles = load_profiles(self.settings.get("profiles") or [])
+        except ValueError as e:
+            profiles, profile_error = PROFILES, e
+        self.profiles = {profile.label: profile for profile in profiles.values()}
+        self.profile_var = ctk.StringVar(value=CUSTOM_PROFILE)
+
+        # Logging - any thread may log; the widget is refreshed in batches
+        self._log_flush_pending = False
+        self._log_buffer = LogBuffer(on_new=self._schedule_log_flush)
+        self.logger = setup_logging(self._log_buffer)
+
+        # Download queue - workers only post the latest job state to the
+        # aggregator; the Tk thread picks it up at PROGRESS_HZ
+        self._progress = ProgressAggregator()
+        self._pump_running = False
+        # Shared so a probed URL is not extracted again for the download
+        self.info_cache = InfoCache()
+        self.bandwidth = BandwidthManager(
+            limit=self._setting_rate("bandwidth_limit"),
+            per_job=self._setting_rate("bandwidth_per_job"),
+            schedule=self._setting_schedule(),
+        )
+        # Per-job timings go to metrics.jsonl in the data folder
+        self.metrics = MetricsRecorder()
+        # Sign-in cookies, read once on the first download and shared
+        self.cookies = CookieStore(self.settings.get("cookies_file"), self.settings.get("cookies_from_browser"),
+                                   log=self.logger.info)
+        self.queue = DownloadQueue(
+            max_workers=int(self.workers_var.get()),
+            on_update=lambda job: self._progress.push(job.id, job),
+            log=self.logger.info,
+            info_cache=self.info_cache,
+            engine=ENGINE_LABELS[self.engine_var.get()],
+            connections=self.settings.get("connections"),
+            bandwidth=self.bandwidth,
+            store=JobStore(),
+            retry_policy=RetryPolicy(),
+            site_limits=self.settings.get("site_limits"),
+            encode_preset=self.settings.get("encode_preset"),
+            ffmpeg_location=self.settings.get("ffmpeg_location"),
+            metrics=self.metrics,
+            cookies=self.cookies,
+        )
+        self.archive = DownloadArchive()
+        self._on_archive_change()
 
         self._build_ui()
-        self._start_glow_animation()
+
+        metrics_port = self.settings.get("metrics_port")
+        if metrics_port:
+            try:
+                port = self.metrics.serve(int(metrics_port))
+                self.logger.info(f"Metrics at http://127.0.0.1:{port}/metrics")
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Metrics endpoint not started: {e}")
+        if profile_error is not None:
+            self.logger.warning(f"Custom profiles ignored: {profile_error}")
+
+        # Clipboard watcher - read off the Tk thread where the system allows,
+        # otherwise Tk's clipboard is polled here and fed to it
+        self.clipboard_watcher = ClipboardWatcher(
+            on_urls=lambda urls: self.after(0, self._clipboard_urls, urls),
+            read=system_reader(),
+        )
+        self._tk_clipboard = None
+        if self.watch_clipboard.get():
+            self._start_clipboard_watch()
+
+        # Button glow - table computed once, timer idle when nobody is looking
+        self.glow = GlowAnimation(
+            self,
+            apply=lambda color: self.download_btn.configure(fg_color=color),
+            palette=glow_palette((0xff, 0x45, 0x00)),
+            interval_ms=80,
+            rest_color=Colors.FIRE,
+        )
+        self.glow.set_paused("reduced_motion", self.reduced_motion.get())
+        self.glow.start()
         self.protocol("WM_DELETE_WINDOW", self._on_close)
 
-    def _get_default_download_dir(self) -> str:
-        downloads = os.path.expanduser("~/Downloads")
-        return downloads if os.path.isdir(downloads) else os.path.expanduser("~")
+        # Let the first frame paint, then load yt-dlp off the Tk thread
+        self.after(100, preload_yt_dlp)
+        self.url_var.trace_add("write", lambda *_: self._schedule_probe())
+        # Continue downloads interrupted by a crash, an update or closing the app
+        self.after(200, self._restore_jobs)
 
     def _build_ui(self):
         # Main container
@@ -145,6 +288,18 @@ class FlareDownloadApp(ctk.CTk):
             text_color=Colors.GRAY_DIM
         ).pack(side="right", pady=(20, 0))
 
+        ctk.CTkCheckBox(
+            title_frame,
+            text="Reduce motion",
+            variable=self.reduced_motion,
+            command=self._on_reduced_motion_change,
+            checkbox_width=16, checkbox_height=16,
+            border_width=1,
+            fg_color=Colors.FIRE, hover_color=Colors.FIRE_GLOW,
+            text_color=Colors.GRAY_DIM,
+            font=ctk.CTkFont(size=11)
+        ).pack(side="right", padx=(0, 15), pady=(20, 0))
+
         # Tagline
         ctk.CTkLabel(
             header,
@@ -175,7 +330,7 @@ class FlareDownloadApp(ctk.CTk):
         self.url_entry = ctk.CTkEntry(
             url_section,
             textvariable=self.url_var,
-            placeholder_text="Paste video URL here...",
+            placeholder_text="Paste video URL(s) here...",
             height=50,
             corner_radius=8,
             border_width=2,
@@ -215,6 +370,64 @@ class FlareDownloadApp(ctk.CTk):
             font=ctk.CTkFont(size=12, weight="bold")
         ).pack(side="left")
 
+        ctk.CTkSwitch(
+            btn_row,
+            text="Expand playlists",
+            variable=self.expand_playlists,
+            command=lambda: self.settings.set("expand_playlists", self.expand_playlists.get()),
+            progress_color=Colors.FIRE,
+            text_color=Colors.GRAY,
+            font=ctk.CTkFont(size=12)
+        ).pack(side="right")
+
+        ctk.CTkSwitch(
+            btn_row,
+            text="Watch clipboard",
+            variable=self.watch_clipboard,
+            command=self._on_watch_clipboard_change,
+            progress_color=Colors.FIRE,
+            text_color=Colors.GRAY,
+            font=ctk.CTkFont(size=12)
+        ).pack(side="right", padx=(0, 15))
+
+        ctk.CTkSwitch(
+            btn_row,
+            text="Skip downloaded",
+            variable=self.use_archive,
+            command=self._on_archive_change,
+            progress_color=Colors.FIRE,
+            text_color=Colors.GRAY,
+            font=ctk.CTkFont(size=12)
+        ).pack(side="right", padx=(0, 15))
+
+        # Stream picker - shown once a probe has listed the URL's formats
+        self.probe_row = ctk.CTkFrame(url_section, fg_color="transparent")
+
+        self.probe_title = ctk.CTkLabel(
+            self.probe_row,
+            text="",
+            anchor="w",
+            font=ctk.CTkFont(size=12),
+            text_color=Colors.GRAY
+        )
+        self.probe_title.pack(fill="x", pady=(0, 6))
+
+        self.stream_menu = ctk.CTkOptionMenu(
+            self.probe_row,
+            variable=self.stream_var,
+            values=[AUTO_FORMAT],
+            height=36,
+            corner_radius=6,
+            fg_color=Colors.SURFACE_LIGHT,
+            button_color=Colors.FIRE,
+            button_hover_color=Colors.FIRE_GLOW,
+            dropdown_fg_color=Colors.SURFACE,
+            dropdown_hover_color=Colors.FIRE,
+            font=ctk.CTkFont(family="Consolas", size=12),
+            dropdown_font=ctk.CTkFont(family="Consolas", size=12)
+        )
+        self.stream_menu.pack(fill="x")
+
         # ═══════════════════════════════════════════════════════════════════
         # OUTPUT FOLDER
         # ═══════════════════════════════════════════════════════════════════
@@ -270,7 +483,7 @@ class FlareDownloadApp(ctk.CTk):
 
         # Type
         type_frame = ctk.CTkFrame(options_inner, fg_color="transparent")
-        type_frame.pack(side="left", padx=(0, 35))
+        type_frame.pack(side="left", padx=(0, 25))
         ctk.CTkLabel(type_frame, text="TYPE", font=ctk.CTkFont(size=10, weight="bold"),
                     text_color=Colors.GRAY_DIM).pack(anchor="w")
         ctk.CTkSegmentedButton(
@@ -283,31 +496,94 @@ class FlareDownloadApp(ctk.CTk):
 
         # Format
         format_frame = ctk.CTkFrame(options_inner, fg_color="transparent")
-        format_frame.pack(side="left", padx=(0, 35))
+        format_frame.pack(side="left", padx=(0, 25))
         ctk.CTkLabel(format_frame, text="FORMAT", font=ctk.CTkFont(size=10, weight="bold"),
                     text_color=Colors.GRAY_DIM).pack(anchor="w")
         self.format_menu = ctk.CTkOptionMenu(
-            format_frame, values=self.video_formats, variable=self.format_var,
+            format_frame, values=VIDEO_FORMATS, variable=self.format_var,
+            command=self._on_format_change,
             width=100, fg_color=Colors.SURFACE_LIGHT, button_color=Colors.BORDER
         )
         self.format_menu.pack(pady=(6, 0))
 
         # Quality
         quality_frame = ctk.CTkFrame(options_inner, fg_color="transparent")
-        quality_frame.pack(side="left")
+        quality_frame.pack(side="left", padx=(0, 25))
         ctk.CTkLabel(quality_frame, text="QUALITY", font=ctk.CTkFont(size=10, weight="bold"),
                     text_color=Colors.GRAY_DIM).pack(anchor="w")
         self.quality_menu = ctk.CTkOptionMenu(
-            quality_frame, values=self.video_qualities, variable=self.quality_var,
+            quality_frame, values=VIDEO_QUALITIES, variable=self.quality_var,
+            command=lambda _: self.profile_var.set(CUSTOM_PROFILE),
             width=100, fg_color=Colors.SURFACE_LIGHT, button_color=Colors.BORDER
         )
         self.quality_menu.pack(pady=(6, 0))
 
+        # Parallel downloads
+        workers_frame = ctk.CTkFrame(options_inner, fg_color="transparent")
+        workers_frame.pack(side="left", padx=(0, 25))
+        ctk.CTkLabel(workers_frame, text="PARALLEL", font=ctk.CTkFont(size=10, weight="bold"),
+                    text_color=Colors.GRAY_DIM).pack(anchor="w")
+        ctk.CTkOptionMenu(
+            workers_frame, values=[str(n) for n in range(1, MAX_WORKERS + 1)],
+            variable=self.workers_var, command=self._on_workers_change,
+            width=70, fg_color=Colors.SURFACE_LIGHT, button_color=Colors.BORDER
+        ).pack(pady=(6, 0))
+
+        # Download engine
+        engine_frame = ctk.CTkFrame(options_inner, fg_color="transparent")
+        engine_frame.pack(side="left")
+        ctk.CTkLabel(engine_frame, text="ENGINE", font=ctk.CTkFont(size=10, weight="bold"),
+                    text_color=Colors.GRAY_DIM).pack(anchor="w")
+        ctk.CTkOptionMenu(
+            engine_frame, values=list(ENGINE_LABELS),
+            variable=self.engine_var, command=self._on_engine_change,
+            width=110, fg_color=Colors.SURFACE_LIGHT, button_color=Colors.BORDER
+        ).pack(pady=(6, 0))
+
+        # Second row: profile, then bandwidth limits (applied live to running downloads)
+        limits_row = ctk.CTkFrame(options_section, fg_color="transparent")
+        limits_row.pack(fill="x", padx=20, pady=(0, 18))
+
+        # Profile
+        profile_frame = ctk.CTkFrame(limits_row, fg_color="transparent")
+        profile_frame.pack(side="left", padx=(0, 25))
+        ctk.CTkLabel(profile_frame, text="PROFILE", font=ctk.CTkFont(size=10, weight="bold"),
+                    text_color=Colors.GRAY_DIM).pack(anchor="w")
+        ctk.CTkOptionMenu(
+            profile_frame, values=[CUSTOM_PROFILE] + list(self.profiles), variable=self.profile_var,
+            command=self._on_profile_change,
+            width=150, fg_color=Colors.SURFACE_LIGHT, button_color=Colors.BORDER
+        ).pack(pady=(6, 0))
+
+        rate_labels = [self._rate_label(rate) for rate in RATE_CHOICES]
+
+        for text, variable in (("SPEED LIMIT", self.limit_var), ("PER DOWNLOAD", self.job_limit_var)):
+            frame = ctk.CTkFrame(limits_row, fg_color="transparent")
+            frame.pack(side="left", padx=(0, 25))
+            ctk.CTkLabel(frame, text=text, font=ctk.CTkFont(size=10, weight="bold"),
+                        text_color=Colors.GRAY_DIM).pack(anchor="w")
+            values = rate_labels if variable.get() in rate_labels else rate_labels + [variable.get()]
+            ctk.CTkOptionMenu(
+                frame, values=values, variable=variable,
+                command=lambda _value: self._on_limit_change(),
+                width=110, fg_color=Colors.SURFACE_LIGHT, button_color=Colors.BORDER
+            ).pack(pady=(6, 0))
+
+        self.limit_label = ctk.CTkLabel(
+            limits_row, text="", anchor="w",
+            font=ctk.CTkFont(size=11), text_color=Colors.GRAY_DIM
+        )
+        self.limit_label.pack(side="left", fill="x", expand=True, pady=(18, 0))
+        self._refresh_limit_label()
+
         # ═══════════════════════════════════════════════════════════════════
         # DOWNLOAD BUTTON - With glow animation
         # ═══════════════════════════════════════════════════════════════════
+        action_row = ctk.CTkFrame(main, fg_color="transparent")
+        action_row.pack(fill="x", pady=(0, 25))
+
         self.download_btn = ctk.CTkButton(
-            main,
+            action_row,
             text="DOWNLOAD",
             command=self._start_download,
             height=58,
@@ -316,7 +592,22 @@ class FlareDownloadApp(ctk.CTk):
             hover_color=Colors.FIRE_GLOW,
             font=ctk.CTkFont(size=18, weight="bold")
         )
-        self.download_btn.pack(fill="x", pady=(0, 25))
+        self.download_btn.pack(side="left", fill="x", expand=True)
+
+        self.cancel_btn = ctk.CTkButton(
+            action_row,
+            text="CANCEL",
+            command=self._cancel_download,
+            width=110, height=58,
+            corner_radius=10,
+            fg_color=Colors.SURFACE_LIGHT,
+            hover_color="#aa0000",
+            border_width=1,
+            border_color=Colors.BORDER,
+            state="disabled",
+            font=ctk.CTkFont(size=14, weight="bold")
+        )
+        self.cancel_btn.pack(side="right", padx=(12, 0))
 
         # ═══════════════════════════════════════════════════════════════════
         # PROGRESS
@@ -350,12 +641,20 @@ class FlareDownloadApp(ctk.CTk):
                     text_color=Colors.GRAY_DIM).pack(side="left")
 
         ctk.CTkButton(
-            log_header, text="Clear", command=lambda: self.log_text.delete("1.0", "end"),
+            log_header, text="Clear", command=self._clear_log,
             width=55, height=26, corner_radius=4,
             fg_color=Colors.SURFACE_LIGHT, hover_color=Colors.BORDER,
             font=ctk.CTkFont(size=10)
         ).pack(side="right")
 
+        ctk.CTkOptionMenu(
+            log_header, values=list(LEVELS), variable=self.log_level_var,
+            command=lambda _: self._render_log(),
+            width=95, height=26, corner_radius=4,
+            fg_color=Colors.SURFACE_LIGHT, button_color=Colors.BORDER,
+            font=ctk.CTkFont(size=10)
+        ).pack(side="right", padx=(0, 8))
+
         self.log_text = ctk.CTkTextbox(
             log_section, height=120, corner_radius=8,
             fg_color=Colors.BLACK, text_color=Colors.GRAY,
@@ -365,27 +664,14 @@ class FlareDownloadApp(ctk.CTk):
 
         self._log("Flare Download ready. Paste a URL to begin.")
 
-    def _start_glow_animation(self):
-        """Subtle pulsing glow on download button."""
-        if not self.winfo_exists():
-            return
-
-        if not self.is_downloading:
-            self._glow_phase += 0.05
-            # Subtle brightness variation
-            brightness = 0.92 + 0.08 * math.sin(self._glow_phase)
-            r = int(0xff * brightness)
-            g = int(0x45 * brightness)
-            color = f"#{r:02x}{g:02x}00"
-            try:
-                self.download_btn.configure(fg_color=color)
-            except:
-                pass
-
-        self.after(80, self._start_glow_animation)
+    def _on_reduced_motion_change(self):
+        reduced = self.reduced_motion.get()
+        self.settings.set("reduced_motion", reduced)
+        self.glow.set_paused("reduced_motion", reduced)
 
     def _paste_url(self):
         """Simple paste from clipboard."""
+        preload_yt_dlp()
         try:
             text = self.clipboard_get()
             if text:
@@ -395,21 +681,68 @@ class FlareDownloadApp(ctk.CTk):
         except:
             pass
 
-        if sys.platform == 'win32':
+        read = self.clipboard_watcher.read
+        if read is None:
+            self._log("Could not read clipboard - try Ctrl+V in the URL box")
+            return
+
+        # The system clipboard may be slow to answer; never wait for it here
+        def _read():
             try:
-                result = subprocess.run(
-                    ['powershell', '-command', 'Get-Clipboard'],
-                    capture_output=True, text=True, timeout=3,
-                    creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
-                )
-                if result.returncode == 0 and result.stdout.strip():
-                    self.url_var.set(result.stdout.strip())
-                    self._log("URL pasted")
-                    return
-            except:
-                pass
-
-        self._log("Could not read clipboard - try Ctrl+V in the URL box")
+                text = (read() or '').strip()
+            except Exception:
+                text = ''
+            self.after(0, self._pasted, text)
+
+        threading.Thread(target=_read, daemon=True).start()
+
+    def _pasted(self, text: str):
+        if text:
+            self.url_var.set(text)
+            self._log("URL pasted")
+        else:
+            self._log("Could not read clipboard - try Ctrl+V in the URL box")
+
+    # ── Clipboard watcher ───────────────────────────────────────────────
+
+    def _on_watch_clipboard_change(self):
+        enabled = self.watch_clipboard.get()
+        self.settings.set("watch_clipboard", enabled)
+        if enabled:
+            self._start_clipboard_watch()
+            self._log("Watching the clipboard - copied video links are queued")
+        else:
+            self.clipboard_watcher.stop()
+            self._log("Stopped watching the clipboard")
+
+    def _start_clipboard_watch(self):
+        preload_yt_dlp()
+        self.clipboard_watcher.start()
+        if self.clipboard_watcher.read is None:
+            # What is there now is not new
+            self._tk_clipboard = self._read_tk_clipboard()
+            self.after(int(POLL_INTERVAL * 1000), self._poll_tk_clipboard)
+
+    def _read_tk_clipboard(self) -> Optional[str]:
+        try:
+            return self.clipboard_get()
+        except tk.TclError:
+            return None
+
+    def _poll_tk_clipboard(self):
+        if not self.watch_clipboard.get():
+            return
+        text = self._read_tk_clipboard()
+        if text is not None and text != self._tk_clipboard:
+            self._tk_clipboard = text
+            self.clipboard_watcher.feed(text)
+        self.after(int(POLL_INTERVAL * 1000), self._poll_tk_clipboard)
+
+    def _clipboard_urls(self, urls: List[str]):
+        if not self.watch_clipboard.get():
+            return
+        self._log(f"From clipboard: {', '.join(url[:60] for url in urls)}")
+        self._queue_urls(urls, self._download_options())
 
     def _browse_folder(self):
         folder = filedialog.askdirectory(initialdir=self.output_dir.get())
@@ -418,201 +751,509 @@ class FlareDownloadApp(ctk.CTk):
 
     def _on_type_change(self, value):
         if value == "Audio":
-            self.format_menu.configure(values=self.audio_formats)
+            self.format_menu.configure(values=AUDIO_FORMATS)
             self.format_var.set("mp3")
-            self.quality_menu.configure(values=self.audio_qualities)
+            self.quality_menu.configure(values=AUDIO_QUALITIES)
             self.quality_var.set("Best")
         else:
-            self.format_menu.configure(values=self.video_formats)
+            self.format_menu.configure(values=VIDEO_FORMATS)
             self.format_var.set("mp4")
-            self.quality_menu.configure(values=self.video_qualities)
+            self.quality_menu.configure(values=VIDEO_QUALITIES)
             self.quality_var.set("Best")
+        self.profile_var.set(CUSTOM_PROFILE)
+        self._refresh_stream_menu()
+
+    def _on_format_change(self, _value):
+        self.profile_var.set(CUSTOM_PROFILE)
+        self._log_format_plan()
+
+    def _on_profile_change(self, label):
+        profile = self.profiles.get(label)
+        if profile is None:
+            return
+        media_type = "Audio" if profile.is_audio else "Video"
+        if self.media_type.get() != media_type:
+            self.media_type.set(media_type)
+            self._on_type_change(media_type)
+        self.format_var.set(profile.fmt)
+        self.quality_var.set(profile.quality)
+        self.profile_var.set(label)
+        self._log_format_plan()
+
+    # ── Format probe ────────────────────────────────────────────────────
+
+    def _schedule_probe(self):
+        if self._probe_after is not None:
+            self.after_cancel(self._probe_after)
+        self._probe_after = self.after(PROBE_DELAY_MS, self._start_probe)
+
+    def _start_probe(self):
+        """Probe the entry's URL in the background if it is a single video."""
+        self._probe_after = None
+        url = self.url_var.get().strip()
+        if url == self._probe_url:
+            return
+        self._probe_url = url
+        self._show_probe(None)
+
+        if not PROBE_URL_PATTERN.match(url) or looks_like_playlist(url):
+            return
+
+        self.probe_title.configure(text="Reading available formats...")
+        self.probe_row.pack(fill="x", padx=20, pady=(0, 18))
+
+        def _probe():
+            try:
+                result = probe(url, self.info_cache, self.cookies,
+                               self.queue.retry_policy, self.queue.sessions)
+            except Exception as e:
+                self.logger.debug(f"Probe failed for {url}: {e}")
+                result = None
+            self.after(0, self._probe_done, url, result)
+
+        threading.Thread(target=_probe, daemon=True).start()
+
+    def _probe_done(self, url: str, result: Optional[ProbeResult]):
+        if url != self._probe_url:
+            return  # The entry changed while probing
+        self._show_probe(result)
+        if result is not None:
+            source = " (cached)" if result.from_cache else ""
+            self._log(f"Found {len(result.formats)} formats for {result.title[:50]}{source}")
+            self._log_format_plan()
+
+    def _log_format_plan(self):
+        """Say up front whether the probed video reaches the chosen container by stream copy."""
+        if self._probe_result is None or self.media_type.get() == "Audio":
+            return
+        plan = plan_probed(self._probe_result.formats, self.format_var.get(), self.quality_var.get())
+        if plan is not None:
+            note = " - this can take a while" if plan.reencode else ""
+            self._log(f"{plan.describe()}{note}")
+
+    def _show_probe(self, result: Optional[ProbeResult]):
+        self._probe_result = result
+        if result is None or not result.formats:
+            self._probe_result = None
+            self.probe_row.pack_forget()
+            self._refresh_stream_menu()
+            return
+        self.probe_title.configure(text=f"{result.title[:70]}  ·  {result.extractor}")
+        self.probe_row.pack(fill="x", padx=20, pady=(0, 18))
+        self._refresh_stream_menu()
+
+    def _refresh_stream_menu(self):
+        """List the probed streams that fit the current Video/Audio mode."""
+        self._stream_options = {}
+        if self._probe_result is not None:
+            for option in self._probe_result.for_mode(self.media_type.get() == "Audio"):
+                self._stream_options[option.label()] = option
+        self.stream_menu.configure(values=[AUTO_FORMAT] + list(self._stream_options))
+        self.stream_var.set(AUTO_FORMAT)
+
+    def _selected_format_spec(self, url: str) -> Optional[str]:
+        option: Optional[FormatOption] = self._stream_options.get(self.stream_var.get())
+        if option is None or self._probe_result is None or self._probe_result.url != url:
+            return None
+        return option.format_spec(self.media_type.get() == "Audio")
 
     def _log(self, message, error=False):
-        prefix = "[!] " if error else ""
-        self.log_text.insert("end", f"{prefix}{message}\n")
+        if error:
+            self.logger.error(message)
+        else:
+            self.logger.info(message)
+
+    def _schedule_log_flush(self):
+        """Called by the log buffer, possibly from a worker thread."""
+        if not self._log_flush_pending:
+            self._log_flush_pending = True
+            self.after(LOG_FLUSH_MS, self._flush_log)
+
+    def _flush_log(self):
+        """Append buffered log lines to the widget in one insert and trim it."""
+        self._log_flush_pending = False
+        lines, dropped = self._log_buffer.drain(LEVELS[self.log_level_var.get()])
+        if dropped:
+            lines.insert(0, f"... {dropped} lines skipped (see log file) ...")
+        if not lines:
+            return
+
+        self.log_text.insert("end", "\n".join(lines) + "\n")
+        line_count = int(self.log_text.index("end-1c").split(".")[0])
+        if line_count > LOG_VISIBLE_LINES:
+            self.log_text.delete("1.0", f"{line_count - LOG_VISIBLE_LINES}.0")
         self.log_text.see("end")
 
+    def _render_log(self):
+        """Redraw the widget from the ring buffer, e.g. after a level change."""
+        self._log_buffer.drain()
+        lines = self._log_buffer.snapshot(LEVELS[self.log_level_var.get()])[-LOG_VISIBLE_LINES:]
+        self.log_text.delete("1.0", "end")
+        if lines:
+            self.log_text.insert("end", "\n".join(lines) + "\n")
+        self.log_text.see("end")
+
+    def _clear_log(self):
+        self._log_buffer.clear()
+        self.log_text.delete("1.0", "end")
+
+    def _on_archive_change(self):
+        enabled = self.use_archive.get()
+        self.settings.set("use_archive", enabled)
+        self.queue.archive = self.archive if enabled else None
+
+    def _on_workers_change(self, value):
+        self.settings.set("workers", int(value))
+        self.queue.set_max_workers(int(value))
+        self._refresh_queue_status()
+
+    def _on_engine_change(self, value):
+        engine = ENGINE_LABELS[value]
+        self.settings.set("engine", engine)
+        # Applies to downloads that start from now on
+        self.queue.engine = engine
+
+    # ── Bandwidth ───────────────────────────────────────────────────────
+
+    @staticmethod
+    def _rate_label(rate) -> str:
+        try:
+            return format_rate(parse_rate(rate))
+        except ValueError:
+            return format_rate(None)
+
+    def _setting_rate(self, key: str):
+        try:
+            return parse_rate(self.settings.get(key))
+        except ValueError:
+            return None
+
+    def _setting_schedule(self):
+        try:
+            return parse_schedule(self.settings.get("bandwidth_schedule") or [])
+        except ValueError as e:
+            self.logger.warning(f"Ignoring bandwidth schedule: {e}")
+            return []
+
+    def _on_limit_change(self):
+        # Menu labels ("2 MB/s", "Unlimited") parse back into rates
+        limit = parse_rate(self.limit_var.get())
+        per_job = parse_rate(self.job_limit_var.get())
+        self.bandwidth.set_limit(limit)
+        self.bandwidth.set_per_job(per_job)
+        self.settings.set("bandwidth_limit", int(limit) if limit else "")
+        self.settings.set("bandwidth_per_job", int(per_job) if per_job else "")
+        self._refresh_limit_label(reschedule=False)
+
+    def _refresh_limit_label(self, reschedule: bool = True):
+        """Show which limit is in force, e.g. while a schedule window is active."""
+        bandwidth = self.bandwidth
+        text = f"Limit now: {bandwidth.describe()}" if bandwidth.enabled else ""
+        self.limit_label.configure(text=text)
+        if reschedule and bandwidth.schedule:
+            self.after(SCHEDULE_REFRESH_MS, self._refresh_limit_label)
+
     def _start_download(self):
-        url = self.url_var.get().strip()
-        if not url:
+        urls = self.url_var.get().split()
+        if not urls:
             messagebox.showwarning("No URL", "Please enter a video URL")
             return
 
-        if self.is_downloading:
-            self._cancel_download()
+        self.clipboard_watcher.remember_urls(urls)
+        self._queue_urls(urls, self._download_options())
+        self.url_var.set("")
+
+    def _download_options(self) -> tuple:
+        return (
+            self.output_dir.get(),
+            self.format_var.get(),
+            self.quality_var.get(),
+            self.media_type.get() == "Audio",
+        )
+
+    def _queue_urls(self, urls: List[str], options: tuple):
+        direct = []
+        for url in urls:
+            if self.expand_playlists.get() and looks_like_playlist(url):
+                self._open_playlist(url, options)
+            else:
+                direct.append(url)
+
+        if direct:
+            # Only once the routing index is built, so the window never waits for it
+            unknown = [url for url in direct if not is_supported_url(url)] if index_ready() else []
+            if unknown:
+                self._log(f"No site extractor for {len(unknown)} link(s) - trying as direct media: "
+                          f"{unknown[0]}{' ...' if len(unknown) > 1 else ''}")
+            self._begin_batch()
+            for url in direct:
+                self.queue.submit(url, *options, format_spec=self._selected_format_spec(url))
+            if len(direct) > 1:
+                self._log(f"Queued {len(direct)} downloads")
+            self._jobs_submitted()
+
+    def _restore_jobs(self):
+        records = self.queue.store.pending()
+        if not records:
             return
+        self._begin_batch()
+        jobs = self.queue.restore()
+        on_disk = sum(resumable_bytes(record) for record in records)
+        note = f" ({on_disk / (1024 * 1024):.1f} MB already downloaded)" if on_disk else ""
+        self._log(f"Resuming {len(jobs)} unfinished download(s){note}")
+        self._jobs_submitted()
+
+    def _begin_batch(self):
+        """Reset batch counters unless jobs are already running."""
+        if not self.queue.is_busy():
+            self._batch_done = 0
+            self._batch_failed = 0
+            self._batch_skipped = 0
+            self.progress_bar.set(0)
+
+    def _jobs_submitted(self):
+        self.cancel_btn.configure(state="normal", fg_color="#cc0000")
+        self.glow.pause("busy")
+        self._start_progress_pump()
+
+    def _open_playlist(self, url: str, options: tuple):
+        """List a playlist in the background, then let the user pick entries."""
+        self._log(f"Listing playlist: {url[:70]}...")
+        self.status_label.configure(text="Listing playlist...")
+
+        def _extract():
+            try:
+                playlist = extract_playlist(url, log=self.logger.info, cookies=self.cookies,
+                                            retry_policy=self.queue.retry_policy,
+                                            sessions=self.queue.sessions)
+            except Exception as e:
+                self.logger.error(f"Error: {friendly_error(str(e))}")
+                return
+            if playlist is None:
+                # Turned out to be a single video
+                self.after(0, self._submit_single, url, options)
+            elif not playlist.entries:
+                self.logger.warning(f"Playlist is empty: {playlist.title}")
+            else:
+                self.after(0, self._show_playlist, playlist, options)
 
-        self.is_downloading = True
-        self.download_btn.configure(text="CANCEL", fg_color="#cc0000", hover_color="#aa0000")
-        self.progress_bar.set(0)
-        self.status_label.configure(text="Starting download...")
+        threading.Thread(target=_extract, daemon=True).start()
 
-        threading.Thread(target=self._download_thread, args=(url,), daemon=True).start()
+    def _submit_single(self, url: str, options: tuple):
+        self._begin_batch()
+        self.queue.submit(url, *options)
+        self._jobs_submitted()
+
+    def _show_playlist(self, playlist: Playlist, options: tuple):
+        progress = PlaylistProgress(playlist)
+        done = len(playlist.entries) - len(progress.pending())
+        self._log(f"Playlist: {playlist.title} ({len(playlist.entries)} entries, {done} already downloaded)")
+        if not self.queue.is_busy():
+            self.status_label.configure(text="Ready")
+
+        def _download(entries: List[PlaylistEntry]):
+            if not entries:
+                return
+            self._begin_batch()
+            output_dir, fmt, quality, is_audio = options
+            submit_playlist(self.queue, playlist, entries, output_dir, fmt, quality, is_audio, progress)
+            self._log(f"Queued {len(entries)} of {len(playlist.entries)} from {playlist.title}")
+            self._jobs_submitted()
+
+        PlaylistDialog(self, playlist, progress, on_download=_download)
 
     def _cancel_download(self):
-        self.is_downloading = False
-        self.download_btn.configure(text="DOWNLOAD", fg_color=Colors.FIRE, hover_color=Colors.FIRE_GLOW)
+        self.queue.cancel_all()
         self.status_label.configure(text="Cancelled")
         self._log("Download cancelled")
 
-    def _progress_hook(self, d):
-        """yt-dlp progress callback."""
-        if not self.is_downloading:
-            raise yt_dlp.utils.DownloadCancelled("Cancelled by user")
-
-        if d['status'] == 'downloading':
-            # Get percentage
-            if 'total_bytes' in d and d['total_bytes']:
-                pct = (d.get('downloaded_bytes', 0) / d['total_bytes']) * 100
-            elif 'total_bytes_estimate' in d and d['total_bytes_estimate']:
-                pct = (d.get('downloaded_bytes', 0) / d['total_bytes_estimate']) * 100
-            elif '_percent_str' in d:
-                try:
-                    pct = float(d['_percent_str'].replace('%', '').strip())
-                except:
-                    pct = 0
-            else:
-                pct = 0
-
-            # Update UI
-            self.after(0, lambda p=pct: self.progress_bar.set(p / 100))
-
-            # Status text
-            speed = d.get('_speed_str', '')
-            eta = d.get('_eta_str', '')
-            status = f"Downloading: {pct:.1f}%"
-            if speed:
-                status += f" • {speed}"
-            if eta:
-                status += f" • ETA: {eta}"
-            self.after(0, lambda s=status: self.status_label.configure(text=s[:55]))
-
-        elif d['status'] == 'finished':
-            self.after(0, lambda: self.status_label.configure(text="Processing..."))
-            self.after(0, lambda: self._log("Download finished, processing..."))
-
-    def _download_thread(self, url):
-        output_dir = self.output_dir.get()
-        fmt = self.format_var.get()
-        quality = self.quality_var.get()
-        is_audio = self.media_type.get() == "Audio"
-
-        self._log(f"Starting download: {url[:70]}...")
-
-        # Get FFmpeg path (bundled with app)
-        if getattr(sys, 'frozen', False):
-            # Running as compiled exe
-            app_dir = os.path.dirname(sys.executable)
-        else:
-            # Running as script
-            app_dir = os.path.dirname(os.path.abspath(__file__))
-
-        ffmpeg_path = os.path.join(app_dir, 'ffmpeg.exe')
-
-        # Build yt-dlp options
-        ydl_opts = {
-            'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
-            'noplaylist': True,
-            'socket_timeout': 30,
-            'retries': 10,
-            'fragment_retries': 10,
-            'progress_hooks': [self._progress_hook],
-            'quiet': True,
-            'no_warnings': True,
-            'ignoreerrors': False,
-            'nocheckcertificate': True,
-            'geo_bypass': True,
-            'extractor_retries': 5,
-            'file_access_retries': 5,
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            },
-        }
-
-        # Set FFmpeg location if bundled
-        if os.path.exists(ffmpeg_path):
-            ydl_opts['ffmpeg_location'] = app_dir
+    def _start_progress_pump(self):
+        if not self._pump_running:
+            self._pump_running = True
+            self.after(1000 // PROGRESS_HZ, self._pump_progress)
+
+    def _pump_progress(self):
+        """Apply coalesced job updates; runs at PROGRESS_HZ while the queue is busy."""
+        if not self.winfo_exists():
+            return
+
+        updates = self._progress.drain()
+        for job_id in sorted(updates):
+            self._on_job_update(updates[job_id])
+
+        if self.queue.is_busy() or self._progress.has_pending():
+            if updates:
+                self._refresh_queue_status()
+            self.after(1000 // PROGRESS_HZ, self._pump_progress)
         else:
-            self._log("Note: FFmpeg not found, some formats may not work")
-
-        if is_audio:
-            # Audio extraction
-            ydl_opts['format'] = 'bestaudio/best'
-            # Quality mapping
-            quality_map = {'Best': '0', '320k': '0', '256k': '1', '192k': '2', '128k': '5'}
-            ydl_opts['postprocessors'] = [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': fmt,
-                'preferredquality': quality_map.get(quality, '2'),
-            }]
+            self._pump_running = False
+            self._download_complete()
+
+    def _on_job_update(self, job: DownloadJob):
+        """Apply the latest state of one job on the Tk thread."""
+        previous = self._job_states.get(job.id)
+        if job.finished:
+            self._job_states.pop(job.id, None)
         else:
-            # Video format selection with robust fallbacks
-            if quality == "Best":
-                ydl_opts['format'] = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/bestvideo+bestaudio/best'
-            else:
-                height = quality.replace("p", "")
-                ydl_opts['format'] = f'bestvideo[height<={height}][ext=mp4]+bestaudio[ext=m4a]/bestvideo[height<={height}]+bestaudio/best[height<={height}]/best'
+            self._job_states[job.id] = job.state
+
+        if job.state != previous:
+            if job.state == JobState.FAILED:
+                self._batch_failed += 1
+                self._log(f"Error: {job.error}", error=True)
+            elif job.state == JobState.DONE:
+                self._batch_done += 1
+            elif job.state == JobState.SKIPPED:
+                self._batch_skipped += 1
+
+    def _refresh_queue_status(self):
+        """Aggregate progress of the current batch into the bar and label."""
+        jobs = [job for job in self.queue.jobs() if job.state != JobState.CANCELLED]
+        if not jobs:
+            return
 
-            # Set output format
-            ydl_opts['merge_output_format'] = fmt
+        pct = sum(job.progress for job in jobs) / len(jobs)
+        self.progress_bar.set(pct / 100)
 
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                self.after(0, lambda: self._log("Fetching video info..."))
-                info = ydl.extract_info(url, download=True)
-                if info:
-                    title = info.get('title', 'Unknown')
-                    self.after(0, lambda t=title: self._log(f"Downloaded: {t}"))
-                    self.after(0, lambda: self._download_complete(True))
-                else:
-                    self.after(0, lambda: self._download_complete(False, "Could not extract video info"))
-
-        except yt_dlp.utils.DownloadCancelled:
-            self.after(0, lambda: self._log("Download cancelled"))
-        except yt_dlp.utils.DownloadError as e:
-            error_msg = str(e)
-            # Clean up error message for user
-            if "Video unavailable" in error_msg:
-                error_msg = "Video unavailable or private"
-            elif "Sign in" in error_msg or "age" in error_msg.lower():
-                error_msg = "Video requires sign-in (age-restricted)"
-            elif "HTTP Error 403" in error_msg:
-                error_msg = "Access forbidden - try a different video"
-            elif "HTTP Error 404" in error_msg:
-                error_msg = "Video not found"
-            elif "ffmpeg" in error_msg.lower() or "ffprobe" in error_msg.lower():
-                error_msg = "FFmpeg needed for this format - try MP4 video or M4A audio"
-            elif "Unsupported URL" in error_msg:
-                error_msg = "Unsupported URL - check the link"
-            elif "No video formats" in error_msg:
-                error_msg = "No downloadable formats found"
+        stages = (JobState.RUNNING, JobState.DOWNLOADED, JobState.PROCESSING)
+        running = [job for job in jobs if job.state in stages]
+        pending = self.queue.pending_count()
+
+        if len(running) == 1 and not pending:
+            job = running[0]
+            if job.state == JobState.PROCESSING:
+                status = "Processing..."
+            elif job.state == JobState.DOWNLOADED:
+                status = "Waiting to process..."
             else:
-                # Truncate long error messages
-                error_msg = error_msg.split('\n')[0][:80]
-            self.after(0, lambda e=error_msg: self._download_complete(False, e))
-        except Exception as e:
-            error_str = str(e)
-            if "ffmpeg" in error_str.lower():
-                error_str = "FFmpeg required - try MP4 or M4A format"
-            self.after(0, lambda e=error_str[:80]: self._download_complete(False, e))
-
-    def _download_complete(self, success, error=None):
-        self.is_downloading = False
-        self.download_btn.configure(text="DOWNLOAD", fg_color=Colors.FIRE, hover_color=Colors.FIRE_GLOW)
-
-        if success:
+                status = f"Downloading: {job.progress:.1f}%"
+                if job.speed:
+                    status += f" • {job.speed}"
+                if job.eta:
+                    status += f" • ETA: {job.eta}"
+        else:
+            downloading = sum(1 for job in running if job.state == JobState.RUNNING)
+            status = f"{downloading} downloading • {len(running) - downloading} processing • {pending} queued"
+        self.status_label.configure(text=status[:55])
+
+    def _download_complete(self):
+        """Called once the queue drains."""
+        self.cancel_btn.configure(state="disabled", fg_color=Colors.SURFACE_LIGHT)
+        self.glow.resume("busy")
+        self.queue.clear_finished()
+        retries = self.queue.retry_policy.summary()
+        if retries:
+            self._log(f"Retries this session:\n{retries}")
+        summary = self.metrics.summary()
+        if summary:
+            self._log(f"Metrics this session: {summary}")
+        done, failed, skipped = self._batch_done, self._batch_failed, self._batch_skipped
+        if done and not failed:
             self.progress_bar.set(1)
             self.status_label.configure(text="Download complete!")
             self._log("Download complete!")
-            messagebox.showinfo("Success", "Download complete!")
-        else:
+            message = "Download complete!" if done == 1 else f"{done} downloads complete!"
+            if skipped:
+                message += f"\n{skipped} already downloaded"
+            messagebox.showinfo("Success", message)
+        elif done:
+            self.progress_bar.set(1)
+            self.status_label.configure(text=f"{done} complete, {failed} failed")
+            self._log(f"Batch finished: {done} complete, {failed} failed, {skipped} skipped")
+        elif failed:
             self.status_label.configure(text="Failed")
-            self._log(f"Error: {error}", error=True)
+        elif skipped:
+            self.progress_bar.set(1)
+            self.status_label.configure(text="Already downloaded")
+        else:
+            self.status_label.configure(text="Cancelled")
 
     def _on_close(self):
-        self.is_downloading = False
+        self.glow.stop()
+        self.clipboard_watcher.stop()
+        self.queue.shutdown()
+        self.metrics.close()
+        self.destroy()
+
+
+class PlaylistDialog(ctk.CTkToplevel):
+    """Entry picker for a playlist or channel. Already downloaded entries start unselected."""
+
+    def __init__(self, master, playlist: Playlist, progress: PlaylistProgress, on_download):
+        super().__init__(master)
+        self.playlist = playlist
+        self.progress = progress
+        self.on_download = on_download
+
+        self.title(f"Playlist - {playlist.title}")
+        self.geometry("640x560")
+        self.configure(fg_color=Colors.BG)
+        self.transient(master)
+
+        done = len(playlist.entries) - len(progress.pending())
+        ctk.CTkLabel(
+            self, text=playlist.title, font=ctk.CTkFont(size=16, weight="bold"),
+            text_color=Colors.WHITE, anchor="w"
+        ).pack(fill="x", padx=20, pady=(18, 2))
+        ctk.CTkLabel(
+            self, text=f"{len(playlist.entries)} entries  ·  {done} already downloaded",
+            font=ctk.CTkFont(size=12), text_color=Colors.GRAY_DIM, anchor="w"
+        ).pack(fill="x", padx=20, pady=(0, 12))
+
+        # Plain Tk listbox - stays fast with thousands of entries
+        list_frame = ctk.CTkFrame(self, fg_color=Colors.SURFACE, corner_radius=8)
+        list_frame.pack(fill="both", expand=True, padx=20)
+        self.listbox = tk.Listbox(
+            list_frame, selectmode="extended", activestyle="none",
+            bg=Colors.SURFACE, fg=Colors.WHITE, selectbackground=Colors.FIRE_DIM,
+            selectforeground=Colors.WHITE, highlightthickness=0, borderwidth=0,
+            font=("Consolas", 10)
+        )
+        scrollbar = ctk.CTkScrollbar(list_frame, command=self.listbox.yview)
+        self.listbox.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y", pady=6)
+        self.listbox.pack(side="left", fill="both", expand=True, padx=(8, 0), pady=8)
+
+        self.listbox.insert("end", *[
+            ("✓ " if progress.is_done(entry) else "  ") + entry.label()
+            for entry in playlist.entries
+        ])
+        self._select_remaining()
+
+        btn_row = ctk.CTkFrame(self, fg_color="transparent")
+        btn_row.pack(fill="x", padx=20, pady=16)
+        for text, command in (("All", self._select_all), ("None", self._select_none),
+                              ("Remaining", self._select_remaining)):
+            ctk.CTkButton(
+                btn_row, text=text, command=command, width=80, height=34,
+                fg_color=Colors.SURFACE_LIGHT, hover_color=Colors.BORDER,
+                border_width=1, border_color=Colors.BORDER
+            ).pack(side="left", padx=(0, 8))
+
+        ctk.CTkButton(
+            btn_row, text="DOWNLOAD SELECTED", command=self._download,
+            height=34, fg_color=Colors.FIRE, hover_color=Colors.FIRE_GLOW,
+            font=ctk.CTkFont(size=12, weight="bold")
+        ).pack(side="right")
+
+        self.after(100, self.focus_force)
+
+    def _select_all(self):
+        self.listbox.selection_set(0, "end")
+
+    def _select_none(self):
+        self.listbox.selection_clear(0, "end")
+
+    def _select_remaining(self):
+        self._select_none()
+        for i, entry in enumerate(self.playlist.entries):
+            if not self.progress.is_done(entry):
+                self.listbox.selection_set(i)
+
+    def _download(self):
+        entries = [self.playlist.entries[i] for i in self.listbox.curselection()]
         self.destroy()
+        self.on_download(entries)
 
 
 def main():